@@ -3,6 +3,8 @@
 Interfaz gráfica PyQt6 para detección en tiempo real
 """
 import sys
+import os
+import queue
 import cv2
 import numpy as np
 from PyQt6.QtWidgets import (
@@ -12,40 +14,160 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtCore import QThread, pyqtSignal, QTimer, Qt, QSize
 from PyQt6.QtGui import QImage, QPixmap, QFont
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple
+from functools import lru_cache
 import time
 from datetime import datetime
 
-from core.detectors.face_detector import FaceDetector
-from core.detectors.emotion_analyzer import EmotionAnalyzer
-from core.detectors.face_recognizer import FaceRecognizer
+import config
+from core.detectors import get_face_detector, get_emotion_analyzer, get_face_recognizer
+from core.detectors.embedding_pool import EmbeddingPool
+from core.detectors.face_tracker import FaceTracker
 from core.services.stress_calculator import StressCalculator
 from core.services.alert_manager import AlertManager
 from core.services.report_generator import ReportGenerator
 from core.database.database import Database
-from core.utils.types import DetectionResult, Alert, Employee
+from core.utils.types import DetectionBatch, Alert, Employee
+from core.utils.fastmath import aggregate_stress, clip_boxes, draw_box, fill_rect, NEGATIVE_WEIGHTS
+
+# Parámetros de las etiquetas de los overlays
+OVERLAY_FONT = cv2.FONT_HERSHEY_SIMPLEX
+OVERLAY_FONT_SCALE = 0.6
+OVERLAY_FONT_THICKNESS = 2
+
+@lru_cache(maxsize=256)
+def _text_size(text: str) -> Tuple[int, int]:
+    """Tamaño (ancho, alto) de una etiqueta; las mismas etiquetas se repiten entre frames"""
+    return cv2.getTextSize(text, OVERLAY_FONT, OVERLAY_FONT_SCALE, OVERLAY_FONT_THICKNESS)[0]
+
+class CaptureThread(QThread):
+    """Thread productor: lee la cámara y conserva solo el frame más reciente"""
+    
+    def __init__(self, cap: cv2.VideoCapture):
+        super().__init__()
+        self.cap = cap
+        self.running = False
+        
+        # Cola de un solo elemento: (timestamp de captura, frame)
+        self.frames: queue.Queue = queue.Queue(maxsize=1)
+    
+    def start_reading(self):
+        """Inicia la lectura continua de la cámara"""
+        self.running = True
+        self.start()
+    
+    def stop_reading(self):
+        """Detiene la lectura y espera a que el thread termine"""
+        self.running = False
+        self.wait()
+    
+    def run(self):
+        """Loop de lectura: sobrescribe el frame pendiente si el consumidor va lento"""
+        while self.running:
+            ret, frame = self.cap.read()
+            if not ret:
+                break
+            
+            item = (time.time(), frame)
+            try:
+                self.frames.put_nowait(item)
+            except queue.Full:
+                # Descartar el frame viejo para quedarse siempre en vivo
+                try:
+                    self.frames.get_nowait()
+                except queue.Empty:
+                    pass
+                self.frames.put_nowait(item)
+        
+        self.running = False
+
+class ModelLoader(QThread):
+    """Carga los modelos compartidos fuera del thread de la UI"""
+    
+    models_ready = pyqtSignal(str)  # mensaje de error ("" si todo cargó)
+    
+    def run(self):
+        """Construye los detectores; VideoThread luego los obtiene ya cacheados"""
+        try:
+            get_face_detector(backend="auto")
+            get_emotion_analyzer(use_ensemble=False, inference_device=config.INFERENCE_DEVICE)
+            get_face_recognizer(inference_device=config.INFERENCE_DEVICE)
+        except Exception as e:
+            self.models_ready.emit(str(e))
+            return
+        
+        self.models_ready.emit("")
+
+class ReportThread(QThread):
+    """Genera el reporte periódico (consultas y mantenimiento de SQLite) fuera del thread de la UI"""
+    
+    report_ready = pyqtSignal(object)  # Dict del reporte o None si no hubo detecciones
+    
+    def __init__(self, database: Database, report_generator: ReportGenerator):
+        super().__init__()
+        self.database = database
+        self.report_generator = report_generator
+    
+    def run(self):
+        """Resume, optimiza y genera el reporte del período"""
+        # Resumen por empleado agregado dentro de SQLite
+        self.database.rollup_stress_summary(window_minutes=15)
+        # Mantener al día las estadísticas del planificador mientras la app sigue abierta
+        self.database.optimize()
+        
+        self.report_ready.emit(self.report_generator.generate_report())
 
 class VideoThread(QThread):
     """Thread para captura y procesamiento de video"""
     
-    frame_ready = pyqtSignal(np.ndarray, list)  # frame, detections
+    # Frames más viejos que esto solo se muestran, sin analizar
+    MAX_FRAME_AGE_S = 0.5
+    # Compuerta de movimiento: diferencia media (0-255) bajo la cual la escena es estática
+    STATIC_DIFF_THRESHOLD = 2.0
+    # Forzar un análisis completo cada N ticks estáticos (recupera entradas no vistas)
+    STATIC_MAX_SKIPS = 30
+    
+    frame_ready = pyqtSignal(QImage, object)  # frame escalado, DetectionBatch
+    detections_ready = pyqtSignal(object)  # DetectionBatch de un frame recién analizado
     fps_updated = pyqtSignal(float)
+    frame_skip_changed = pyqtSignal(int)
     
-    def __init__(self, camera_index: int = 0):
+    def __init__(self, camera_index: int = 0, embedding_pool: Optional[EmbeddingPool] = None):
         super().__init__()
         self.camera_index = camera_index
+        self.embedding_pool = embedding_pool
         self.running = False
         self.cap = None
+        self.capture_thread: Optional[CaptureThread] = None
+        
+        # Detectores compartidos del proceso (se reutilizan entre Iniciar/Detener)
+        self.face_detector = get_face_detector(backend="auto")
+        self.emotion_analyzer = get_emotion_analyzer(use_ensemble=False, inference_device=config.INFERENCE_DEVICE)
+        self.face_recognizer = get_face_recognizer(inference_device=config.INFERENCE_DEVICE)
         
-        # Inicializar detectores
-        self.face_detector = FaceDetector(backend="mediapipe")
-        self.emotion_analyzer = EmotionAnalyzer(use_ensemble=False)
-        self.face_recognizer = FaceRecognizer()
+        # Recoger enrollments realizados desde la última sesión
+        self.face_recognizer.reload_embeddings()
+        
+        # Tracker para reutilizar la identidad de rostros ya reconocidos
+        self.face_tracker = FaceTracker(iou_threshold=0.5)
         
         # Configuración
-        self.frame_skip = 3  # Analizar 1 de cada N frames
+        self.frame_skip = 3  # Analizar 1 de cada N frames (se ajusta según latencia)
+        self.target_fps = 30
         self.frame_count = 0
         
+        # Latencia de inferencia suavizada (EWMA, en segundos)
+        self._ewma_latency: Optional[float] = None
+        
+        # Tamaño del área de video (lo actualiza la GUI); el frame se escala aquí
+        self.display_size: Optional[tuple] = None
+        # QImage de salida reutilizado entre frames mientras no cambie el tamaño
+        self._qimg: Optional[QImage] = None
+        
+        # Miniatura en gris del último frame revisado por la compuerta de movimiento
+        self._prev_gray: Optional[np.ndarray] = None
+        self._static_skips = 0
+        
         # Métricas
         self.fps_counter = 0
         self.fps_last_time = time.time()
@@ -57,12 +179,25 @@ class VideoThread(QThread):
             print(f"⚠️ No se pudo abrir cámara {self.camera_index}")
             return False
         
+        # MJPG evita que la cámara negocie YUY2 (limita FPS y fuerza conversión en CPU);
+        # se fija antes que la resolución para que el driver negocie el formato con ella
+        self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+        
         # Configurar resolución
         self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
         self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
         self.cap.set(cv2.CAP_PROP_FPS, 30)
         self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
         
+        fourcc = int(self.cap.get(cv2.CAP_PROP_FOURCC))
+        codec = fourcc.to_bytes(4, "little").decode("ascii", errors="replace")
+        if codec != "MJPG":
+            print(f"⚠️ La cámara no aceptó MJPG, usando {codec}")
+        
+        # La lectura de la cámara corre en su propio thread
+        self.capture_thread = CaptureThread(self.cap)
+        self.capture_thread.start_reading()
+        
         self.running = True
         self.start()
         return True
@@ -70,18 +205,25 @@ class VideoThread(QThread):
     def stop_capture(self):
         """Detiene la captura"""
         self.running = False
+        if self.capture_thread:
+            self.capture_thread.stop_reading()
+        self.wait()
         if self.cap:
             self.cap.release()
-        self.wait()
     
     def run(self):
         """Loop principal de procesamiento"""
-        last_detections = []
+        last_detections = DetectionBatch.empty()
+        last_labels: List[str] = []
         
         while self.running:
-            ret, frame = self.cap.read()
-            if not ret:
-                break
+            try:
+                captured_at, frame = self.capture_thread.frames.get(timeout=0.1)
+            except queue.Empty:
+                # La cámara dejó de entregar frames
+                if not self.capture_thread.isRunning():
+                    break
+                continue
             
             self.frame_count += 1
             
@@ -93,87 +235,248 @@ class VideoThread(QThread):
                 self.fps_updated.emit(fps)
                 self.fps_counter = 0
                 self.fps_last_time = current_time
+                self._update_frame_skip()
             
-            # Procesar frame (con frame skipping)
-            if self.frame_count % self.frame_skip == 0:
-                # Detectar rostros
-                faces = self.face_detector.detect_faces(frame)
+            # Procesar frame (con frame skipping); los frames atrasados solo se muestran
+            frame_age = time.time() - captured_at
+            if self.frame_count % self.frame_skip == 0 and frame_age <= self.MAX_FRAME_AGE_S:
+                # Escena estática y sin rostros: no correr el pipeline completo
+                if self._is_static(frame) and len(last_detections) == 0:
+                    if self._static_skips < self.STATIC_MAX_SKIPS:
+                        self._static_skips += 1
+                        self.frame_ready.emit(self._to_qimage(frame), last_detections)
+                        continue
+                self._static_skips = 0
+                
+                t0 = time.perf_counter()
                 
-                # Analizar emociones
-                detections = []
-                for face_region in faces:
-                    x, y, w, h = face_region.bbox
-                    face_roi = frame[y:y+h, x:x+w]
-                    
-                    if face_roi.size > 0:
-                        # Análisis emocional
-                        emotion_result = self.emotion_analyzer.analyze_face(face_roi)
-                        
-                        # Reconocimiento facial
-                        employee_id, recog_confidence = self.face_recognizer.recognize_face(face_roi)
-                        
-                        detection = DetectionResult(
-                            face_region=face_region,
-                            emotion=emotion_result,
-                            employee_id=employee_id,
-                            recognition_confidence=recog_confidence
-                        )
-                        detections.append(detection)
+                detections = self._analyze_frame(frame)
                 
                 last_detections = detections
+                last_labels = self._format_labels(detections)
+                self.detections_ready.emit(detections)
+                
+                # Actualizar latencia de inferencia
+                latency = time.perf_counter() - t0
+                if self._ewma_latency is None:
+                    self._ewma_latency = latency
+                else:
+                    self._ewma_latency = 0.9 * self._ewma_latency + 0.1 * latency
             
-            # Dibujar overlays
-            annotated_frame = self._draw_overlays(frame.copy(), last_detections)
-            
-            # Emitir frame
-            self.frame_ready.emit(annotated_frame, last_detections)
+            # Dibujar overlays in-place (cada cap.read() entrega un frame nuevo)
+            annotated_frame = self._draw_overlays(frame, last_detections, last_labels)
             
-            # Pequeña pausa para no saturar CPU
-            self.msleep(10)
+            # Emitir frame ya escalado y listo para mostrar
+            self.frame_ready.emit(self._to_qimage(annotated_frame), last_detections)
+            # Sin pausa fija: el ritmo lo marca la cola del CaptureThread
+    
+    def _is_static(self, frame: np.ndarray) -> bool:
+        """
+        Compara una miniatura del frame con la anterior
+        
+        Args:
+            frame: Frame BGR actual
+        
+        Returns:
+            True si la diferencia media está bajo STATIC_DIFF_THRESHOLD
+        """
+        small = cv2.resize(frame, (80, 45), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        
+        prev_gray, self._prev_gray = self._prev_gray, gray
+        if prev_gray is None:
+            return False
+        
+        return float(cv2.absdiff(gray, prev_gray).mean()) < self.STATIC_DIFF_THRESHOLD
     
-    def _draw_overlays(self, frame: np.ndarray, detections: List[DetectionResult]) -> np.ndarray:
+    def _analyze_frame(self, frame: np.ndarray) -> DetectionBatch:
+        """Detecta rostros y analiza emoción/identidad de todos en lote"""
+        # El detector reduce el frame internamente y retorna boxes a escala completa
+        height, width = frame.shape[:2]
+        boxes, _ = self.face_detector.detect_faces_array(frame)
+        
+        # Extraer ROIs válidos (bounding boxes recortados al frame)
+        corners = clip_boxes(boxes, width, height, 0)
+        valid = (corners[:, 2] > corners[:, 0]) & (corners[:, 3] > corners[:, 1])
+        boxes, corners = boxes[valid], corners[valid]
+        
+        # Asociar con los tracks del frame anterior y reutilizar identidades conocidas
+        track_index = self.face_tracker.match(boxes)
+        employee_ids, recognition_confidences = self.face_tracker.identities(track_index)
+        
+        # Empleados ya reconocidos reutilizan la emoción reciente de su track
+        emotion_ids, confidences, probs, emotion_ages, stale = self.face_tracker.emotions(
+            track_index, employee_ids
+        )
+        
+        if len(boxes) == 0:
+            self.face_tracker.update(
+                boxes, track_index, employee_ids, recognition_confidences,
+                emotion_ids, confidences, probs, emotion_ages
+            )
+            return DetectionBatch.empty()
+        
+        face_rois = [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in corners]
+        
+        # Análisis emocional en lote solo de los rostros sin emoción vigente
+        analyze = np.flatnonzero(stale)
+        if len(analyze):
+            (
+                emotion_ids[analyze], confidences[analyze], probs[analyze]
+            ) = self.emotion_analyzer.analyze_faces_arrays([face_rois[i] for i in analyze])
+        
+        # Reconocimiento solo de rostros nuevos o aún no identificados
+        pending = np.flatnonzero([employee_id is None for employee_id in employee_ids])
+        if len(pending):
+            recognitions = self._recognize([face_rois[i] for i in pending])
+            employee_ids[pending] = [employee_id for employee_id, _ in recognitions]
+            recognition_confidences[pending] = [confidence for _, confidence in recognitions]
+        
+        track_ids = self.face_tracker.update(
+            boxes, track_index, employee_ids, recognition_confidences,
+            emotion_ids, confidences, probs, emotion_ages
+        )
+        
+        return DetectionBatch(
+            bbox=boxes,
+            emotion_id=emotion_ids,
+            confidence=confidences,
+            employee_id=employee_ids,
+            recognition_confidence=recognition_confidences,
+            probs=probs,
+            track_id=track_ids
+        )
+    
+    def _recognize(self, face_rois: List[np.ndarray]) -> List[tuple]:
+        """Reconoce los rostros; con varios rostros reparte los embeddings en el pool"""
+        # Con el modelo en GPU el lote ya es rápido en este thread; además los workers
+        # (en CPU) cargarían otra variante del modelo que la usada en la galería
+        if (
+            self.embedding_pool is not None
+            and len(face_rois) > 1
+            and self.face_recognizer.embeddings_cache
+            and not getattr(self.face_recognizer.embedding_model, "on_gpu", False)
+        ):
+            embeddings = self.embedding_pool.generate_embeddings(face_rois)
+            if embeddings is not None:
+                return self.face_recognizer.match_embeddings(embeddings, len(face_rois))
+        
+        # Un solo rostro (o pool no disponible): en este thread, sin costo de IPC
+        return self.face_recognizer.recognize_faces_batch(face_rois)
+    
+    def _to_qimage(self, frame: np.ndarray) -> QImage:
+        """
+        Escala el frame al área de video directamente dentro de un QImage
+        
+        Args:
+            frame: Frame BGR anotado
+        
+        Returns:
+            QImage BGR888 (reutilizado entre frames)
+        """
+        h, w = frame.shape[:2]
+        target_w, target_h = w, h
+        if self.display_size:
+            # Mantener aspecto dentro del área de video
+            scale = min(self.display_size[0] / w, self.display_size[1] / h)
+            target_w = max(1, int(w * scale))
+            target_h = max(1, int(h * scale))
+        
+        if self._qimg is None or (self._qimg.width(), self._qimg.height()) != (target_w, target_h):
+            self._qimg = QImage(target_w, target_h, QImage.Format.Format_BGR888)
+        qt_image = self._qimg
+        
+        # Vista NumPy sobre los píxeles del QImage (respetando el padding por línea).
+        # Si la GUI aún comparte el frame anterior, bits() hace detach (copy-on-write)
+        # y se escribe en un buffer nuevo sin tocar el que se está mostrando
+        bits = qt_image.bits()
+        bits.setsize(qt_image.sizeInBytes())
+        view = np.ndarray(
+            (target_h, target_w, 3), dtype=np.uint8, buffer=bits,
+            strides=(qt_image.bytesPerLine(), 3, 1)
+        )
+        
+        # Escalar con OpenCV (SIMD) escribiendo en el buffer del QImage
+        if (target_w, target_h) != (w, h):
+            cv2.resize(frame, (target_w, target_h), dst=view, interpolation=cv2.INTER_LINEAR)
+        else:
+            np.copyto(view, frame)
+        
+        return qt_image
+    
+    def _update_frame_skip(self):
+        """Ajusta frame_skip para que la inferencia siga el ritmo de la cámara"""
+        if self._ewma_latency is None:
+            return
+        
+        frame_skip = max(1, int(self._ewma_latency * self.target_fps) + 1)
+        if frame_skip != self.frame_skip:
+            self.frame_skip = frame_skip
+            self.frame_skip_changed.emit(frame_skip)
+    
+    def _format_labels(self, detections: DetectionBatch) -> List[str]:
+        """
+        Formatea las etiquetas de los overlays una vez por frame analizado
+        
+        Args:
+            detections: Detecciones del frame
+        
+        Returns:
+            Etiqueta de cada detección (se reutiliza en los frames no analizados)
+        """
+        from core.utils.types import EMOTION_LABELS_ES_BY_ID
+        
+        labels = []
+        for emotion_id, confidence, employee_id in zip(
+            detections.emotion_id.tolist(),
+            detections.confidence.tolist(),
+            detections.employee_id
+        ):
+            label_text = f"{EMOTION_LABELS_ES_BY_ID[emotion_id]} ({confidence:.0%})"
+            if employee_id:
+                label_text = f"{employee_id}: {label_text}"
+            labels.append(label_text)
+        
+        return labels
+    
+    def _draw_overlays(
+        self,
+        frame: np.ndarray,
+        detections: DetectionBatch,
+        labels: Optional[List[str]] = None
+    ) -> np.ndarray:
         """Dibuja overlays en el frame"""
-        from core.utils.types import EMOTION_COLORS, EMOTION_LABELS_ES
+        from core.utils.types import EMOTION_PALETTE
         
-        for detection in detections:
-            x, y, w, h = detection.face_region.bbox
-            
-            # Color según emoción
-            emotion = detection.emotion.emotion
-            color = EMOTION_COLORS.get(emotion, (200, 200, 200))
-            
-            # Dibujar bounding box
-            cv2.rectangle(frame, (x, y), (x + w, y + h), color, 2)
+        if labels is None:
+            labels = self._format_labels(detections)
+        
+        # Esquinas de todos los boxes en una sola operación
+        corners = detections.bbox.copy()
+        corners[:, 2:] += corners[:, :2]
+        
+        for (x, y, x2, y2), emotion_id, label_text in zip(
+            corners.tolist(), detections.emotion_id.tolist(), labels
+        ):
+            # Color según emoción (paleta indexada por ID)
+            color = EMOTION_PALETTE[emotion_id]
             
-            # Etiqueta de emoción
-            emotion_label = EMOTION_LABELS_ES.get(emotion, emotion)
-            confidence = detection.emotion.confidence
+            # Dibujar bounding box (escritura directa de píxeles)
+            draw_box(frame, x, y, x2, y2, color, 2)
             
-            label_text = f"{emotion_label} ({confidence:.0%})"
-            if detection.employee_id:
-                label_text = f"{detection.employee_id}: {label_text}"
-            
-            # Fondo para texto
-            (text_width, text_height), _ = cv2.getTextSize(
-                label_text, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2
-            )
-            cv2.rectangle(
-                frame,
-                (x, y - text_height - 10),
-                (x + text_width, y),
-                color,
-                -1
-            )
+            # Fondo para texto (tamaño cacheado por etiqueta)
+            text_width, text_height = _text_size(label_text)
+            fill_rect(frame, x, y - text_height - 10, x + text_width + 1, y + 1, color)
             
             # Texto
             cv2.putText(
                 frame,
                 label_text,
                 (x, y - 5),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.6,
+                OVERLAY_FONT,
+                OVERLAY_FONT_SCALE,
                 (255, 255, 255),
-                2
+                OVERLAY_FONT_THICKNESS
             )
         
         return frame
@@ -181,6 +484,9 @@ class VideoThread(QThread):
 class MainWindow(QMainWindow):
     """Ventana principal de la aplicación"""
     
+    # Vigencia de la caché de empleados activos del dashboard
+    EMPLOYEES_CACHE_TTL_S = 60.0
+    
     def __init__(self):
         super().__init__()
         self.setWindowTitle("StressVision - Sistema de Detección de Estrés")
@@ -198,9 +504,25 @@ class MainWindow(QMainWindow):
         # Thread de video
         self.video_thread: Optional[VideoThread] = None
         
+        # Procesos para embeddings en paralelo (usa varios núcleos fuera del GIL); arrancan
+        # con el primer frame de varios rostros, no al abrir la ventana
+        self.embedding_pool = EmbeddingPool(
+            max_workers=min(4, os.cpu_count() or 1),
+            inference_device="cpu"
+        )
+        
         # Estado
         self.current_session_id: Optional[str] = None
         self.selected_employee_id: Optional[str] = None
+        self._pix_cache = QPixmap()
+        
+        # Flags de cambios pendientes de mostrar (modelo push en lugar de polling)
+        self._metrics_dirty = True
+        self._dashboard_dirty = True
+        
+        # Caché de empleados activos (cambian rara vez)
+        self._employees_cache: Optional[List[Employee]] = None
+        self._employees_cache_time = 0.0
         
         # Timers
         self.alert_timer = QTimer()
@@ -210,12 +532,30 @@ class MainWindow(QMainWindow):
         self.report_timer = QTimer()
         self.report_timer.timeout.connect(self.generate_periodic_report)
         self.report_timer.start(900000)  # Cada 15 minutos
+        self.report_thread = ReportThread(self.database, self.report_generator)
+        self.report_thread.report_ready.connect(self.on_report_ready)
         
         # UI
         self._init_ui()
         
         # Cargar empleados
         self._load_employees()
+        
+        # Los modelos tardan segundos en cargar: la ventana se muestra ya y
+        # el monitoreo se habilita cuando terminan
+        self.start_btn.setEnabled(False)
+        self.statusBar().showMessage("Cargando modelos...")
+        self.model_loader = ModelLoader()
+        self.model_loader.models_ready.connect(self.on_models_ready)
+        self.model_loader.start()
+    
+    def on_models_ready(self, error: str):
+        """Callback cuando terminan de cargar los modelos"""
+        self.start_btn.setEnabled(True)
+        if error:
+            self.statusBar().showMessage(f"⚠️ Error cargando modelos: {error}")
+        else:
+            self.statusBar().showMessage("Listo")
     
     def _init_ui(self):
         """Inicializa la interfaz de usuario"""
@@ -324,10 +664,10 @@ class MainWindow(QMainWindow):
         self.metrics_text.setMaximumHeight(300)
         metrics_layout.addWidget(self.metrics_text)
         
-        # Actualizar métricas cada segundo
+        # Revisar cada 250 ms si hay métricas nuevas (solo recalcula si cambiaron)
         self.metrics_timer = QTimer()
-        self.metrics_timer.timeout.connect(self.update_metrics)
-        self.metrics_timer.start(1000)
+        self.metrics_timer.timeout.connect(self._refresh_metrics_if_dirty)
+        self.metrics_timer.start(250)
         
         layout.addWidget(metrics_group, 1)
         
@@ -365,9 +705,9 @@ class MainWindow(QMainWindow):
         
         layout.addLayout(metrics_grid)
         
-        # Actualizar dashboard cada 5 segundos
+        # Actualizar dashboard cada 5 segundos (si hubo cambios)
         self.dashboard_timer = QTimer()
-        self.dashboard_timer.timeout.connect(self.update_dashboard)
+        self.dashboard_timer.timeout.connect(self._refresh_dashboard_if_dirty)
         self.dashboard_timer.start(5000)
         
         return widget
@@ -427,9 +767,14 @@ class MainWindow(QMainWindow):
         if self.video_thread is None or not self.video_thread.isRunning():
             # Iniciar
             camera_index = self.camera_combo.value()
-            self.video_thread = VideoThread(camera_index)
+            self.video_thread = VideoThread(camera_index, embedding_pool=self.embedding_pool)
             self.video_thread.frame_ready.connect(self.on_frame_ready)
+            self.video_thread.detections_ready.connect(self.process_detections)
             self.video_thread.fps_updated.connect(self.on_fps_updated)
+            self.video_thread.frame_skip_changed.connect(self.on_frame_skip_changed)
+            self.video_thread.display_size = (
+                self.video_label.width(), self.video_label.height()
+            )
             
             if self.video_thread.start_capture():
                 self.start_btn.setText("⏸ Detener Monitoreo")
@@ -454,72 +799,115 @@ class MainWindow(QMainWindow):
                 self.database.end_session(self.current_session_id)
                 self.current_session_id = None
     
-    def on_frame_ready(self, frame: np.ndarray, detections: List[DetectionResult]):
+    def on_frame_ready(self, qt_image: QImage, detections: DetectionBatch):
         """Callback cuando hay un nuevo frame"""
-        # Convertir frame a QImage
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        h, w, ch = rgb_frame.shape
-        bytes_per_line = ch * w
-        qt_image = QImage(rgb_frame.data, w, h, bytes_per_line, QImage.Format.Format_RGB888)
-        
-        # Escalar si es necesario
-        pixmap = QPixmap.fromImage(qt_image)
-        scaled_pixmap = pixmap.scaled(
-            self.video_label.size(),
-            Qt.AspectRatioMode.KeepAspectRatio,
-            Qt.TransformationMode.SmoothTransformation
-        )
-        
-        self.video_label.setPixmap(scaled_pixmap)
-        
-        # Procesar detecciones
-        self.process_detections(detections)
+        # El frame llega escalado desde el VideoThread; informar el tamaño actual
+        if self.video_thread:
+            target_size = self.video_label.size()
+            self.video_thread.display_size = (target_size.width(), target_size.height())
+        
+        # Reutilizar el mismo QPixmap en lugar de crear uno por frame
+        self._pix_cache.convertFromImage(qt_image)
+        self.video_label.setPixmap(self._pix_cache)
     
-    def process_detections(self, detections: List[DetectionResult]):
+    def process_detections(self, detections: DetectionBatch):
         """Procesa las detecciones y actualiza base de datos"""
         from core.utils.types import DetectionEvent
         
-        for detection in detections:
+        timestamp = int(time.time() * 1000)
+        confidences = detections.confidence.tolist()
+        bboxes = detections.bbox.tolist()
+        track_ids = detections.track_id.tolist()
+        # Probabilidades empaquetadas como BLOB de 7 float32 (EMOTION_PROBS_STRUCT)
+        probs = [row.tobytes() for row in detections.probs.astype("<f4", copy=False)]
+        has_probs = detections.probs.any(axis=1).tolist()
+        
+        events = []
+        for i, employee_id in enumerate(detections.employee_id):
+            emotion = detections.emotion(i)
+            
             # Agregar a calculadora de estrés
             self.stress_calculator.add_emotion(
-                emotion=detection.emotion.emotion,
-                employee_id=detection.employee_id,
-                confidence=detection.emotion.confidence
+                emotion=emotion,
+                employee_id=employee_id,
+                confidence=confidences[i]
             )
             
-            # Guardar en base de datos
+            # Nivel de estrés actual para el evento
             stress_level = self.stress_calculator.calculate_stress_index(
-                employee_id=detection.employee_id
+                employee_id=employee_id
             ) / 100.0
             
             detection_event = DetectionEvent(
                 session_id=self.current_session_id,
-                employee_id=detection.employee_id,
-                track_id=detection.track_id,
-                timestamp=datetime.now().isoformat(),
-                emotion=detection.emotion.emotion,
-                confidence=detection.emotion.confidence,
+                employee_id=employee_id,
+                track_id=track_ids[i],
+                timestamp=timestamp,
+                emotion=emotion,
+                confidence=confidences[i],
                 stress_level=stress_level,
-                bounding_box=str(detection.face_region.bbox),
-                emotion_probabilities=str(detection.emotion.probabilities)
+                bbox_x=bboxes[i][0],
+                bbox_y=bboxes[i][1],
+                bbox_w=bboxes[i][2],
+                bbox_h=bboxes[i][3],
+                emotion_probabilities=probs[i] if has_probs[i] else None
             )
             
-            self.database.add_detection(detection_event)
+            events.append(detection_event)
+        
+        # Se escriben en lote junto con los de otros frames (thread de la BD)
+        self.database.queue_detections(events)
+        
+        # Hay métricas nuevas para mostrar
+        self._metrics_dirty = True
+        self._dashboard_dirty = True
+        
+        # Estrés del frame ponderado por confianza
+        frame_stress = aggregate_stress(detections.emotion_id, detections.confidence, NEGATIVE_WEIGHTS)
         
         # Actualizar contador
-        self.detections_label.setText(f"Detecciones: {len(detections)}")
+        self.detections_label.setText(f"Detecciones: {len(detections)} ({frame_stress:.0%} estrés)")
     
     def on_fps_updated(self, fps: float):
         """Callback cuando se actualiza el FPS"""
         self.fps_label.setText(f"FPS: {fps:.1f}")
     
+    def on_frame_skip_changed(self, frame_skip: int):
+        """Callback cuando el thread de video ajusta el frame skip"""
+        self.statusBar().showMessage(f"Monitoreo activo - analizando 1 de cada {frame_skip} frames")
+    
     def on_employee_selected(self, index: int):
         """Callback cuando se selecciona un empleado"""
         self.selected_employee_id = self.employee_combo.itemData(index)
         self.update_metrics()
     
+    def _refresh_metrics_if_dirty(self):
+        """Actualiza las métricas solo si llegaron detecciones nuevas"""
+        if self._metrics_dirty:
+            self.update_metrics()
+    
+    def _refresh_dashboard_if_dirty(self):
+        """Actualiza el dashboard solo si hubo cambios o expiró la caché de empleados"""
+        if self._dashboard_dirty or not self._employees_cache_valid():
+            self.update_dashboard()
+    
+    def _employees_cache_valid(self) -> bool:
+        """Indica si la caché de empleados activos sigue vigente"""
+        return (
+            self._employees_cache is not None
+            and time.monotonic() - self._employees_cache_time < self.EMPLOYEES_CACHE_TTL_S
+        )
+    
+    def _get_active_employees(self) -> List[Employee]:
+        """Empleados activos, cacheados durante EMPLOYEES_CACHE_TTL_S"""
+        if not self._employees_cache_valid():
+            self._employees_cache = self.database.get_all_employees(active_only=True)
+            self._employees_cache_time = time.monotonic()
+        return self._employees_cache
+    
     def update_metrics(self):
         """Actualiza las métricas mostradas"""
+        self._metrics_dirty = False
         metrics = self.stress_calculator.get_metrics(
             employee_id=self.selected_employee_id
         )
@@ -540,6 +928,8 @@ class MainWindow(QMainWindow):
     
     def update_dashboard(self):
         """Actualiza el dashboard"""
+        self._dashboard_dirty = False
+        
         # Obtener métricas globales
         metrics = self.stress_calculator.get_metrics()
         
@@ -547,7 +937,7 @@ class MainWindow(QMainWindow):
         self.avg_stress_label.setText(f"{metrics['stress_index']:.1f}%")
         
         # Empleados activos
-        employees = self.database.get_all_employees(active_only=True)
+        employees = self._get_active_employees()
         self.active_employees_label.setText(str(len(employees)))
         
         # Alertas pendientes
@@ -567,6 +957,7 @@ class MainWindow(QMainWindow):
     def refresh_alerts(self):
         """Actualiza la tabla de alertas"""
         alerts = self.alert_manager.get_pending_alerts(limit=100)
+        self._dashboard_dirty = True
         
         self.alerts_table.setRowCount(len(alerts))
         
@@ -596,13 +987,21 @@ class MainWindow(QMainWindow):
     
     def generate_periodic_report(self):
         """Genera reporte periódico"""
-        report = self.report_generator.generate_report()
+        # Las consultas corren en ReportThread; si el anterior sigue en curso, se omite este
+        if not self.report_thread.isRunning():
+            self.report_thread.start()
+    
+    def on_report_ready(self, report: Optional[Dict]):
+        """Callback cuando ReportThread termina el reporte"""
         if report:
             self.statusBar().showMessage(f"📊 Reporte generado: {report['total_detections']} detecciones")
     
     def _load_employees(self):
         """Carga empleados en el combo"""
-        employees = self.database.get_all_employees(active_only=True)
+        # Recarga explícita: invalidar la caché de empleados
+        self._employees_cache = None
+        employees = self._get_active_employees()
+        self._dashboard_dirty = True
         
         self.employee_combo.clear()
         self.employee_combo.addItem("Todos (Global)", None)
@@ -615,11 +1014,20 @@ class MainWindow(QMainWindow):
     
     def closeEvent(self, event):
         """Evento al cerrar la ventana"""
+        # La carga de modelos no se puede interrumpir: esperar a que termine
+        self.model_loader.wait()
+        # El reporte en curso usa la base de datos que se cierra más abajo
+        self.report_thread.wait()
+        
         if self.video_thread and self.video_thread.isRunning():
             self.video_thread.stop_capture()
         
         if self.current_session_id:
             self.database.end_session(self.current_session_id)
         
+        self.embedding_pool.shutdown()
+        self.report_generator.close()
+        self.database.close()
+        
         event.accept()
 
@@ -26,6 +26,9 @@ DETECTION_CONFIDENCE = 0.5
 USE_ENSEMBLE = False  # Usar múltiples modelos
 EMOTION_MODEL = "deepface"  # "deepface" o "fer"
 
+# Inferencia ONNX Runtime
+INFERENCE_DEVICE = "cuda"  # "cuda" (TensorRT FP16 / CUDA si están disponibles) o "cpu"
+
 # Reconocimiento Facial
 RECOGNITION_THRESHOLD = 0.70  # Umbral de similitud (0-1)
 ENROLLMENT_MIN_SAMPLES = 3
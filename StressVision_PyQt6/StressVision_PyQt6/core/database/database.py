@@ -3,44 +3,208 @@
 Gestión de datos locales del sistema
 """
 import sqlite3
+import ast
+import atexit
 import json
+import queue
+import threading
+from collections import deque
 from pathlib import Path
-from typing import List, Optional, Dict
+import time
+from typing import Iterator, List, Optional, Dict, Tuple, Union
 from datetime import datetime
 from contextlib import contextmanager
 from core.utils.types import (
-    Employee, DetectionEvent, Alert, AlertStatus, AlertType, AlertSeverity
+    Employee, DetectionEvent, Alert, AlertStatus, AlertType, AlertSeverity,
+    EMOTION_PROBS_STRUCT, MODEL_EMOTION_LABELS
 )
 
+# Sentencias frecuentes como constantes: el caché de sentencias de sqlite3 se
+# indexa por el texto exacto del SQL, así se reutilizan ya compiladas
+_INSERT_DETECTION_SQL = """
+    INSERT INTO detection_events
+    (session_id, employee_id, track_id, timestamp, emotion,
+     confidence, stress_level, bbox_x, bbox_y, bbox_w, bbox_h,
+     emotion_probabilities, processing_time_ms)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Esquema de detection_events (compartido con la migración de bases antiguas)
+_CREATE_DETECTIONS_SQL = """
+    CREATE TABLE {if_not_exists} detection_events (
+        detection_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id TEXT,
+        employee_id TEXT,
+        track_id INTEGER,
+        timestamp INTEGER NOT NULL,  -- epoch en milisegundos
+        emotion TEXT,
+        confidence REAL,
+        stress_level REAL,
+        bbox_x INTEGER,
+        bbox_y INTEGER,
+        bbox_w INTEGER,
+        bbox_h INTEGER,
+        emotion_probabilities BLOB,  -- 7 float32 (EMOTION_PROBS_STRUCT)
+        processing_time_ms INTEGER,
+        FOREIGN KEY (employee_id) REFERENCES employees(employee_id),
+        FOREIGN KEY (session_id) REFERENCES sessions(session_id)
+    )
+"""
+
+_INSERT_ALERT_SQL = """
+    INSERT INTO alerts
+    (employee_id, alert_type, severity, stress_level, timestamp,
+     status, message)
+    VALUES
+"""
+_ALERT_VALUES_SQL = " (?, ?, ?, ?, ?, ?, ?)"
+
+# Alertas por INSERT multi-fila (7 parámetros c/u, bajo el límite de variables de SQLite)
+_ALERTS_PER_INSERT = 100
+
+# Filas por página de iter_detections (la conexión de lectura se libera entre páginas)
+_DETECTIONS_PAGE_SIZE = 500
+
+# Tamaño del caché de sentencias preparadas por conexión
+_CACHED_STATEMENTS = 256
+
 class Database:
     """
     Gestor de base de datos SQLite
     """
     
-    def __init__(self, db_path: str = "data/stressvision.db"):
+    def __init__(
+        self,
+        db_path: str = "data/stressvision.db",
+        read_connections: int = 2,
+        flush_interval_s: float = 0.5
+    ):
         """
         Inicializa la base de datos
         
         Args:
             db_path: Ruta al archivo de base de datos
+            read_connections: Conexiones de solo lectura para consultas concurrentes
+            flush_interval_s: Cada cuánto se escriben las detecciones encoladas
         """
         self.db_path = Path(db_path)
-        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.in_memory = db_path == ":memory:"
+        if not self.in_memory:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        # Conexión de escritura de larga vida (transacciones explícitas BEGIN/COMMIT)
+        self._write_lock = threading.RLock()
+        self._conn = sqlite3.connect(
+            str(self.db_path), check_same_thread=False, isolation_level=None,
+            cached_statements=_CACHED_STATEMENTS
+        )
+        self._conn.row_factory = sqlite3.Row
+        self._configure_connection(self._conn)
+        
+        # WAL: escrituras sin bloquear lecturas (persistente en el archivo; no aplica
+        # a bases en memoria). Debe ejecutarse fuera de una transacción
+        if not self.in_memory:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        
         self._init_database()
+        
+        # Pool de conexiones de solo lectura (una base en memoria solo tiene la principal)
+        self._read_pool: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        if not self.in_memory:
+            for _ in range(read_connections):
+                self._read_pool.put(self._open_read_connection())
+        
+        # Detecciones encoladas que un thread escribe en lote periódicamente
+        self._pending_detections: deque = deque()
+        self.flush_interval_s = flush_interval_s
+        self._stop_flusher = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name="db-flusher", daemon=True)
+        self._flusher.start()
+        
+        # Cerrar (y optimizar) también si el proceso termina sin llamar a close()
+        self._closed = False
+        atexit.register(self.close)
+    
+    def _open_read_connection(self) -> sqlite3.Connection:
+        """Abre una conexión de solo lectura al archivo de la BD"""
+        conn = sqlite3.connect(
+            f"{self.db_path.resolve().as_uri()}?mode=ro",
+            uri=True, check_same_thread=False, isolation_level=None,
+            cached_statements=_CACHED_STATEMENTS
+        )
+        conn.row_factory = sqlite3.Row
+        self._configure_connection(conn)
+        return conn
+    
+    @staticmethod
+    def _configure_connection(conn: sqlite3.Connection):
+        """Aplica los PRAGMA que SQLite guarda por conexión"""
+        # Con WAL, NORMAL evita un fsync por transacción sin riesgo de corrupción
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-64000")  # ~64 MB de caché de páginas
+        conn.execute("PRAGMA mmap_size=268435456")  # 256 MB mapeados en memoria
+        conn.execute("PRAGMA busy_timeout=5000")  # Esperar locks en lugar de fallar
     
     @contextmanager
     def get_connection(self):
-        """Context manager para conexiones a la BD"""
-        conn = sqlite3.connect(str(self.db_path))
-        conn.row_factory = sqlite3.Row
+        """Context manager para escrituras: una transacción sobre la conexión compartida"""
+        with self._write_lock:
+            conn = self._conn
+            conn.execute("BEGIN")
+            try:
+                yield conn
+                # El bloque puede haber hecho commit por su cuenta
+                if conn.in_transaction:
+                    conn.execute("COMMIT")
+            except Exception:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+    
+    @contextmanager
+    def get_read_connection(self):
+        """Context manager para consultas: toma una conexión de solo lectura del pool"""
+        if self.in_memory:
+            with self._write_lock:
+                yield self._conn
+            return
+        
+        conn = self._read_pool.get()
         try:
             yield conn
-            conn.commit()
-        except Exception:
-            conn.rollback()
-            raise
         finally:
-            conn.close()
+            self._read_pool.put(conn)
+    
+    def close(self):
+        """Escribe las detecciones pendientes y cierra todas las conexiones"""
+        if self._closed:
+            return
+        self._closed = True
+        atexit.unregister(self.close)
+        
+        self._stop_flusher.set()
+        self._flusher.join()
+        self.flush_detections()
+        self.optimize()
+        
+        while not self._read_pool.empty():
+            self._read_pool.get_nowait().close()
+        with self._write_lock:
+            self._conn.close()
+    
+    def optimize(self):
+        """
+        Refresca las estadísticas del planificador con PRAGMA optimize
+        
+        Solo re-analiza las tablas cuyas consultas lo justifican, así que es barato
+        ejecutarlo periódicamente en conexiones de larga vida y antes de cerrarlas
+        """
+        try:
+            with self._write_lock:
+                self._conn.execute("PRAGMA optimize")
+        except Exception as e:
+            print(f"⚠️ Error optimizando base de datos: {e}")
     
     def _init_database(self):
         """Inicializa las tablas de la base de datos"""
@@ -75,23 +239,7 @@ class Database:
             """)
             
             # Tabla de detecciones
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS detection_events (
-                    detection_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    session_id TEXT,
-                    employee_id TEXT,
-                    track_id INTEGER,
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    emotion TEXT,
-                    confidence REAL,
-                    stress_level REAL,
-                    bounding_box TEXT,
-                    emotion_probabilities TEXT,
-                    processing_time_ms INTEGER,
-                    FOREIGN KEY (employee_id) REFERENCES employees(employee_id),
-                    FOREIGN KEY (session_id) REFERENCES sessions(session_id)
-                )
-            """)
+            cursor.execute(_CREATE_DETECTIONS_SQL.format(if_not_exists="IF NOT EXISTS"))
             
             # Tabla de alertas
             cursor.execute("""
@@ -138,6 +286,9 @@ class Database:
                 )
             """)
             
+            # Bases creadas con timestamps ISO o bounding box/probabilidades en texto
+            self._migrate_detection_events(cursor)
+            
             # Índices para mejor rendimiento
             cursor.execute("""
                 CREATE INDEX IF NOT EXISTS idx_detections_employee_timestamp
@@ -154,8 +305,128 @@ class Database:
                 ON alerts(status, timestamp)
             """)
             
+            # Consultas sin filtro de empleado ordenadas por fecha (dashboard, reportes)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_detections_timestamp
+                ON detection_events(timestamp DESC)
+            """)
+            
+            # Alertas filtradas por empleado (y opcionalmente estado), más recientes primero
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_alerts_employee_timestamp
+                ON alerts(employee_id, timestamp DESC)
+            """)
+            
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_alerts_status_employee_timestamp
+                ON alerts(status, employee_id, timestamp DESC)
+            """)
+            
+            # Conteo de alertas por rango de fechas (reportes periódicos)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_alerts_timestamp
+                ON alerts(timestamp)
+            """)
+            
+            # Último reporte generado
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_reports_timestamp
+                ON reports_15min(timestamp DESC)
+            """)
+            
+            # Estadísticas para el planificador (muestreo acotado para no demorar el inicio)
+            cursor.execute("PRAGMA analysis_limit=400")
+            cursor.execute("ANALYZE")
+            
             conn.commit()
     
+    def _migrate_detection_events(self, cursor: sqlite3.Cursor):
+        """
+        Lleva detection_events al esquema actual: timestamp en epoch (ms),
+        bounding box en columnas enteras y probabilidades como BLOB float32
+        """
+        columns = {row[1]: row[2] for row in cursor.execute("PRAGMA table_info(detection_events)")}
+        if columns.get("timestamp", "").upper() == "INTEGER" and "bbox_x" in columns:
+            return
+        
+        print("🔄 Migrando tabla de detecciones al esquema actual...")
+        cursor.execute("ALTER TABLE detection_events RENAME TO detection_events_old")
+        cursor.execute(_CREATE_DETECTIONS_SQL.format(if_not_exists=""))
+        
+        # Los ISO guardados son hora local; 'utc' los lleva a UTC antes de pasar a epoch
+        if columns.get("timestamp", "").upper() == "INTEGER":
+            timestamp_sql = "timestamp"
+        else:
+            timestamp_sql = "CAST(ROUND((julianday(timestamp, 'utc') - 2440587.5) * 86400000) AS INTEGER)"
+        
+        old_rows = cursor.execute(f"""
+            SELECT detection_id, session_id, employee_id, track_id, {timestamp_sql},
+                   emotion, confidence, stress_level, bounding_box,
+                   emotion_probabilities, processing_time_ms
+            FROM detection_events_old
+            WHERE timestamp IS NOT NULL
+        """).fetchall()
+        cursor.executemany(
+            """
+                INSERT INTO detection_events
+                (detection_id, session_id, employee_id, track_id, timestamp, emotion,
+                 confidence, stress_level, bbox_x, bbox_y, bbox_w, bbox_h,
+                 emotion_probabilities, processing_time_ms)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            [
+                (
+                    *row[:8],
+                    *self._parse_legacy_bbox(row[8]),
+                    self._parse_legacy_probabilities(row[9]),
+                    row[10]
+                )
+                for row in old_rows
+            ]
+        )
+        cursor.execute("DROP TABLE detection_events_old")
+    
+    @staticmethod
+    def _parse_legacy_bbox(text: Optional[str]) -> tuple:
+        """Bounding box guardado como texto "(x, y, w, h)" -> 4 enteros (o None)"""
+        try:
+            values = tuple(int(v) for v in ast.literal_eval(text))
+            if len(values) == 4:
+                return values
+        except Exception:
+            pass
+        return (None, None, None, None)
+    
+    @staticmethod
+    def _parse_legacy_probabilities(text: Optional[str]) -> Optional[bytes]:
+        """Probabilidades guardadas como texto de un dict -> BLOB EMOTION_PROBS_STRUCT"""
+        try:
+            probabilities = ast.literal_eval(text)
+            if probabilities:
+                return EMOTION_PROBS_STRUCT.pack(
+                    *(float(probabilities.get(label, 0.0)) for label in MODEL_EMOTION_LABELS)
+                )
+        except Exception:
+            pass
+        return None
+    
+    @staticmethod
+    def to_epoch_ms(value: Union[str, datetime, int, float]) -> int:
+        """
+        Convierte un instante a epoch en milisegundos
+        
+        Args:
+            value: ISO 8601 (hora local), datetime, o epoch en ms
+        
+        Returns:
+            Epoch en milisegundos
+        """
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        if isinstance(value, datetime):
+            return int(value.timestamp() * 1000)
+        return int(value)
+    
     # ========================================================================
     # EMPLEADOS
     # ========================================================================
@@ -182,156 +453,403 @@ class Database:
             print(f"⚠️ Error agregando empleado: {e}")
             return False
     
+    # Columnas en el orden que esperan los constructores posicionales
+    _SELECT_EMPLOYEE_SQL = (
+        "SELECT employee_id, name, department, shift, consent_given, active FROM employees"
+    )
+    
+    @staticmethod
+    def _employee_from_row(row: tuple) -> Employee:
+        """Construye un Employee desde una fila de `_SELECT_EMPLOYEE_SQL`"""
+        employee_id, name, department, shift, consent_given, active = row
+        return Employee(
+            employee_id, name, department, shift,
+            consent_given=bool(consent_given), active=bool(active)
+        )
+    
     def get_employee(self, employee_id: str) -> Optional[Employee]:
         """Obtiene un empleado por ID"""
-        with self.get_connection() as conn:
+        with self.get_read_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                SELECT * FROM employees WHERE employee_id = ?
-            """, (employee_id,))
+            cursor.row_factory = None  # Tuplas: acceso posicional sin hash de columnas
+            cursor.execute(self._SELECT_EMPLOYEE_SQL + " WHERE employee_id = ?", (employee_id,))
             
             row = cursor.fetchone()
             if row:
-                return Employee(
-                    employee_id=row['employee_id'],
-                    name=row['name'],
-                    department=row['department'],
-                    shift=row['shift'],
-                    consent_given=bool(row['consent_given']),
-                    active=bool(row['active'])
-                )
+                return self._employee_from_row(row)
         return None
     
     def get_all_employees(self, active_only: bool = True) -> List[Employee]:
         """Obtiene todos los empleados"""
-        with self.get_connection() as conn:
+        with self.get_read_connection() as conn:
             cursor = conn.cursor()
-            query = "SELECT * FROM employees"
+            cursor.row_factory = None
+            query = self._SELECT_EMPLOYEE_SQL
             if active_only:
                 query += " WHERE active = 1"
             query += " ORDER BY name"
             
             cursor.execute(query)
-            return [
-                Employee(
-                    employee_id=row['employee_id'],
-                    name=row['name'],
-                    department=row['department'],
-                    shift=row['shift'],
-                    consent_given=bool(row['consent_given']),
-                    active=bool(row['active'])
-                )
-                for row in cursor.fetchall()
-            ]
+            # Iterar el cursor directamente: las filas se leen a medida que se construyen
+            return [self._employee_from_row(row) for row in cursor]
     
     # ========================================================================
     # DETECCIONES
     # ========================================================================
     
+    @staticmethod
+    def _detection_row(detection: DetectionEvent) -> tuple:
+        """Convierte un evento de detección en una fila para INSERT"""
+        return (
+            detection.session_id,
+            detection.employee_id,
+            detection.track_id,
+            Database.to_epoch_ms(detection.timestamp) if detection.timestamp else int(time.time() * 1000),
+            detection.emotion,
+            detection.confidence,
+            detection.stress_level,
+            detection.bbox_x,
+            detection.bbox_y,
+            detection.bbox_w,
+            detection.bbox_h,
+            detection.emotion_probabilities,
+            detection.processing_time_ms
+        )
+    
     def add_detection(self, detection: DetectionEvent) -> Optional[int]:
         """Agrega un evento de detección"""
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute("""
-                    INSERT INTO detection_events
-                    (session_id, employee_id, track_id, timestamp, emotion,
-                     confidence, stress_level, bounding_box, emotion_probabilities,
-                     processing_time_ms)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    detection.session_id,
-                    detection.employee_id,
-                    detection.track_id,
-                    detection.timestamp or datetime.now().isoformat(),
-                    detection.emotion,
-                    detection.confidence,
-                    detection.stress_level,
-                    detection.bounding_box,
-                    detection.emotion_probabilities,
-                    detection.processing_time_ms
-                ))
+                cursor.execute(_INSERT_DETECTION_SQL, self._detection_row(detection))
                 return cursor.lastrowid
         except Exception as e:
             print(f"⚠️ Error agregando detección: {e}")
             return None
     
+    def add_detections(self, detections: List[DetectionEvent]) -> int:
+        """
+        Agrega varios eventos de detección en una sola transacción
+        
+        Args:
+            detections: Eventos a insertar (típicamente los de un frame)
+        
+        Returns:
+            Número de filas insertadas
+        """
+        if not detections:
+            return 0
+        
+        try:
+            with self.get_connection() as conn:
+                conn.executemany(
+                    _INSERT_DETECTION_SQL,
+                    [self._detection_row(detection) for detection in detections]
+                )
+                return len(detections)
+        except Exception as e:
+            print(f"⚠️ Error agregando detecciones: {e}")
+            return 0
+    
+    def queue_detections(self, detections: List[DetectionEvent]):
+        """
+        Encola detecciones para escribirlas en el próximo lote (no bloquea)
+        
+        Args:
+            detections: Eventos a insertar
+        """
+        self._pending_detections.extend(detections)
+    
+    def flush_detections(self) -> int:
+        """
+        Escribe todas las detecciones encoladas en una sola transacción
+        
+        Returns:
+            Número de filas insertadas
+        """
+        batch = []
+        while self._pending_detections:
+            batch.append(self._pending_detections.popleft())
+        
+        written = self.add_detections(batch)
+        if batch and not written:
+            # Error transitorio (p. ej. "database is locked"): devolver el lote al frente
+            # de la cola, en su orden, para reintentarlo en el próximo flush
+            self._pending_detections.extendleft(reversed(batch))
+        return written
+    
+    def _flush_loop(self):
+        """Thread que vacía la cola de detecciones cada `flush_interval_s`"""
+        while not self._stop_flusher.wait(self.flush_interval_s):
+            self.flush_detections()
+    
     def get_detections(
         self,
         employee_id: Optional[str] = None,
-        start_time: Optional[str] = None,
-        end_time: Optional[str] = None,
-        limit: int = 1000
+        start_time: Optional[Union[str, datetime, int]] = None,
+        end_time: Optional[Union[str, datetime, int]] = None,
+        limit: Optional[int] = 1000
     ) -> List[DetectionEvent]:
-        """Obtiene detecciones con filtros"""
-        with self.get_connection() as conn:
+        """Obtiene detecciones con filtros (instantes en ISO, datetime o epoch ms)"""
+        return list(self.iter_detections(employee_id, start_time, end_time, limit))
+    
+    def get_high_stress_detections(
+        self,
+        employee_id: Optional[str] = None,
+        start_time: Optional[Union[str, datetime, int]] = None,
+        threshold: float = 0.7,
+        limit: Optional[int] = 1000
+    ) -> List[DetectionEvent]:
+        """
+        Obtiene detecciones con stress_level > threshold (filtro aplicado en SQL)
+        
+        Args:
+            employee_id: Filtrar por empleado
+            start_time: Instante inicial (ISO, datetime o epoch ms)
+            threshold: Nivel de estrés (0-1) que deben superar
+            limit: Máximo de filas (None = sin límite)
+        
+        Returns:
+            Detecciones de estrés alto, más recientes primero
+        """
+        return list(self.iter_detections(
+            employee_id, start_time, limit=limit, min_stress_level=threshold
+        ))
+    
+    def high_stress_stats(
+        self,
+        employee_id: Optional[str] = None,
+        start_ms: Optional[int] = None,
+        threshold: float = 0.7
+    ) -> Tuple[int, float]:
+        """
+        Cuenta y suma en SQL las detecciones con stress_level > threshold
+        
+        Args:
+            employee_id: Filtrar por empleado (None = todos)
+            start_ms: Instante inicial en epoch ms (None = sin límite)
+            threshold: Nivel de estrés (0-1) que deben superar
+        
+        Returns:
+            Tupla (número de detecciones, suma de su stress_level)
+        """
+        query = """
+            SELECT COUNT(*), COALESCE(SUM(stress_level), 0)
+            FROM detection_events WHERE stress_level > ?
+        """
+        params = [threshold]
+        
+        if employee_id:
+            query += " AND employee_id = ?"
+            params.append(employee_id)
+        
+        if start_ms is not None:
+            query += " AND timestamp >= ?"
+            params.append(int(start_ms))
+        
+        with self.get_read_connection() as conn:
             cursor = conn.cursor()
+            cursor.row_factory = None
+            count, total = cursor.execute(query, params).fetchone()
+        return int(count), float(total)
+    
+    def iter_detections(
+        self,
+        employee_id: Optional[str] = None,
+        start_time: Optional[Union[str, datetime, int]] = None,
+        end_time: Optional[Union[str, datetime, int]] = None,
+        limit: Optional[int] = None,
+        min_stress_level: Optional[float] = None
+    ) -> Iterator[DetectionEvent]:
+        """
+        Recorre detecciones con filtros sin materializar la lista completa
+        
+        Args:
+            employee_id: Filtrar por empleado
+            start_time: Instante inicial (ISO, datetime o epoch ms)
+            end_time: Instante final (ISO, datetime o epoch ms)
+            limit: Máximo de filas (None = sin límite)
+            min_stress_level: Solo detecciones con stress_level estrictamente mayor
+        
+        Yields:
+            DetectionEvent, más recientes primero
+        """
+        # Mismo orden de columnas que los campos de DetectionEvent
+        query = """
+            SELECT detection_id, session_id, employee_id, track_id, timestamp, emotion,
+                   confidence, stress_level, bbox_x, bbox_y, bbox_w, bbox_h,
+                   emotion_probabilities, processing_time_ms
+            FROM detection_events WHERE 1=1
+        """
+        params = []
+        
+        if employee_id:
+            query += " AND employee_id = ?"
+            params.append(employee_id)
+        
+        # Comparaciones enteras sobre epoch en ms
+        if start_time:
+            query += " AND timestamp >= ?"
+            params.append(self.to_epoch_ms(start_time))
+        
+        if end_time:
+            query += " AND timestamp <= ?"
+            params.append(self.to_epoch_ms(end_time))
+        
+        if min_stress_level is not None:
+            query += " AND stress_level > ?"
+            params.append(min_stress_level)
+        
+        # Páginas por keyset (timestamp, detection_id): la conexión se devuelve al pool
+        # entre páginas, así un iterador abandonado no la retiene
+        page_query = query + """
+            AND (timestamp < ? OR (timestamp = ? AND detection_id < ?))
+            ORDER BY timestamp DESC, detection_id DESC LIMIT ?
+        """
+        first_query = query + " ORDER BY timestamp DESC, detection_id DESC LIMIT ?"
+        
+        remaining = limit
+        last_key = None
+        while remaining is None or remaining > 0:
+            page_size = _DETECTIONS_PAGE_SIZE
+            if remaining is not None:
+                page_size = min(remaining, page_size)
+            with self.get_read_connection() as conn:
+                cursor = conn.cursor()
+                cursor.row_factory = None
+                if last_key is None:
+                    cursor.execute(first_query, params + [page_size])
+                else:
+                    timestamp, detection_id = last_key
+                    cursor.execute(page_query, params + [timestamp, timestamp, detection_id, page_size])
+                rows = cursor.fetchall()
             
-            query = "SELECT * FROM detection_events WHERE 1=1"
-            params = []
-            
-            if employee_id:
-                query += " AND employee_id = ?"
-                params.append(employee_id)
-            
-            if start_time:
-                query += " AND timestamp >= ?"
-                params.append(start_time)
-            
-            if end_time:
-                query += " AND timestamp <= ?"
-                params.append(end_time)
-            
-            query += " ORDER BY timestamp DESC LIMIT ?"
-            params.append(limit)
+            for row in rows:
+                yield DetectionEvent(*row)
             
-            cursor.execute(query, params)
+            if len(rows) < page_size:
+                return
+            last_key = (rows[-1][4], rows[-1][0])
+            if remaining is not None:
+                remaining -= len(rows)
+    
+    def rollup_stress_summary(self, window_minutes: int = 15) -> int:
+        """
+        Agrega en SQL las detecciones recientes en employee_stress_summary
+        
+        Args:
+            window_minutes: Ventana de detecciones a resumir
             
-            return [
-                DetectionEvent(
-                    detection_id=row['detection_id'],
-                    session_id=row['session_id'],
-                    employee_id=row['employee_id'],
-                    track_id=row['track_id'],
-                    timestamp=row['timestamp'],
-                    emotion=row['emotion'],
-                    confidence=row['confidence'],
-                    stress_level=row['stress_level'],
-                    bounding_box=row['bounding_box'],
-                    emotion_probabilities=row['emotion_probabilities'],
-                    processing_time_ms=row['processing_time_ms']
-                )
-                for row in cursor.fetchall()
-            ]
+        Returns:
+            Número de empleados resumidos
+        """
+        # Incluir las detecciones que aún esperan en la cola de escritura
+        self.flush_detections()
+        
+        end_ms = int(time.time() * 1000)
+        start_ms = end_ms - window_minutes * 60_000
+        
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    INSERT INTO employee_stress_summary
+                    (employee_id, timestamp, avg_stress_level, high_stress_count,
+                     predominant_emotion, total_detections)
+                    WITH recent AS (
+                        SELECT employee_id, emotion, stress_level
+                        FROM detection_events
+                        WHERE employee_id IS NOT NULL AND timestamp >= ? AND timestamp < ?
+                    ),
+                    emotion_counts AS (
+                        SELECT employee_id, emotion,
+                               ROW_NUMBER() OVER (
+                                   PARTITION BY employee_id ORDER BY COUNT(*) DESC
+                               ) AS position
+                        FROM recent
+                        GROUP BY employee_id, emotion
+                    )
+                    SELECT r.employee_id, ?, AVG(r.stress_level),
+                           SUM(r.stress_level > 0.7), e.emotion, COUNT(*)
+                    FROM recent r
+                    JOIN emotion_counts e
+                      ON e.employee_id = r.employee_id AND e.position = 1
+                    GROUP BY r.employee_id
+                """, (start_ms, end_ms, datetime.now().isoformat()))
+                return cursor.rowcount
+        except Exception as e:
+            print(f"⚠️ Error generando resumen de estrés: {e}")
+            return 0
     
     # ========================================================================
     # ALERTAS
     # ========================================================================
     
+    @staticmethod
+    def _alert_row(alert: Alert) -> tuple:
+        """Convierte una alerta en una fila para INSERT"""
+        return (
+            alert.employee_id,
+            alert.alert_type,
+            alert.severity,
+            alert.stress_level,
+            alert.timestamp,
+            alert.status,
+            alert.message
+        )
+    
     def add_alert(self, alert: Alert) -> Optional[int]:
         """Agrega una alerta"""
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute("""
-                    INSERT INTO alerts
-                    (employee_id, alert_type, severity, stress_level, timestamp,
-                     status, message)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    alert.employee_id,
-                    alert.alert_type,
-                    alert.severity,
-                    alert.stress_level,
-                    alert.timestamp,
-                    alert.status,
-                    alert.message
-                ))
+                cursor.execute(_INSERT_ALERT_SQL + _ALERT_VALUES_SQL, self._alert_row(alert))
                 return cursor.lastrowid
         except Exception as e:
             print(f"⚠️ Error agregando alerta: {e}")
             return None
     
+    def add_alerts(self, alerts: List[Alert]) -> List[int]:
+        """
+        Agrega varias alertas en una sola transacción
+        
+        Args:
+            alerts: Alertas a insertar
+        
+        Returns:
+            IDs asignados, alineados con `alerts` (lista vacía si falla)
+        """
+        if not alerts:
+            return []
+        
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                
+                if sqlite3.sqlite_version_info < (3, 35, 0):
+                    # Sin RETURNING: una sentencia por alerta, misma transacción
+                    alert_ids = []
+                    for alert in alerts:
+                        cursor.execute(_INSERT_ALERT_SQL + _ALERT_VALUES_SQL, self._alert_row(alert))
+                        alert_ids.append(cursor.lastrowid)
+                    return alert_ids
+                
+                alert_ids = []
+                for start in range(0, len(alerts), _ALERTS_PER_INSERT):
+                    chunk = alerts[start:start + _ALERTS_PER_INSERT]
+                    sql = (
+                        _INSERT_ALERT_SQL
+                        + ", ".join([_ALERT_VALUES_SQL.strip()] * len(chunk))
+                        + " RETURNING alert_id"
+                    )
+                    params = [value for alert in chunk for value in self._alert_row(alert)]
+                    # RETURNING no garantiza orden; los IDs se asignan crecientes en orden de VALUES
+                    alert_ids.extend(sorted(row[0] for row in cursor.execute(sql, params).fetchall()))
+                return alert_ids
+        except Exception as e:
+            print(f"⚠️ Error agregando alertas: {e}")
+            return []
+    
     def get_alerts(
         self,
         status: Optional[str] = None,
@@ -339,10 +857,16 @@ class Database:
         limit: int = 100
     ) -> List[Alert]:
         """Obtiene alertas con filtros"""
-        with self.get_connection() as conn:
+        with self.get_read_connection() as conn:
             cursor = conn.cursor()
+            cursor.row_factory = None
             
-            query = "SELECT * FROM alerts WHERE 1=1"
+            # Mismo orden de columnas que los campos de Alert
+            query = """
+                SELECT alert_id, employee_id, alert_type, severity, stress_level, timestamp,
+                       status, message, resolved_at, resolved_by
+                FROM alerts WHERE 1=1
+            """
             params = []
             
             if status:
@@ -358,21 +882,37 @@ class Database:
             
             cursor.execute(query, params)
             
-            return [
-                Alert(
-                    alert_id=row['alert_id'],
-                    employee_id=row['employee_id'],
-                    alert_type=row['alert_type'],
-                    severity=row['severity'],
-                    stress_level=row['stress_level'],
-                    timestamp=row['timestamp'],
-                    status=row['status'],
-                    message=row['message'],
-                    resolved_at=row['resolved_at'],
-                    resolved_by=row['resolved_by']
-                )
-                for row in cursor.fetchall()
-            ]
+            return [Alert(*row) for row in cursor]
+    
+    def count_alerts_between(
+        self,
+        start_time: Union[str, datetime],
+        end_time: Union[str, datetime]
+    ) -> int:
+        """
+        Cuenta las alertas generadas en un rango de fechas
+        
+        Args:
+            start_time: Instante inicial (ISO o datetime, hora local)
+            end_time: Instante final (ISO o datetime, hora local)
+        
+        Returns:
+            Número de alertas con timestamp en [start_time, end_time]
+        """
+        # Las alertas guardan ISO 8601 local: el orden de texto es el cronológico
+        if isinstance(start_time, datetime):
+            start_time = start_time.isoformat()
+        if isinstance(end_time, datetime):
+            end_time = end_time.isoformat()
+        
+        with self.get_read_connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            cursor.execute(
+                "SELECT COUNT(*) FROM alerts WHERE timestamp BETWEEN ? AND ?",
+                (start_time, end_time)
+            )
+            return cursor.fetchone()[0]
     
     def update_alert_status(
         self,
@@ -1,4 +1,60 @@
 """
 Detectors module
 """
+import threading
+from functools import lru_cache
+from typing import Optional
 
+# Evita que dos hilos construyan el mismo detector a la vez
+_factory_lock = threading.Lock()
+
+@lru_cache(maxsize=None)
+def _cached_face_detector(backend: str, min_face_size: int):
+    from core.detectors.face_detector import FaceDetector
+    return FaceDetector(backend=backend, min_face_size=min_face_size)
+
+@lru_cache(maxsize=None)
+def _cached_emotion_analyzer(use_ensemble: bool, inference_device: str):
+    from core.detectors.emotion_analyzer import EmotionAnalyzer
+    return EmotionAnalyzer(use_ensemble=use_ensemble, inference_device=inference_device)
+
+@lru_cache(maxsize=None)
+def _cached_face_recognizer(
+    enrollments_dir: str,
+    threshold: float,
+    inference_device: str,
+    embedding_cache_path: Optional[str]
+):
+    from core.detectors.face_recognizer import FaceRecognizer
+    embedding_cache = None
+    if embedding_cache_path is not None:
+        from core.utils.embedding_cache import EmbeddingCache
+        embedding_cache = EmbeddingCache(db_path=embedding_cache_path)
+    return FaceRecognizer(
+        enrollments_dir=enrollments_dir,
+        threshold=threshold,
+        inference_device=inference_device,
+        embedding_cache=embedding_cache
+    )
+
+def get_face_detector(backend: str = "mediapipe", min_face_size: int = 30):
+    """Retorna el FaceDetector compartido del proceso para esta configuración"""
+    with _factory_lock:
+        return _cached_face_detector(backend, min_face_size)
+
+def get_emotion_analyzer(use_ensemble: bool = False, inference_device: str = "cuda"):
+    """Retorna el EmotionAnalyzer compartido del proceso para esta configuración"""
+    with _factory_lock:
+        return _cached_emotion_analyzer(use_ensemble, inference_device)
+
+def get_face_recognizer(
+    enrollments_dir: str = "data/enrollments",
+    threshold: float = 0.70,
+    inference_device: str = "cuda",
+    embedding_cache_path: Optional[str] = None
+):
+    """Retorna el FaceRecognizer compartido del proceso para esta configuración"""
+    with _factory_lock:
+        return _cached_face_recognizer(
+            enrollments_dir, threshold, inference_device, embedding_cache_path
+        )
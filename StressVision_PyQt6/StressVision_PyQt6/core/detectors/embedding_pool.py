@@ -0,0 +1,123 @@
+"""
+🧮 Pool de Procesos para Embeddings
+Genera embeddings faciales en varios núcleos, fuera del GIL
+"""
+import os
+import threading
+import numpy as np
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import List, Optional
+
+# Reconocedor propio de cada proceso worker (se crea una sola vez en el initializer)
+_worker_recognizer = None
+
+def _init_worker(onnx_model_path: Optional[str], inference_device: str):
+    """Carga el modelo de embeddings una vez por proceso"""
+    global _worker_recognizer
+    os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "3")
+    if inference_device == "cpu":
+        # También TensorFlow (respaldo sin ONNX) debe quedar fuera de la GPU
+        os.environ["CUDA_VISIBLE_DEVICES"] = "-1"
+    
+    # Un hilo de OpenCV por worker: los procesos ya reparten los núcleos
+    import cv2
+    cv2.setNumThreads(1)
+    
+    from core.detectors.face_recognizer import FaceRecognizer
+    # Solo embeddings: los workers no leen ni migran la galería (la compara el proceso principal)
+    _worker_recognizer = FaceRecognizer(
+        onnx_model_path=onnx_model_path,
+        inference_device=inference_device,
+        load_gallery=False
+    )
+
+def _warm_up() -> bool:
+    """Tarea vacía para forzar el arranque de los workers"""
+    return _worker_recognizer is not None
+
+def _embed_chunk(face_rois: List[np.ndarray]) -> Optional[np.ndarray]:
+    """Genera los embeddings de un subconjunto de rostros"""
+    return _worker_recognizer.generate_embeddings(face_rois)
+
+class EmbeddingPool:
+    """
+    Pool persistente de procesos con el modelo de embeddings precargado
+    """
+    
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        onnx_model_path: Optional[str] = "models/facenet.onnx",
+        inference_device: str = "cpu"
+    ):
+        """
+        Inicializa el pool (los procesos arrancan en el primer uso, no aquí)
+        
+        Args:
+            max_workers: Número de procesos (por defecto min(4, núcleos))
+            onnx_model_path: Modelo Facenet ONNX que carga cada worker (si existe)
+            inference_device: Dispositivo de los workers; "cpu" por defecto para que
+                varios procesos no compitan por la misma GPU
+        """
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.onnx_model_path = onnx_model_path
+        self.inference_device = inference_device
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self._warm_ups: List[Future] = []
+        self._lock = threading.Lock()
+    
+    def _start(self):
+        """Arranca los workers; cada uno carga el modelo en segundo plano"""
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            initializer=_init_worker,
+            initargs=(self.onnx_model_path, self.inference_device)
+        )
+        self._warm_ups = [self.executor.submit(_warm_up) for _ in range(self.max_workers)]
+    
+    def ready(self) -> bool:
+        """
+        Indica si los workers ya cargaron el modelo; la primera llamada los arranca
+        
+        Returns:
+            True si el pool puede atender lotes sin esperar la carga de los modelos
+        """
+        with self._lock:
+            if self.executor is None:
+                self._start()
+            return all(future.done() for future in self._warm_ups)
+    
+    def generate_embeddings(self, face_rois: List[np.ndarray]) -> Optional[np.ndarray]:
+        """
+        Reparte los rostros entre los workers y une los embeddings
+        
+        Args:
+            face_rois: Lista de ROIs de rostros (BGR)
+            
+        Returns:
+            Matriz (N, D) alineada con la entrada o None si algún worker falla
+        """
+        if not face_rois or not self.ready():
+            # Mientras los workers cargan, el llamador calcula en su propio thread
+            return None
+        
+        chunk_size = -(-len(face_rois) // self.max_workers)
+        chunks = [face_rois[i:i + chunk_size] for i in range(0, len(face_rois), chunk_size)]
+        
+        try:
+            results = list(self.executor.map(_embed_chunk, chunks))
+        except Exception as e:
+            print(f"⚠️ Error en pool de embeddings: {e}")
+            return None
+        
+        if any(result is None for result in results):
+            return None
+        
+        return np.concatenate(results, axis=0)
+    
+    def shutdown(self):
+        """Detiene los procesos worker (si llegaron a arrancar)"""
+        with self._lock:
+            if self.executor is not None:
+                self.executor.shutdown(wait=False, cancel_futures=True)
+                self.executor = None
@@ -4,28 +4,115 @@ Usa DeepFace y modelos ensemble para análisis emocional
 """
 import cv2
 import numpy as np
-from typing import Dict, List, Optional
+from pathlib import Path
+from typing import List, Optional
 from deepface import DeepFace
-from core.utils.types import EmotionResult, EmotionType
+from core.detectors import onnx_runtime
+from core.utils.types import (
+    EmotionResult, EmotionId, EMOTION_IDS, EMOTION_NAMES, MODEL_EMOTION_LABELS
+)
+from core.utils.fastmath import clip_boxes
 import time
 
+# Pesos de estrés (angry + fear + sad) y fatiga (neutral + sad) alineados con las
+# columnas de MODEL_EMOTION_LABELS
+_STRESS_WEIGHTS = np.array(
+    [{'angry': 0.4, 'fear': 0.3, 'sad': 0.3}.get(label, 0.0) for label in MODEL_EMOTION_LABELS],
+    dtype=np.float32
+)
+_FATIGUE_WEIGHTS = np.array(
+    [{'neutral': 0.6, 'sad': 0.4}.get(label, 0.0) for label in MODEL_EMOTION_LABELS],
+    dtype=np.float32
+)
+_NEUTRAL_COLUMN = MODEL_EMOTION_LABELS.index('neutral')
+
+# Emoción base (mapeo directo) de cada columna del modelo
+_BASE_EMOTION_IDS = np.array([EMOTION_IDS[label] for label in MODEL_EMOTION_LABELS], dtype=np.int8)
+
 class EmotionAnalyzer:
     """
     Analizador de emociones con soporte para ensemble de modelos
     """
     
-    def __init__(self, use_ensemble: bool = False):
+    # Lado mínimo (px) de un ROI para analizarlo; los menores se reportan neutrales
+    MIN_ROI_SIZE = 20
+    
+    def __init__(
+        self,
+        use_ensemble: bool = False,
+        onnx_model_path: Optional[str] = "models/emotion.onnx",
+        quantized_model_path: Optional[str] = "models/emotion_int8.onnx",
+        inference_device: str = "cuda"
+    ):
         """
         Inicializa el analizador
         
         Args:
             use_ensemble: Si True, usa múltiples modelos para mejor precisión
+            onnx_model_path: Modelo de emociones exportado a ONNX (se usa si existe)
+            quantized_model_path: Variante INT8 del modelo ONNX (preferida en CPU si existe)
+            inference_device: "cuda" (GPU si está disponible) o "cpu" para ONNX Runtime
         """
         self.use_ensemble = use_ensemble
+        self.inference_device = inference_device
         self.fer_model = None
+        self.emotion_model = None
+        
+        # En CPU preferir el modelo INT8 (la entrada sigue siendo float32). Sus
+        # operadores cuantizados solo existen en el provider de CPU, así que con
+        # GPU disponible se prefiere el modelo FP32
+        if inference_device == "cuda" and onnx_runtime.has_gpu():
+            candidates = [(onnx_model_path, inference_device), (quantized_model_path, "cpu")]
+        else:
+            candidates = [(quantized_model_path, "cpu"), (onnx_model_path, inference_device)]
+        
+        for model_path, device in candidates:
+            if model_path and self.emotion_model is None:
+                self._load_onnx_model(model_path, device)
+        
+        # Sin ONNX: cargar el modelo Keras ahora y no en el primer frame analizado
+        if self.emotion_model is None:
+            try:
+                self._get_emotion_model()
+            except Exception as e:
+                print(f"⚠️ No se pudo cargar modelo de emociones: {e}")
         
         if use_ensemble:
             self._load_fer_model()
+        
+        self._warm_up()
+    
+    def _warm_up(self):
+        """Ejecuta una inferencia vacía (optimización del grafo, kernels, contexto CUDA) antes del primer frame"""
+        if self.emotion_model is None:
+            return
+        
+        self.analyze_faces_arrays([np.zeros((48, 48, 3), dtype=np.uint8)])
+    
+    def _load_onnx_model(self, model_path: str, device: str):
+        """Carga el modelo de emociones en ONNX Runtime si está disponible"""
+        if not onnx_runtime.is_available() or not Path(model_path).exists():
+            return
+        
+        try:
+            self.emotion_model = onnx_runtime.OnnxModel(model_path, device)
+            print(f"✅ Modelo de emociones ONNX cargado: {model_path}")
+        except Exception as e:
+            print(f"⚠️ No se pudo cargar modelo ONNX de emociones: {e}")
+    
+    def _get_emotion_model(self):
+        """Obtiene el modelo de emociones (ONNX si fue cargado, si no Keras de DeepFace)"""
+        if self.emotion_model is None:
+            try:
+                model = DeepFace.build_model("Emotion", task="facial_attribute")
+            except TypeError:
+                # Versiones antiguas de DeepFace no aceptan `task`
+                model = DeepFace.build_model("Emotion")
+            
+            # Las versiones recientes envuelven el modelo Keras en un cliente
+            self.emotion_model = getattr(model, "model", model)
+        
+        return self.emotion_model
     
     def _load_fer_model(self):
         """Carga modelo FER adicional para ensemble"""
@@ -51,95 +138,143 @@ class EmotionAnalyzer:
         Returns:
             EmotionResult con emoción detectada y probabilidades
         """
-        try:
-            # Análisis con DeepFace
-            analysis = DeepFace.analyze(
-                face_roi,
-                actions=['emotion'],
-                enforce_detection=False,
-                detector_backend='opencv',
-                silent=True
-            )
-            
-            # Normalizar resultado (DeepFace puede retornar lista o dict)
-            if isinstance(analysis, list):
-                analysis = analysis[0]
-            
-            emotions = analysis.get('emotion', {})
-            
-            # Obtener emoción dominante
-            dominant_emotion = analysis.get('dominant_emotion', 'neutral')
-            confidence = emotions.get(dominant_emotion, 0.0) / 100.0
-            
-            # Convertir probabilidades a formato 0-1
-            probabilities = {k: v / 100.0 for k, v in emotions.items()}
-            
-            # Mapear emociones a nuestro sistema
-            mapped_emotion = self._map_emotion(dominant_emotion, probabilities)
+        return self.analyze_faces_batch([face_roi])[0]
+    
+    def analyze_faces_batch(self, face_rois: List[np.ndarray]) -> List[EmotionResult]:
+        """
+        Analiza las emociones de varios rostros con una sola inferencia
+        
+        Args:
+            face_rois: Lista de ROIs de rostros (BGR)
             
-            return EmotionResult(
-                emotion=mapped_emotion,
-                confidence=confidence,
-                probabilities=probabilities,
-                timestamp=time.time()
+        Returns:
+            Lista de EmotionResult alineada con el orden de entrada
+        """
+        emotion_ids, confidences, probs = self.analyze_faces_arrays(face_rois)
+        timestamp = time.time()
+        
+        return [
+            EmotionResult(
+                emotion=EMOTION_NAMES[emotion_id],
+                confidence=float(confidence),
+                probabilities=(
+                    dict(zip(MODEL_EMOTION_LABELS, row.tolist())) if row.any() else {}
+                ),
+                timestamp=timestamp
             )
+            for emotion_id, confidence, row in zip(emotion_ids, confidences, probs)
+        ]
+    
+    def analyze_faces_arrays(self, face_rois: List[np.ndarray]):
+        """
+        Analiza las emociones de varios rostros y retorna arrays paralelos
+        
+        Args:
+            face_rois: Lista de ROIs de rostros (BGR)
             
+        Returns:
+            Tupla (emotion_ids int8 (N,), confidences float32 (N,),
+            probs float32 (N, 7) en orden MODEL_EMOTION_LABELS)
+        """
+        n = len(face_rois)
+        emotion_ids = np.full(n, EmotionId.NEUTRAL, dtype=np.int8)
+        confidences = np.zeros(n, dtype=np.float32)
+        probs = np.zeros((n, len(MODEL_EMOTION_LABELS)), dtype=np.float32)
+        
+        # ROIs vacíos o muy pequeños (giros rápidos de cabeza) quedan neutrales sin pasar por el modelo
+        valid = [
+            i for i, face_roi in enumerate(face_rois)
+            if face_roi is not None
+            and face_roi.shape[0] >= self.MIN_ROI_SIZE
+            and face_roi.shape[1] >= self.MIN_ROI_SIZE
+        ]
+        if not valid:
+            return emotion_ids, confidences, probs
+        
+        try:
+            model = self._get_emotion_model()
+            batch = self._preprocess_batch([face_rois[i] for i in valid], model.input_shape)
+            
+            # Una sola pasada del modelo para todos los rostros
+            predictions = np.asarray(model.predict(batch, verbose=0), dtype=np.float32)
         except Exception as e:
             print(f"⚠️ Error en análisis emocional: {e}")
-            # Retornar resultado neutral en caso de error
-            return EmotionResult(
-                emotion=EmotionType.NEUTRAL.value,
-                confidence=0.0,
-                probabilities={},
-                timestamp=time.time()
-            )
+            # Resultado neutral en caso de error
+            return emotion_ids, confidences, probs
+        
+        # Normalizar a distribución de probabilidad por fila
+        valid_probs = np.zeros_like(predictions)
+        totals = predictions.sum(axis=1, keepdims=True)
+        np.divide(predictions, totals, out=valid_probs, where=totals > 0)
+        probs[valid] = valid_probs
+        
+        dominant = valid_probs.argmax(axis=1)
+        confidences[valid] = valid_probs[np.arange(len(valid)), dominant]
+        
+        # Mapear emociones a nuestro sistema (todas las filas a la vez)
+        emotion_ids[valid] = self._map_emotions(valid_probs, dominant)
+        
+        return emotion_ids, confidences, probs
     
-    def _map_emotion(self, emotion: str, probabilities: Dict[str, float]) -> str:
+    def _preprocess_batch(self, face_rois: List[np.ndarray], input_shape) -> np.ndarray:
         """
-        Mapea emociones de DeepFace a nuestro sistema
+        Redimensiona y normaliza los ROIs en un único tensor (N, H, W, C)
         
         Args:
-            emotion: Emoción detectada por DeepFace
-            probabilities: Probabilidades de todas las emociones
+            face_rois: Lista de ROIs de rostros (BGR o escala de grises)
+            input_shape: Forma de entrada del modelo (None, H, W, C)
             
         Returns:
-            Emoción mapeada a nuestro sistema
+            Tensor float32 normalizado a 0-1
         """
-        # Mapeo directo
-        emotion_map = {
-            'angry': EmotionType.ANGRY.value,
-            'fear': EmotionType.FEAR.value,
-            'sad': EmotionType.SAD.value,
-            'disgust': EmotionType.DISGUST.value,
-            'happy': EmotionType.HAPPY.value,
-            'surprise': EmotionType.SURPRISE.value,
-            'neutral': EmotionType.NEUTRAL.value
-        }
-        
-        base_emotion = emotion_map.get(emotion, EmotionType.NEUTRAL.value)
-        
-        # Determinar si hay estrés o fatiga basado en combinaciones
-        # Estrés alto: angry + fear + sad con alta probabilidad
-        stress_score = (
-            probabilities.get('angry', 0) * 0.4 +
-            probabilities.get('fear', 0) * 0.3 +
-            probabilities.get('sad', 0) * 0.3
-        )
+        _, height, width, channels = input_shape
         
-        # Fatiga: neutral + sad con baja energía
-        fatigue_score = (
-            probabilities.get('neutral', 0) * 0.6 +
-            probabilities.get('sad', 0) * 0.4
+        if channels == 1:
+            face_rois = [
+                face_roi if face_roi.ndim == 2 else cv2.cvtColor(face_roi, cv2.COLOR_BGR2GRAY)
+                for face_roi in face_rois
+            ]
+        
+        # Resize + escala a 0-1 de todos los ROIs en una sola llamada de OpenCV
+        blob = cv2.dnn.blobFromImages(
+            face_rois, scalefactor=1.0 / 255.0, size=(width, height),
+            mean=0, swapRB=False, crop=False
         )
         
-        if stress_score > 0.6:
-            return EmotionType.STRESS_HIGH.value
-        elif stress_score > 0.4:
-            return EmotionType.STRESS_LOW.value
-        elif fatigue_score > 0.7 and probabilities.get('neutral', 0) > 0.5:
-            return EmotionType.FATIGUE.value
-        else:
-            return base_emotion
+        # (N, C, H, W) -> (N, H, W, C); con un canal es el mismo layout en memoria
+        if channels == 1:
+            return blob.reshape(len(face_rois), height, width, 1)
+        return np.ascontiguousarray(blob.transpose(0, 2, 3, 1))
+    
+    def _map_emotions(self, probs: np.ndarray, dominant: np.ndarray) -> np.ndarray:
+        """
+        Mapea las emociones de DeepFace a nuestro sistema para un lote de rostros
+        
+        Args:
+            probs: Probabilidades (N, 7) en orden MODEL_EMOTION_LABELS
+            dominant: Índice de la emoción dominante por fila (N,)
+            
+        Returns:
+            IDs de emoción int8 (N,) mapeados a nuestro sistema
+        """
+        stress_score = probs @ _STRESS_WEIGHTS
+        fatigue_score = probs @ _FATIGUE_WEIGHTS
+        neutral = probs[:, _NEUTRAL_COLUMN]
+        
+        # Prioridad: estrés alto, estrés bajo, fatiga y, si no, la emoción dominante
+        return np.select(
+            [
+                stress_score > 0.6,
+                stress_score > 0.4,
+                (fatigue_score > 0.7) & (neutral > 0.5)
+            ],
+            [
+                EmotionId.STRESS_HIGH,
+                EmotionId.STRESS_LOW,
+                EmotionId.FATIGUE
+            ],
+            default=_BASE_EMOTION_IDS[dominant]
+        ).astype(np.int8)
     
     def analyze_multiple_faces(self, frame: np.ndarray, face_regions: List) -> List[EmotionResult]:
         """
@@ -152,23 +287,17 @@ class EmotionAnalyzer:
         Returns:
             Lista de EmotionResult
         """
-        results = []
+        # Extraer ROIs con padding (esquinas recortadas al frame)
+        padding = 10
+        boxes = np.array([face_region.bbox for face_region in face_regions], dtype=np.int32).reshape(-1, 4)
+        corners = clip_boxes(boxes, frame.shape[1], frame.shape[0], padding)
         
-        for face_region in face_regions:
-            x, y, w, h = face_region.bbox
-            
-            # Extraer ROI con padding
-            padding = 10
-            x1 = max(0, x - padding)
-            y1 = max(0, y - padding)
-            x2 = min(frame.shape[1], x + w + padding)
-            y2 = min(frame.shape[0], y + h + padding)
-            
-            face_roi = frame[y1:y2, x1:x2]
-            
-            if face_roi.size > 0:
-                result = self.analyze_face(face_roi)
-                results.append(result)
+        face_rois = [
+            frame[y1:y2, x1:x2]
+            for x1, y1, x2, y2 in corners
+            if x2 > x1 and y2 > y1
+        ]
         
-        return results
+        # Un solo tensor (N, 48, 48, 1) y una sola pasada del modelo
+        return self.analyze_faces_batch(face_rois)
 
@@ -1,11 +1,15 @@
 """
 👁️ Detector Facial Multi-Rostro
-Soporta MediaPipe y OpenCV para detección en tiempo real
+Soporta UltraFace (ONNX), MediaPipe y OpenCV para detección en tiempo real
 """
 import cv2
+import threading
 import numpy as np
-from typing import List, Optional
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Optional, Tuple
 import mediapipe as mp
+from core.detectors import onnx_runtime
 from core.utils.types import FaceRegion
 
 class FaceDetector:
@@ -13,31 +17,101 @@ class FaceDetector:
     Detector facial que soporta múltiples backends
     """
     
-    def __init__(self, backend: str = "mediapipe", min_face_size: int = 30):
+    # Entrada y normalización de UltraFace (version-RFB-320)
+    ULTRAFACE_INPUT_SIZE = (320, 240)  # (ancho, alto)
+    ULTRAFACE_MEAN = 127.0
+    ULTRAFACE_STD = 128.0
+    
+    def __init__(
+        self,
+        backend: str = "mediapipe",
+        min_face_size: int = 30,
+        max_detection_size: int = 640,
+        ultraface_model_path: str = "models/ultraface-rfb-320.onnx",
+        score_threshold: float = 0.7,
+        nms_threshold: float = 0.3
+    ):
         """
         Inicializa el detector facial
         
         Args:
-            backend: "mediapipe" o "opencv"
+            backend: "mediapipe", "opencv", "ultraface" o "auto" (UltraFace si el
+                modelo y onnxruntime están disponibles, si no MediaPipe)
             min_face_size: Tamaño mínimo de rostro en píxeles
+            max_detection_size: Lado mayor del frame que recibe el detector; los
+                frames más grandes se reducen y los boxes se reescalan
+            ultraface_model_path: Modelo UltraFace ONNX
+            score_threshold: Confianza mínima de UltraFace
+            nms_threshold: IoU de supresión de no-máximos de UltraFace
         """
+        if backend == "auto":
+            backend = "ultraface" if self.ultraface_available(ultraface_model_path) else "mediapipe"
+        
         self.backend = backend
         self.min_face_size = min_face_size
+        self.max_detection_size = max_detection_size
+        # Buffers por thread: el detector se comparte entre cámaras
+        self._local = threading.local()
+        self.score_threshold = score_threshold
+        self.nms_threshold = nms_threshold
         
         if backend == "mediapipe":
             self._init_mediapipe()
         elif backend == "opencv":
             self._init_opencv()
+        elif backend == "ultraface":
+            self._init_ultraface(ultraface_model_path)
         else:
             raise ValueError(f"Backend no soportado: {backend}")
     
+    @staticmethod
+    def ultraface_available(model_path: str = "models/ultraface-rfb-320.onnx") -> bool:
+        """Indica si se puede usar el backend UltraFace"""
+        return onnx_runtime.is_available() and Path(model_path).exists()
+    
     def _init_mediapipe(self):
         """Inicializa MediaPipe Face Detection"""
         self.mp_face_detection = mp.solutions.face_detection
-        self.face_detection = self.mp_face_detection.FaceDetection(
+        # Pool de grafos: el grafo de MediaPipe serializa las llamadas concurrentes, así que
+        # cada detección toma uno libre y lo devuelve. Solo se crean tantos como llamadas
+        # simultáneas haya habido, sin importar cuántos threads pasen por el detector
+        self._mp_instances = []
+        self._mp_idle = []
+        self._mp_lock = threading.Lock()
+        # Crear el primero ya, para fallar en la inicialización y no en el primer frame
+        self._mp_idle.append(self._create_face_detection())
+    
+    def _create_face_detection(self):
+        """Construye un grafo de MediaPipe FaceDetection y lo registra para `release`"""
+        face_detection = self.mp_face_detection.FaceDetection(
             model_selection=1,  # 0: corto alcance, 1: largo alcance
             min_detection_confidence=0.5
         )
+        with self._mp_lock:
+            self._mp_instances.append(face_detection)
+        return face_detection
+    
+    @contextmanager
+    def _face_detection(self):
+        """Presta un grafo libre del pool (o crea uno si todos están en uso)"""
+        with self._mp_lock:
+            face_detection = self._mp_idle.pop() if self._mp_idle else None
+        if face_detection is None:
+            face_detection = self._create_face_detection()
+        
+        try:
+            yield face_detection
+        finally:
+            with self._mp_lock:
+                self._mp_idle.append(face_detection)
+    
+    def _buffer(self, name: str, shape: Tuple[int, ...], dtype=np.uint8) -> np.ndarray:
+        """Buffer reutilizable del thread actual (se reasigna solo si cambia la forma)"""
+        buffer = getattr(self._local, name, None)
+        if buffer is None or buffer.shape != shape:
+            buffer = np.empty(shape, dtype=dtype)
+            setattr(self._local, name, buffer)
+        return buffer
     
     def _init_opencv(self):
         """Inicializa OpenCV Haar Cascades"""
@@ -46,6 +120,13 @@ class FaceDetector:
         if self.face_cascade.empty():
             raise RuntimeError("No se pudo cargar el clasificador Haar Cascade")
     
+    def _init_ultraface(self, model_path: str):
+        """Inicializa UltraFace en ONNX Runtime con buffers reutilizables"""
+        session = onnx_runtime.get_session(model_path)
+        self.ultraface_session = session
+        self.ultraface_input_name = session.get_inputs()[0].name
+        self.ultraface_output_names = [output.name for output in session.get_outputs()]
+    
     def detect_faces(self, frame: np.ndarray) -> List[FaceRegion]:
         """
         Detecta rostros en un frame
@@ -56,67 +137,137 @@ class FaceDetector:
         Returns:
             Lista de FaceRegion detectadas
         """
+        boxes, scores = self.detect_faces_array(frame)
+        
+        return [
+            FaceRegion(x=x, y=y, width=w, height=h, confidence=score)
+            for (x, y, w, h), score in zip(boxes.tolist(), scores.tolist())
+        ]
+    
+    def detect_faces_array(self, frame: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Detecta rostros en un frame y retorna arrays
+        
+        Args:
+            frame: Frame BGR de OpenCV
+            
+        Returns:
+            Tupla (boxes int32 (N, 4) como (x, y, w, h), scores float32 (N,))
+        """
+        h, w = frame.shape[:2]
+        scale = min(1.0, self.max_detection_size / max(h, w))
+        
+        if scale < 1.0:
+            # Detectar sobre un frame reducido (buffer reutilizado por resolución)
+            size = (max(1, round(w * scale)), max(1, round(h * scale)))
+            small = self._buffer("small", (size[1], size[0], 3))
+            cv2.resize(frame, size, dst=small, interpolation=cv2.INTER_AREA)
+            frame = small
+        # Tamaño mínimo en la escala del frame reducido
+        min_size = max(1, round(self.min_face_size * scale))
+        
         if self.backend == "mediapipe":
-            return self._detect_mediapipe(frame)
+            boxes, scores = self._detect_mediapipe(frame, min_size)
+        elif self.backend == "ultraface":
+            boxes, scores = self._detect_ultraface(frame, min_size)
         else:
-            return self._detect_opencv(frame)
+            boxes, scores = self._detect_opencv(frame, min_size)
+        
+        if scale < 1.0 and len(boxes):
+            boxes = np.rint(boxes / scale).astype(np.int32)
+        return boxes, scores
     
-    def _detect_mediapipe(self, frame: np.ndarray) -> List[FaceRegion]:
+    def _detect_mediapipe(self, frame: np.ndarray, min_size: int) -> Tuple[np.ndarray, np.ndarray]:
         """Detección con MediaPipe"""
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.face_detection.process(rgb_frame)
+        # Reutilizar el buffer RGB mientras la resolución no cambie
+        rgb_frame = self._buffer("rgb", frame.shape)
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb_frame)
+        with self._face_detection() as face_detection:
+            results = face_detection.process(rgb_frame)
+        
+        if not results.detections:
+            return np.empty((0, 4), dtype=np.int32), np.empty(0, dtype=np.float32)
         
-        faces = []
         h, w = frame.shape[:2]
         
-        if results.detections:
-            for detection in results.detections:
-                bbox = detection.location_data.relative_bounding_box
-                
-                # Convertir coordenadas relativas a absolutas
-                x = int(bbox.xmin * w)
-                y = int(bbox.ymin * h)
-                width = int(bbox.width * w)
-                height = int(bbox.height * h)
-                
-                # Validar tamaño mínimo
-                if width >= self.min_face_size and height >= self.min_face_size:
-                    confidence = detection.score[0]
-                    faces.append(FaceRegion(
-                        x=x,
-                        y=y,
-                        width=width,
-                        height=height,
-                        confidence=float(confidence)
-                    ))
-        
-        return faces
+        # Convertir coordenadas relativas a absolutas
+        relative = np.array([
+            (bbox.xmin, bbox.ymin, bbox.width, bbox.height)
+            for bbox in (d.location_data.relative_bounding_box for d in results.detections)
+        ], dtype=np.float32)
+        boxes = (relative * np.array([w, h, w, h], dtype=np.float32)).astype(np.int32)
+        scores = np.array([d.score[0] for d in results.detections], dtype=np.float32)
+        
+        # Validar tamaño mínimo
+        keep = (boxes[:, 2] >= min_size) & (boxes[:, 3] >= min_size)
+        return boxes[keep], scores[keep]
     
-    def _detect_opencv(self, frame: np.ndarray) -> List[FaceRegion]:
+    def _detect_opencv(self, frame: np.ndarray, min_size: int) -> Tuple[np.ndarray, np.ndarray]:
         """Detección con OpenCV Haar Cascades"""
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
         detections = self.face_cascade.detectMultiScale(
             gray,
             scaleFactor=1.1,
             minNeighbors=5,
-            minSize=(self.min_face_size, self.min_face_size),
+            minSize=(min_size, min_size),
             flags=cv2.CASCADE_SCALE_IMAGE
         )
         
-        faces = []
-        for (x, y, w, h) in detections:
-            faces.append(FaceRegion(
-                x=int(x),
-                y=int(y),
-                width=int(w),
-                height=int(h),
-                confidence=0.8  # OpenCV no proporciona confidence
-            ))
-        
-        return faces
+        boxes = np.asarray(detections, dtype=np.int32).reshape(-1, 4)
+        # OpenCV no proporciona confidence
+        scores = np.full(len(boxes), 0.8, dtype=np.float32)
+        return boxes, scores
+    
+    def _detect_ultraface(self, frame: np.ndarray, min_size: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Detección con UltraFace (CNN ligera) en ONNX Runtime"""
+        h, w = frame.shape[:2]
+        
+        # Buffers reutilizados en cada frame
+        width, height = self.ULTRAFACE_INPUT_SIZE
+        resized = self._buffer("ultraface_resized", (height, width, 3))
+        rgb = self._buffer("ultraface_rgb", (height, width, 3))
+        blob = self._buffer("ultraface_input", (1, 3, height, width), np.float32)
+        
+        # BGR -> RGB, resize y normalización escribiendo en los buffers
+        cv2.resize(frame, self.ULTRAFACE_INPUT_SIZE, dst=resized)
+        cv2.cvtColor(resized, cv2.COLOR_BGR2RGB, dst=rgb)
+        np.subtract(rgb.transpose(2, 0, 1), self.ULTRAFACE_MEAN, out=blob[0], dtype=np.float32)
+        blob *= 1.0 / self.ULTRAFACE_STD
+        
+        scores, relative = self.ultraface_session.run(
+            self.ultraface_output_names, {self.ultraface_input_name: blob}
+        )
+        face_scores = scores[0, :, 1]
+        keep = face_scores > self.score_threshold
+        if not keep.any():
+            return np.empty((0, 4), dtype=np.int32), np.empty(0, dtype=np.float32)
+        
+        # (x1, y1, x2, y2) relativos -> (x, y, w, h) absolutos
+        corners = relative[0, keep] * np.array([w, h, w, h], dtype=np.float32)
+        face_scores = face_scores[keep].astype(np.float32)
+        boxes = np.empty_like(corners)
+        boxes[:, :2] = corners[:, :2]
+        boxes[:, 2:] = corners[:, 2:] - corners[:, :2]
+        
+        # Supresión de no-máximos
+        indices = cv2.dnn.NMSBoxes(
+            boxes.tolist(), face_scores.tolist(), self.score_threshold, self.nms_threshold
+        )
+        indices = np.asarray(indices, dtype=np.int32).reshape(-1)
+        boxes = boxes[indices].astype(np.int32)
+        face_scores = face_scores[indices]
+        
+        # Validar tamaño mínimo
+        keep = (boxes[:, 2] >= min_size) & (boxes[:, 3] >= min_size)
+        return boxes[keep], face_scores[keep]
     
     def release(self):
         """Libera recursos"""
-        if self.backend == "mediapipe" and hasattr(self, 'face_detection'):
-            self.face_detection.close()
+        if self.backend == "mediapipe":
+            with self._mp_lock:
+                for face_detection in self._mp_instances:
+                    face_detection.close()
+                self._mp_instances.clear()
+                self._mp_idle.clear()
+        self._local = threading.local()
 
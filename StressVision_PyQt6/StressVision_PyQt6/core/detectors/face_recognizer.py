@@ -8,45 +8,224 @@ import json
 from pathlib import Path
 from typing import Optional, Tuple, List, Dict
 from deepface import DeepFace
+from core.detectors import onnx_runtime
+from core.utils import fastmath
+from core.utils.embedding_cache import EmbeddingCache
 from core.utils.types import Employee
 import os
 
+try:
+    import simsimd
+except ImportError:
+    # SimSIMD es opcional: sin él se usan los kernels BLAS de NumPy
+    simsimd = None
+
+try:
+    import faiss
+except ImportError:
+    # FAISS es opcional: sin él se compara contra la matriz de la galería
+    faiss = None
+
 class FaceRecognizer:
     """
     Sistema de reconocimiento facial basado en embeddings
     """
     
-    def __init__(self, enrollments_dir: str = "data/enrollments", threshold: float = 0.70):
+    # Galería persistida: matriz (N, D) float32 y IDs alineados por fila
+    GALLERY_FILE = "gallery.npy"
+    GALLERY_IDS_FILE = "gallery_ids.json"
+    # Identifica el preprocesado de `_preprocess_batch` en la clave de la caché de embeddings
+    PREPROCESSING_ID = "pad-blob255"
+    
+    def __init__(
+        self,
+        enrollments_dir: str = "data/enrollments",
+        threshold: float = 0.70,
+        onnx_model_path: Optional[str] = "models/facenet.onnx",
+        inference_device: str = "cuda",
+        embedding_cache: Optional[EmbeddingCache] = None,
+        quantized_model_path: Optional[str] = "models/facenet_int8.onnx",
+        load_gallery: bool = True
+    ):
         """
         Inicializa el reconocedor
         
         Args:
             enrollments_dir: Directorio con embeddings de enrollment
             threshold: Umbral de similitud para reconocimiento (0-1)
+            onnx_model_path: Modelo Facenet exportado a ONNX (se usa si existe)
+            inference_device: "cuda" (GPU si está disponible) o "cpu" para ONNX Runtime
+            embedding_cache: Caché persistente de embeddings por hash del ROI (opcional)
+            quantized_model_path: Variante INT8 calibrada del modelo ONNX (preferida en CPU si existe)
+            load_gallery: Si False, solo genera embeddings (no lee ni migra la galería)
         """
         self.enrollments_dir = Path(enrollments_dir)
         self.enrollments_dir.mkdir(parents=True, exist_ok=True)
         self.threshold = threshold
+        self.inference_device = inference_device
+        self.embedding_cache = embedding_cache
         self.embeddings_cache: Dict[str, np.ndarray] = {}
-        self._load_embeddings()
+        # Galería apilada: fila i = embedding normalizado (L2) de self._ids[i]
+        self._ids: List[str] = []
+        self._matrix = np.empty((0, 0), dtype=np.float32)
+        # Misma galería cuantizada a int8 (escala 127) para los kernels de SimSIMD
+        self._matrix_i8 = np.empty((0, 0), dtype=np.int8)
+        # Índice FAISS exacto (L2) sobre self._matrix, si FAISS está instalado
+        self._index = None
+        self.embedding_model = None
+        
+        # Misma preferencia que EmotionAnalyzer: INT8 en CPU, FP32 con GPU disponible
+        if inference_device == "cuda" and onnx_runtime.has_gpu():
+            candidates = [(onnx_model_path, inference_device), (quantized_model_path, "cpu")]
+        else:
+            candidates = [(quantized_model_path, "cpu"), (onnx_model_path, inference_device)]
+        
+        for model_path, device in candidates:
+            if model_path and self.embedding_model is None:
+                self._load_onnx_model(model_path, device)
+        
+        if load_gallery:
+            self._load_embeddings()
+        self._warm_up()
+        
+        # La caché solo devuelve embeddings del mismo modelo y preprocesado
+        if self.embedding_cache is not None and self.embedding_model is not None:
+            self.embedding_cache.set_namespace(self._model_signature())
+    
+    def _load_onnx_model(self, model_path: str, device: str):
+        """Carga el modelo de embeddings en ONNX Runtime si está disponible"""
+        if not onnx_runtime.is_available() or not Path(model_path).exists():
+            return
+        
+        try:
+            self.embedding_model = onnx_runtime.OnnxModel(model_path, device)
+            print(f"✅ Modelo de embeddings ONNX cargado: {model_path}")
+        except Exception as e:
+            print(f"⚠️ No se pudo cargar modelo ONNX de embeddings: {e}")
+    
+    def _warm_up(self):
+        """Carga el modelo y ejecuta una inferencia vacía (grafo, contexto CUDA) antes del primer frame"""
+        try:
+            self._get_embedding_model()
+        except Exception as e:
+            print(f"⚠️ No se pudo cargar modelo de embeddings: {e}")
+            return
+        
+        self._compute_embeddings([np.zeros((160, 160, 3), dtype=np.uint8)])
+    
+    def _model_signature(self) -> str:
+        """Identifica el modelo resuelto (Keras, ONNX FP32 o INT8 y su versión) y el preprocesado"""
+        model = self.embedding_model
+        if isinstance(model, onnx_runtime.OnnxModel):
+            stat = os.stat(model.model_path)
+            backend = f"onnx:{Path(model.model_path).name}:{stat.st_size}:{stat.st_mtime_ns}"
+        else:
+            backend = "keras:Facenet"
+        return f"{backend}|{self.PREPROCESSING_ID}"
+    
+    def _get_embedding_model(self):
+        """Obtiene el modelo de embeddings (ONNX si fue cargado, si no Keras Facenet de DeepFace)"""
+        if self.embedding_model is None:
+            try:
+                model = DeepFace.build_model("Facenet", task="facial_recognition")
+            except TypeError:
+                # Versiones antiguas de DeepFace no aceptan `task`
+                model = DeepFace.build_model("Facenet")
+            
+            # Las versiones recientes envuelven el modelo Keras en un cliente
+            self.embedding_model = getattr(model, "model", model)
+        
+        return self.embedding_model
     
     def _load_embeddings(self):
-        """Carga todos los embeddings desde archivos JSON"""
+        """Carga la galería (matriz .npy + lista de IDs) o migra los JSON por empleado"""
         self.embeddings_cache = {}
         
+        gallery_path = self.enrollments_dir / self.GALLERY_FILE
+        ids_path = self.enrollments_dir / self.GALLERY_IDS_FILE
+        
+        if gallery_path.exists() and ids_path.exists():
+            try:
+                with open(ids_path, 'r') as f:
+                    ids = json.load(f)
+                # Una sola lectura de la matriz completa, sin parsear floats en Python
+                matrix = np.load(gallery_path, mmap_mode='r').astype(np.float32)
+                
+                if len(ids) == len(matrix):
+                    self.embeddings_cache = dict(zip(ids, matrix))
+                else:
+                    print(f"⚠️ Galería inconsistente ({len(ids)} IDs, {len(matrix)} embeddings)")
+            except Exception as e:
+                print(f"⚠️ Error cargando galería {gallery_path}: {e}")
+        else:
+            self._migrate_legacy_embeddings()
+        
+        self._rebuild_matrix()
+        print(f"✅ Cargados {len(self.embeddings_cache)} embeddings")
+    
+    def _migrate_legacy_embeddings(self):
+        """Migra (una sola vez) los antiguos `<id>_embedding.json` a la galería .npy"""
         for json_file in self.enrollments_dir.glob("*_embedding.json"):
             try:
                 with open(json_file, 'r') as f:
                     data = json.load(f)
                     employee_id = data.get('employee_id')
-                    embedding = np.array(data.get('embedding', []))
+                    embedding = np.asarray(data.get('embedding', []), dtype=np.float32)
                     
                     if employee_id and len(embedding) > 0:
                         self.embeddings_cache[employee_id] = embedding
             except Exception as e:
                 print(f"⚠️ Error cargando embedding {json_file}: {e}")
         
-        print(f"✅ Cargados {len(self.embeddings_cache)} embeddings")
+        if self.embeddings_cache:
+            self._ids = list(self.embeddings_cache)
+            try:
+                self._save_gallery()
+                print(f"✅ Migrados {len(self.embeddings_cache)} embeddings a {self.GALLERY_FILE}")
+            except Exception as e:
+                print(f"⚠️ Error migrando embeddings: {e}")
+    
+    def _save_gallery(self):
+        """Reescribe la galería de forma atómica (archivo temporal + os.replace)"""
+        gallery_path = self.enrollments_dir / self.GALLERY_FILE
+        ids_path = self.enrollments_dir / self.GALLERY_IDS_FILE
+        matrix = np.stack([self.embeddings_cache[i] for i in self._ids]).astype(np.float32, copy=False)
+        
+        tmp_gallery = gallery_path.with_name(gallery_path.name + ".tmp")
+        with open(tmp_gallery, 'wb') as f:
+            np.save(f, matrix)
+        
+        tmp_ids = ids_path.with_name(ids_path.name + ".tmp")
+        with open(tmp_ids, 'w') as f:
+            json.dump(self._ids, f)
+        
+        os.replace(tmp_gallery, gallery_path)
+        os.replace(tmp_ids, ids_path)
+    
+    def _rebuild_matrix(self):
+        """Apila los embeddings de la galería en una matriz (K, D) normalizada"""
+        self._ids = list(self.embeddings_cache)
+        if not self._ids:
+            self._matrix = np.empty((0, 0), dtype=np.float32)
+            self._matrix_i8 = np.empty((0, 0), dtype=np.int8)
+            self._index = None
+            return
+        
+        matrix = np.stack([self.embeddings_cache[i] for i in self._ids]).astype(np.float32, copy=False)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        self._matrix = np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+        self._matrix_i8 = self._quantize(self._matrix)
+        
+        if faiss is not None:
+            # IndexFlat solo copia la matriz (ya persistida en gallery.npy), así que
+            # se arma al cargar en vez de guardar un segundo archivo
+            self._index = faiss.IndexFlatL2(self._matrix.shape[1])
+            self._index.add(self._matrix)
+    
+    @staticmethod
+    def _quantize(normalized: np.ndarray) -> np.ndarray:
+        """Cuantiza embeddings normalizados (componentes en [-1, 1]) a int8"""
+        return np.rint(normalized * 127.0).astype(np.int8)
     
     def generate_embedding(self, face_roi: np.ndarray) -> Optional[np.ndarray]:
         """
@@ -58,25 +237,78 @@ class FaceRecognizer:
         Returns:
             Embedding vector o None si falla
         """
-        try:
-            # Usar DeepFace para generar embedding
-            embedding = DeepFace.represent(
-                face_roi,
-                model_name='Facenet',
-                enforce_detection=False,
-                silent=True
-            )
+        embeddings = self.generate_embeddings([face_roi])
+        return embeddings[0] if embeddings is not None else None
+    
+    def generate_embeddings(self, face_rois: List[np.ndarray]) -> Optional[np.ndarray]:
+        """
+        Genera los embeddings de varios rostros con una sola inferencia
+        
+        Args:
+            face_rois: Lista de ROIs de rostros (BGR)
             
-            if isinstance(embedding, list):
-                embedding = embedding[0]
+        Returns:
+            Matriz (N, D) float32 de embeddings alineada con la entrada o None si falla
+        """
+        if not face_rois:
+            return None
+        
+        if self.embedding_cache is not None:
+            # Solo los ROIs que no estén en caché pasan por el modelo
+            return self.embedding_cache.get_or_compute(face_rois, self._compute_embeddings)
+        
+        return self._compute_embeddings(face_rois)
+    
+    def _compute_embeddings(self, face_rois: List[np.ndarray]) -> Optional[np.ndarray]:
+        """Ejecuta el modelo de embeddings sobre un lote de ROIs (sin caché)"""
+        try:
+            model = self._get_embedding_model()
+            batch = self._preprocess_batch(face_rois, model.input_shape)
             
-            embedding_vector = np.array(embedding.get('embedding', []))
-            return embedding_vector
+            # Una sola pasada del modelo para todos los rostros
+            return np.asarray(model.predict(batch, verbose=0), dtype=np.float32)
             
         except Exception as e:
             print(f"⚠️ Error generando embedding: {e}")
             return None
     
+    def _preprocess_batch(self, face_rois: List[np.ndarray], input_shape) -> np.ndarray:
+        """
+        Ajusta los ROIs al tamaño del modelo (manteniendo aspecto) en un tensor (N, H, W, 3)
+        
+        Args:
+            face_rois: Lista de ROIs de rostros (BGR)
+            input_shape: Forma de entrada del modelo (None, H, W, 3)
+            
+        Returns:
+            Tensor float32 normalizado a 0-1
+        """
+        _, height, width, _ = input_shape
+        
+        # Letterbox como DeepFace.represent: completar cada ROI con negro (centrado) hasta
+        # el aspecto del modelo; el resize de blobFromImages ya no lo deforma
+        padded = []
+        for face_roi in face_rois:
+            roi_h, roi_w = face_roi.shape[:2]
+            pad_h = max(0, round(roi_w * height / width) - roi_h)
+            pad_w = max(0, round(roi_h * width / height) - roi_w)
+            if pad_h or pad_w:
+                face_roi = cv2.copyMakeBorder(
+                    face_roi,
+                    pad_h // 2, pad_h - pad_h // 2, pad_w // 2, pad_w - pad_w // 2,
+                    cv2.BORDER_CONSTANT, value=0
+                )
+            padded.append(face_roi)
+        
+        # Resize + escala a 0-1 de todos los ROIs en una sola llamada de OpenCV
+        blob = cv2.dnn.blobFromImages(
+            padded, scalefactor=1.0 / 255.0, size=(width, height),
+            mean=0, swapRB=False, crop=False
+        )
+        
+        # (N, C, H, W) -> (N, H, W, C)
+        return np.ascontiguousarray(blob.transpose(0, 2, 3, 1))
+    
     def recognize_face(self, face_roi: np.ndarray) -> Tuple[Optional[str], float]:
         """
         Reconoce un rostro comparando con embeddings registrados
@@ -87,28 +319,106 @@ class FaceRecognizer:
         Returns:
             Tupla (employee_id, confidence) o (None, 0.0) si no hay match
         """
-        # Generar embedding del rostro
-        query_embedding = self.generate_embedding(face_roi)
+        return self.recognize_faces_batch([face_roi])[0]
+    
+    def recognize_faces_batch(self, face_rois: List[np.ndarray]) -> List[Tuple[Optional[str], float]]:
+        """
+        Reconoce varios rostros generando sus embeddings en una sola inferencia
+        
+        Args:
+            face_rois: Lista de ROIs de rostros (BGR)
+            
+        Returns:
+            Lista de tuplas (employee_id, confidence) alineada con la entrada
+        """
+        if not face_rois:
+            return []
+        
+        if len(self.embeddings_cache) == 0:
+            return [(None, 0.0)] * len(face_rois)
         
-        if query_embedding is None or len(self.embeddings_cache) == 0:
-            return (None, 0.0)
+        # Generar embeddings de todos los rostros
+        query_embeddings = self.generate_embeddings(face_rois)
         
-        # Comparar con todos los embeddings registrados
-        best_match = None
-        best_similarity = 0.0
+        return self.match_embeddings(query_embeddings, len(face_rois))
+    
+    def match_embeddings(
+        self,
+        query_embeddings: Optional[np.ndarray],
+        count: int
+    ) -> List[Tuple[Optional[str], float]]:
+        """
+        Compara embeddings ya calculados (p. ej. en un pool de procesos) con la galería
         
-        for employee_id, stored_embedding in self.embeddings_cache.items():
-            similarity = self._cosine_similarity(query_embedding, stored_embedding)
+        Args:
+            query_embeddings: Matriz (N, D) de embeddings o None si fallaron
+            count: Número de rostros consultados
             
-            if similarity > best_similarity:
-                best_similarity = similarity
-                best_match = employee_id
+        Returns:
+            Lista de tuplas (employee_id, confidence) alineada con la entrada
+        """
+        if query_embeddings is None or len(self._ids) == 0:
+            return [(None, 0.0)] * count
         
-        # Verificar umbral
-        if best_similarity >= self.threshold:
-            return (best_match, best_similarity)
+        # Similitud coseno de todos los rostros contra toda la galería; se normaliza
+        # una copia para no modificar los embeddings del llamador
+        queries = np.array(query_embeddings, dtype=np.float32, copy=True).reshape(len(query_embeddings), -1)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        np.divide(queries, norms, out=queries, where=norms > 0)
+        
+        if self._index is not None:
+            # Vecino más cercano exacto con los kernels SIMD de FAISS; sobre
+            # vectores unitarios la similitud coseno es 1 - L2²/2
+            distances, indices = self._index.search(np.ascontiguousarray(queries), 1)
+            best = indices[:, 0]
+            best_similarities = 1.0 - distances[:, 0] / 2.0
+            # Vectores nulos no se parecen a nada
+            best_similarities[(norms[:, 0] == 0) | ~self._matrix[best].any(axis=1)] = 0.0
         else:
-            return (None, best_similarity)
+            similarities = self._similarity_matrix(queries, norms)
+            best = similarities.argmax(axis=1)
+            best_similarities = similarities[np.arange(len(queries)), best]
+        
+        # Similitudes negativas cuentan como 0 (sin match)
+        best_similarities = np.maximum(best_similarities, 0.0).tolist()
+        
+        return [
+            (self._ids[index], similarity) if similarity >= self.threshold else (None, similarity)
+            for index, similarity in zip(best.tolist(), best_similarities)
+        ]
+    
+    def _similarity_matrix(self, queries: np.ndarray, norms: np.ndarray) -> np.ndarray:
+        """Similitudes coseno (N, K) de consultas normalizadas contra toda la galería"""
+        if simsimd is not None:
+            # Kernels SIMD (AVX2/AVX-512/NEON) de distancia coseno sobre int8:
+            # 4× menos bytes por fila de la galería que en float32
+            similarities = 1.0 - np.asarray(
+                simsimd.cdist(self._quantize(queries), self._matrix_i8, metric="cosine"),
+                dtype=np.float32
+            )
+            # Vectores nulos no se parecen a nada (SimSIMD les asigna distancia 0)
+            similarities[norms[:, 0] == 0] = 0.0
+            similarities[:, ~self._matrix.any(axis=1)] = 0.0
+            return similarities
+        
+        if fastmath.NUMBA_AVAILABLE:
+            # Kernel JIT (LLVM autovectoriza el bucle FP32), una fila de consultas por hilo
+            return fastmath.batch_cosine(np.ascontiguousarray(queries), self._matrix)
+        
+        # Un solo matmul sobre la galería normalizada
+        return queries @ self._matrix.T
+    
+    def _match_embedding(self, query_embedding: np.ndarray) -> Tuple[Optional[str], float]:
+        """
+        Compara un embedding con todos los embeddings registrados
+        
+        Args:
+            query_embedding: Embedding del rostro a reconocer
+            
+        Returns:
+            Tupla (employee_id, confidence) o (None, similitud) si no supera el umbral
+        """
+        return self.match_embeddings(query_embedding[np.newaxis], 1)[0]
     
     def _cosine_similarity(self, vec1: np.ndarray, vec2: np.ndarray) -> float:
         """
@@ -121,74 +431,114 @@ class FaceRecognizer:
         Returns:
             Similitud coseno (0-1)
         """
-        dot_product = np.dot(vec1, vec2)
-        norm1 = np.linalg.norm(vec1)
-        norm2 = np.linalg.norm(vec2)
+        vec1 = np.asarray(vec1, dtype=np.float32)
+        vec2 = np.asarray(vec2, dtype=np.float32)
         
-        if norm1 == 0 or norm2 == 0:
+        if simsimd is not None:
+            if not vec1.any() or not vec2.any():
+                return 0.0
+            return 1.0 - float(simsimd.cosine(vec1, vec2))
+        
+        if fastmath.NUMBA_AVAILABLE:
+            return float(fastmath.cosine_similarity(
+                np.ascontiguousarray(vec1.ravel()), np.ascontiguousarray(vec2.ravel())
+            ))
+        
+        # Un solo sqrt sobre el producto de normas al cuadrado (sin np.linalg.norm)
+        denominator = float(np.vdot(vec1, vec1) * np.vdot(vec2, vec2))
+        if denominator == 0:
             return 0.0
         
-        return dot_product / (norm1 * norm2)
+        return float(np.dot(vec1, vec2) / np.sqrt(denominator))
     
-    def enroll_employee(self, employee_id: str, face_samples: List[np.ndarray]) -> bool:
+    @staticmethod
+    def _enrollment_quality(embeddings: np.ndarray) -> Tuple[float, np.ndarray]:
+        """
+        Similitud coseno media entre pares distintos de muestras
+        
+        Args:
+            embeddings: Matriz (K, D) de embeddings, K >= 2
+            
+        Returns:
+            Tupla (calidad, centroide): media de las K·(K-1) similitudes y promedio
+            de las muestras normalizadas, a su vez normalizado (L2)
+        """
+        k = len(embeddings)
+        normalized = np.array(embeddings, dtype=np.float32)  # Copia: se normaliza in situ
+        norms = np.linalg.norm(normalized, axis=1, keepdims=True)
+        np.divide(normalized, norms, out=normalized, where=norms > 0)
+        
+        # La suma de las K² similitudes es K²·||centroide||²: O(K·D) sin la matriz de Gram
+        centroid = normalized.mean(axis=0)
+        total = k * k * float(centroid @ centroid)
+        # Se descuenta la diagonal (autosimilitud: 1, o 0 para vectores nulos)
+        self_similarity = float(np.count_nonzero(norms))
+        quality = (total - self_similarity) / (k * (k - 1))
+        
+        centroid_norm = np.sqrt(total) / k
+        if centroid_norm > 0:
+            centroid /= centroid_norm
+        return quality, centroid
+    
+    def _embed_samples(self, face_samples: List[np.ndarray]) -> np.ndarray:
+        """Embeddings (K, D) float32 de las muestras válidas de enrollment"""
+        batch = self.generate_embeddings(face_samples)
+        if batch is not None:
+            return batch
+        
+        # Si el lote falla, muestra por muestra para descartar solo las inválidas
+        valid = [
+            embedding for embedding in map(self.generate_embedding, face_samples)
+            if embedding is not None
+        ]
+        return np.stack(valid) if valid else np.empty((0, 0), dtype=np.float32)
+    
+    def enroll_employee(
+        self,
+        employee_id: str,
+        face_samples: List[np.ndarray],
+        embeddings: Optional[np.ndarray] = None
+    ) -> bool:
         """
         Registra un nuevo empleado con múltiples muestras
         
         Args:
             employee_id: ID del empleado
             face_samples: Lista de muestras faciales
+            embeddings: Embeddings (K, D) ya calculados de las muestras (p. ej. por un
+                detector que los entrega en la misma pasada); si se dan, no se
+                ejecuta el modelo de embeddings
             
         Returns:
             True si el enrollment fue exitoso
         """
-        if len(face_samples) < 3:
+        if len(face_samples) < 3 and embeddings is None:
             print("⚠️ Se requieren al menos 3 muestras para enrollment")
             return False
         
-        embeddings = []
-        
-        # Generar embeddings de todas las muestras
-        for sample in face_samples:
-            embedding = self.generate_embedding(sample)
-            if embedding is not None:
-                embeddings.append(embedding)
+        if embeddings is not None:
+            embeddings = np.asarray(embeddings, dtype=np.float32)
+        else:
+            # Generar embeddings de todas las muestras en una sola inferencia
+            embeddings = self._embed_samples(face_samples)
         
         if len(embeddings) < 3:
             print("⚠️ No se pudieron generar suficientes embeddings")
             return False
         
-        # Calcular embedding promedio
-        avg_embedding = np.mean(embeddings, axis=0)
-        
-        # Calcular calidad (similitud entre muestras)
-        similarities = []
-        for i in range(len(embeddings)):
-            for j in range(i + 1, len(embeddings)):
-                sim = self._cosine_similarity(embeddings[i], embeddings[j])
-                similarities.append(sim)
-        
-        quality_score = np.mean(similarities) if similarities else 0.0
+        # Calcular calidad (similitud media entre pares de muestras) y el embedding
+        # promedio: centroide normalizado de las muestras (float32, como la galería)
+        quality_score, avg_embedding = self._enrollment_quality(embeddings)
         
         if quality_score < 0.70:
             print(f"⚠️ Calidad de enrollment baja: {quality_score:.2f}")
             return False
         
-        # Guardar embedding
-        embedding_data = {
-            'employee_id': employee_id,
-            'embedding': avg_embedding.tolist(),
-            'quality_score': float(quality_score),
-            'num_samples': len(embeddings)
-        }
-        
-        json_path = self.enrollments_dir / f"{employee_id}_embedding.json"
-        
         try:
-            with open(json_path, 'w') as f:
-                json.dump(embedding_data, f, indent=2)
-            
-            # Actualizar cache
+            # Actualizar cache, galería apilada y archivo .npy
             self.embeddings_cache[employee_id] = avg_embedding
+            self._rebuild_matrix()
+            self._save_gallery()
             
             # Guardar muestras
             samples_dir = self.enrollments_dir / f"{employee_id}_samples"
@@ -0,0 +1,187 @@
+"""
+🎯 Tracker Facial por IoU
+Asocia rostros entre frames para no repetir el reconocimiento
+"""
+import numpy as np
+from typing import Tuple
+from core.utils.fastmath import iou_matrix
+from core.utils.types import MODEL_EMOTION_LABELS
+
+class FaceTracker:
+    """
+    Tracker ligero que asocia detecciones con los tracks del frame anterior por IoU
+    """
+    
+    def __init__(self, iou_threshold: float = 0.5, max_missed: int = 5, emotion_refresh: int = 3):
+        """
+        Inicializa el tracker
+        
+        Args:
+            iou_threshold: IoU mínima para considerar que es el mismo rostro
+            max_missed: Frames analizados sin coincidencia antes de descartar un track
+            emotion_refresh: Frames analizados que se reutiliza la emoción de un empleado reconocido
+        """
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.emotion_refresh = emotion_refresh
+        self._next_track_id = 0
+        
+        # Estado de los tracks en arrays paralelos
+        self.bboxes = np.empty((0, 4), dtype=np.int32)
+        self.track_ids = np.empty(0, dtype=np.int32)
+        self.employee_ids = np.empty(0, dtype=object)
+        self.recognition_confidences = np.empty(0, dtype=np.float32)
+        self.ttl = np.empty(0, dtype=np.int32)
+        
+        # Última emoción analizada de cada track y frames desde ese análisis
+        self.emotion_ids = np.empty(0, dtype=np.int8)
+        self.emotion_confidences = np.empty(0, dtype=np.float32)
+        self.emotion_probs = np.empty((0, len(MODEL_EMOTION_LABELS)), dtype=np.float32)
+        self.emotion_ages = np.empty(0, dtype=np.int32)
+    
+    def match(self, boxes: np.ndarray) -> np.ndarray:
+        """
+        Asocia cada detección con un track previo (asignación greedy por IoU)
+        
+        Args:
+            boxes: Bounding boxes (N, 4) como (x, y, w, h)
+            
+        Returns:
+            Índice del track asociado a cada detección, o -1 si es un rostro nuevo
+        """
+        track_index = np.full(len(boxes), -1, dtype=np.int32)
+        if len(boxes) == 0 or len(self.bboxes) == 0:
+            return track_index
+        
+        iou = iou_matrix(boxes, self.bboxes)
+        
+        # Cada detección toma su mejor track; cada track se asigna una sola vez
+        best_track = iou.argmax(axis=1)
+        best_iou = iou[np.arange(len(boxes)), best_track]
+        taken = np.zeros(len(self.bboxes), dtype=bool)
+        for i in np.argsort(-best_iou):
+            track = best_track[i]
+            if best_iou[i] < self.iou_threshold:
+                break
+            if not taken[track]:
+                taken[track] = True
+                track_index[i] = track
+        
+        return track_index
+    
+    def identities(self, track_index: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Identidades conocidas de los tracks asociados
+        
+        Args:
+            track_index: Resultado de `match`
+            
+        Returns:
+            Tupla (employee_ids object (N,), recognition_confidences float32 (N,))
+        """
+        employee_ids = np.full(len(track_index), None, dtype=object)
+        confidences = np.zeros(len(track_index), dtype=np.float32)
+        
+        matched = track_index >= 0
+        employee_ids[matched] = self.employee_ids[track_index[matched]]
+        confidences[matched] = self.recognition_confidences[track_index[matched]]
+        return employee_ids, confidences
+    
+    def emotions(self, track_index: np.ndarray, employee_ids: np.ndarray):
+        """
+        Emociones reutilizables de los tracks asociados
+        
+        Solo se reutiliza la emoción de empleados ya reconocidos y analizada hace
+        menos de `emotion_refresh` frames; el resto debe pasar por el modelo.
+        
+        Args:
+            track_index: Resultado de `match`
+            employee_ids: Identidades conocidas (resultado de `identities`)
+            
+        Returns:
+            Tupla (emotion_ids int8 (N,), confidences float32 (N,), probs float32 (N, 7),
+            ages int32 (N,), stale bool (N,) con los rostros a analizar)
+        """
+        n = len(track_index)
+        emotion_ids = np.zeros(n, dtype=np.int8)
+        confidences = np.zeros(n, dtype=np.float32)
+        probs = np.zeros((n, len(MODEL_EMOTION_LABELS)), dtype=np.float32)
+        ages = np.zeros(n, dtype=np.int32)
+        
+        matched = track_index >= 0
+        tracks = track_index[matched]
+        emotion_ids[matched] = self.emotion_ids[tracks]
+        confidences[matched] = self.emotion_confidences[tracks]
+        probs[matched] = self.emotion_probs[tracks]
+        ages[matched] = self.emotion_ages[tracks] + 1
+        
+        recognized = np.array([employee_id is not None for employee_id in employee_ids], dtype=bool)
+        stale = ~(matched & recognized & (ages < self.emotion_refresh))
+        ages[stale] = 0
+        return emotion_ids, confidences, probs, ages, stale
+    
+    def update(
+        self,
+        boxes: np.ndarray,
+        track_index: np.ndarray,
+        employee_ids: np.ndarray,
+        recognition_confidences: np.ndarray,
+        emotion_ids: np.ndarray,
+        emotion_confidences: np.ndarray,
+        emotion_probs: np.ndarray,
+        emotion_ages: np.ndarray
+    ) -> np.ndarray:
+        """
+        Actualiza los tracks con las detecciones del frame
+        
+        Args:
+            boxes: Bounding boxes (N, 4) del frame
+            track_index: Resultado de `match` para esas detecciones
+            employee_ids: Identidad final de cada detección
+            recognition_confidences: Confianza de reconocimiento de cada detección
+            emotion_ids: Emoción de cada detección
+            emotion_confidences: Confianza de la emoción de cada detección
+            emotion_probs: Probabilidades (N, 7) de cada detección
+            emotion_ages: Frames desde que se analizó la emoción (0 = analizada ahora)
+            
+        Returns:
+            Track ID de cada detección (N,) int32
+        """
+        # Envejecer los tracks que no aparecieron en este frame
+        missed = np.ones(len(self.bboxes), dtype=bool)
+        missed[track_index[track_index >= 0]] = False
+        self.ttl[missed] -= 1
+        
+        # Asignar IDs nuevos a los rostros sin track
+        track_ids = np.empty(len(boxes), dtype=np.int32)
+        matched = track_index >= 0
+        track_ids[matched] = self.track_ids[track_index[matched]]
+        new_count = int((~matched).sum())
+        track_ids[~matched] = np.arange(self._next_track_id, self._next_track_id + new_count)
+        self._next_track_id += new_count
+        
+        # Tracks vigentes: las detecciones actuales + los perdidos que aún tienen ttl
+        keep = missed & (self.ttl > 0)
+        self.bboxes = np.concatenate([boxes.astype(np.int32), self.bboxes[keep]])
+        self.track_ids = np.concatenate([track_ids, self.track_ids[keep]])
+        self.employee_ids = np.concatenate([employee_ids, self.employee_ids[keep]])
+        self.recognition_confidences = np.concatenate([
+            recognition_confidences.astype(np.float32), self.recognition_confidences[keep]
+        ])
+        self.ttl = np.concatenate([
+            np.full(len(boxes), self.max_missed, dtype=np.int32), self.ttl[keep]
+        ])
+        self.emotion_ids = np.concatenate([
+            emotion_ids.astype(np.int8), self.emotion_ids[keep]
+        ])
+        self.emotion_confidences = np.concatenate([
+            emotion_confidences.astype(np.float32), self.emotion_confidences[keep]
+        ])
+        self.emotion_probs = np.concatenate([
+            emotion_probs.astype(np.float32), self.emotion_probs[keep]
+        ])
+        self.emotion_ages = np.concatenate([
+            emotion_ages.astype(np.int32), self.emotion_ages[keep]
+        ])
+        
+        return track_ids
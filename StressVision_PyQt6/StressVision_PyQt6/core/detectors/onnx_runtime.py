@@ -0,0 +1,149 @@
+"""
+⚡ Sesiones ONNX Runtime
+Carga sesiones de inferencia optimizadas y cacheadas por modelo
+"""
+import os
+import threading
+import numpy as np
+from functools import lru_cache
+from pathlib import Path
+from typing import Union
+
+try:
+    import onnxruntime as ort
+except ImportError:
+    # ONNX Runtime es opcional: sin él se usan los modelos Keras de DeepFace
+    ort = None
+
+# Serializa la creación de sesiones (lru_cache no evita cargas duplicadas concurrentes)
+_session_lock = threading.Lock()
+
+# Caché de engines TensorRT (construirlos tarda minutos; se reutilizan entre ejecuciones)
+TRT_CACHE_DIR = "trt_cache"
+
+def is_available() -> bool:
+    """Indica si ONNX Runtime está instalado"""
+    return ort is not None
+
+def has_gpu() -> bool:
+    """Indica si ONNX Runtime puede ejecutar en GPU (CUDA o TensorRT)"""
+    if ort is None:
+        return False
+    available = ort.get_available_providers()
+    return "CUDAExecutionProvider" in available or "TensorrtExecutionProvider" in available
+
+def get_session(model_path: str, device: str = "cuda"):
+    """
+    Crea (una sola vez por ruta y dispositivo) una sesión de inferencia optimizada
+    
+    Args:
+        model_path: Ruta al modelo .onnx
+        device: "cuda" (TensorRT/CUDA si están disponibles, si no CPU) o "cpu"
+    
+    Returns:
+        onnxruntime.InferenceSession
+    """
+    with _session_lock:
+        return _create_session(model_path, device)
+
+def _get_providers(device: str) -> list:
+    """Execution providers en orden de preferencia, filtrados por disponibilidad"""
+    providers = []
+    if device == "cuda":
+        providers = [
+            ("TensorrtExecutionProvider", {
+                "trt_fp16_enable": True,
+                "trt_engine_cache_enable": True,
+                "trt_engine_cache_path": TRT_CACHE_DIR
+            }),
+            "CUDAExecutionProvider"
+        ]
+    elif device != "cpu":
+        raise ValueError(f"Dispositivo no soportado: {device}")
+    providers.append("CPUExecutionProvider")
+    
+    available = ort.get_available_providers()
+    providers = [
+        provider for provider in providers
+        if (provider[0] if isinstance(provider, tuple) else provider) in available
+    ]
+    
+    if "TensorrtExecutionProvider" in available and device == "cuda":
+        Path(TRT_CACHE_DIR).mkdir(exist_ok=True)
+    
+    return providers
+
+@lru_cache(maxsize=None)
+def _create_session(model_path: str, device: str):
+    """Construye la sesión; cacheada por ruta de modelo y dispositivo"""
+    if ort is None:
+        raise RuntimeError("onnxruntime no está instalado")
+    
+    sess_options = ort.SessionOptions()
+    # ORT_ENABLE_ALL fusiona BatchNorm en Conv, entre otras optimizaciones
+    sess_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    sess_options.intra_op_num_threads = max(1, (os.cpu_count() or 2) // 2)
+    # Los modelos son cadenas lineales de capas: el paralelismo útil está dentro de cada operador
+    sess_options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    
+    # Usar GPU (TensorRT FP16, luego CUDA) si está disponible, con CPU como respaldo
+    return ort.InferenceSession(
+        model_path, sess_options=sess_options, providers=_get_providers(device)
+    )
+
+class OnnxModel:
+    """
+    Modelo ONNX con la misma interfaz que un modelo Keras (`input_shape`, `predict`)
+    """
+    
+    def __init__(self, model_path: Union[str, Path], device: str = "cuda"):
+        """
+        Inicializa el modelo
+        
+        Args:
+            model_path: Ruta al modelo .onnx
+            device: "cuda" o "cpu" (ver `get_session`)
+        """
+        self.model_path = str(model_path)
+        self.session = get_session(self.model_path, device)
+        
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.input_shape = tuple(
+            dim if isinstance(dim, int) else None
+            for dim in model_input.shape
+        )
+        self.output_names = [output.name for output in self.session.get_outputs()]
+        
+        # En GPU se rellena el lote a potencias de 2: TensorRT construye un engine por
+        # forma de entrada y cuDNN busca algoritmos por forma, así se limitan a unas pocas
+        self.on_gpu = self.session.get_providers()[0] != "CPUExecutionProvider"
+        self.pad_batch = self.on_gpu and self.input_shape[0] is None
+    
+    def predict(self, batch: np.ndarray, verbose: int = 0) -> np.ndarray:
+        """
+        Ejecuta la inferencia sobre un lote
+        
+        Args:
+            batch: Tensor de entrada (N, H, W, C) float32
+            verbose: Ignorado (compatibilidad con Keras)
+        
+        Returns:
+            Salida principal del modelo
+        """
+        n = len(batch)
+        if self.pad_batch and n & (n - 1):
+            padded = np.zeros((1 << (n - 1).bit_length(),) + batch.shape[1:], dtype=batch.dtype)
+            padded[:n] = batch
+            batch = padded
+        
+        try:
+            return self.session.run(self.output_names, {self.input_name: batch})[0][:n]
+        except Exception as e:
+            if not self.on_gpu:
+                raise
+            # Respaldo en CPU si la GPU falla (memoria agotada, driver, etc.)
+            print(f"⚠️ Inferencia en GPU falló, usando CPU: {e}")
+            self.session = get_session(self.model_path, "cpu")
+            self.on_gpu = self.pad_batch = False
+            return self.session.run(self.output_names, {self.input_name: batch})[0][:n]
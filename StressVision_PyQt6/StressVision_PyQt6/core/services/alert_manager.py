@@ -2,8 +2,9 @@
 🚨 Gestor de Alertas Automáticas
 Monitorea detecciones y genera alertas según patrones
 """
+import time
 from typing import List, Optional, Dict
-from datetime import datetime, timedelta
+from datetime import datetime
 from collections import defaultdict
 from core.utils.types import Alert, AlertType, AlertSeverity, AlertStatus
 from core.database.database import Database
@@ -38,8 +39,8 @@ class AlertManager:
         self.alert_window_minutes = alert_window_minutes
         self.cooldown_minutes = cooldown_minutes
         
-        # Historial de alertas generadas (para cooldown)
-        self.last_alert_times: Dict[str, datetime] = {}
+        # Historial de alertas generadas (para cooldown), en segundos de time.monotonic
+        self.last_alert_times: Dict[str, float] = {}
     
     def check_and_generate_alerts(
         self,
@@ -54,43 +55,50 @@ class AlertManager:
         Returns:
             Lista de alertas generadas
         """
-        alerts = []
+        # Alertas nuevas (clave de cooldown, alerta) que se guardan juntas al final
+        pending = []
         
-        # Obtener detecciones recientes
-        window_start = datetime.now() - timedelta(minutes=self.alert_window_minutes)
-        detections = self.db.get_detections(
+        # Conteo y suma de las detecciones recientes de estrés alto (agregados en SQL,
+        # sin límite de filas ni materializar las detecciones)
+        window_start_ms = int((time.time() - self.alert_window_minutes * 60) * 1000)
+        stress_count, stress_sum = self.db.high_stress_stats(
             employee_id=employee_id,
-            start_time=window_start.isoformat()
+            start_ms=window_start_ms,
+            threshold=0.7
         )
         
-        # Filtrar solo detecciones de estrés alto
-        stress_detections = [
-            d for d in detections
-            if d.stress_level and d.stress_level > 0.7
-        ]
-        
         # Verificar umbral
-        if len(stress_detections) >= self.alert_threshold:
+        if stress_count >= self.alert_threshold:
             alert_key = f"high_stress_{employee_id or 'global'}"
             
             # Verificar cooldown
             if self._can_generate_alert(alert_key):
                 alert = self._create_high_stress_alert(
                     employee_id=employee_id,
-                    stress_detections=stress_detections
+                    stress_count=stress_count,
+                    avg_stress=stress_sum / stress_count
                 )
                 
                 if alert:
-                    alert_id = self.db.add_alert(alert)
-                    if alert_id:
-                        alert.alert_id = alert_id
-                        alerts.append(alert)
-                        self.last_alert_times[alert_key] = datetime.now()
+                    pending.append((alert_key, alert))
         
         # Verificar fatiga
         fatigue_alert = self._check_fatigue(employee_id)
         if fatigue_alert:
-            alerts.append(fatigue_alert)
+            pending.append((f"fatigue_{employee_id or 'global'}", fatigue_alert))
+        
+        if not pending:
+            return []
+        
+        # Una sola transacción para todas las alertas nuevas
+        alert_ids = self.db.add_alerts([alert for _, alert in pending])
+        
+        alerts = []
+        now = time.monotonic()
+        for (alert_key, alert), alert_id in zip(pending, alert_ids):
+            alert.alert_id = alert_id
+            alerts.append(alert)
+            self.last_alert_times[alert_key] = now
         
         return alerts
     
@@ -99,23 +107,16 @@ class AlertManager:
         if alert_key not in self.last_alert_times:
             return True
         
-        last_time = self.last_alert_times[alert_key]
-        elapsed = (datetime.now() - last_time).total_seconds() / 60.0
-        
-        return elapsed >= self.cooldown_minutes
+        elapsed = time.monotonic() - self.last_alert_times[alert_key]
+        return elapsed >= self.cooldown_minutes * 60
     
     def _create_high_stress_alert(
         self,
         employee_id: Optional[str],
-        stress_detections: List
+        stress_count: int,
+        avg_stress: float
     ) -> Optional[Alert]:
         """Crea alerta de estrés alto prolongado"""
-        # Calcular nivel de estrés promedio
-        avg_stress = sum(
-            d.stress_level for d in stress_detections
-            if d.stress_level
-        ) / len(stress_detections)
-        
         # Determinar severidad
         if avg_stress > 0.8:
             severity = AlertSeverity.HIGH.value
@@ -128,7 +129,7 @@ class AlertManager:
         if employee_id:
             message = f"Empleado {employee_id} muestra niveles altos de estrés prolongado"
         else:
-            message = f"Se detectaron {len(stress_detections)} eventos de estrés alto en {self.alert_window_minutes} minutos"
+            message = f"Se detectaron {stress_count} eventos de estrés alto en {self.alert_window_minutes} minutos"
         
         alert = Alert(
             alert_id=0,  # Se asignará al guardar
@@ -144,7 +145,7 @@ class AlertManager:
         return alert
     
     def _check_fatigue(self, employee_id: Optional[str]) -> Optional[Alert]:
-        """Verifica condiciones de fatiga"""
+        """Verifica condiciones de fatiga (retorna la alerta sin guardar)"""
         distribution = self.stress_calculator.get_emotion_distribution(
             employee_id=employee_id,
             hours=1
@@ -168,12 +169,7 @@ class AlertManager:
                     status=AlertStatus.PENDING.value,
                     message=f"Se detectó fatiga en {'empleado ' + employee_id if employee_id else 'múltiples personas'}"
                 )
-                
-                alert_id = self.db.add_alert(alert)
-                if alert_id:
-                    alert.alert_id = alert_id
-                    self.last_alert_times[alert_key] = datetime.now()
-                    return alert
+                return alert
         
         return None
     
@@ -3,8 +3,12 @@
 Genera reportes cada 15 minutos con estadísticas agregadas
 """
 import json
+import queue
+import threading
+import time
+from collections import Counter
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, Optional
 from core.database.database import Database
 from core.services.stress_calculator import StressCalculator
 
@@ -30,7 +34,14 @@ class ReportGenerator:
         self.db = database
         self.stress_calculator = stress_calculator
         self.report_interval_minutes = report_interval_minutes
-        self.last_report_time: Optional[datetime] = None
+        # Instante (time.monotonic) del último reporte generado
+        self.last_report_time: Optional[float] = None
+        
+        # Los INSERT de reportes los hace un thread aparte: generate_report no
+        # espera el commit de SQLite. None en la cola detiene el thread
+        self._write_queue: "queue.Queue[Optional[Dict]]" = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="report-writer", daemon=True)
+        self._writer.start()
     
     def generate_report(self) -> Optional[Dict]:
         """
@@ -42,49 +53,57 @@ class ReportGenerator:
         # Calcular ventana de tiempo
         end_time = datetime.now()
         start_time = end_time - timedelta(minutes=self.report_interval_minutes)
-        
-        # Obtener detecciones del período
-        detections = self.db.get_detections(
-            start_time=start_time.isoformat(),
-            end_time=end_time.isoformat(),
-            limit=10000
-        )
-        
-        if not detections:
+        self.last_report_time = time.monotonic()
+        
+        # Filtros de la consulta directamente en epoch ms (sin ISO de ida y vuelta)
+        end_ms = int(end_time.timestamp() * 1000)
+        start_ms = end_ms - self.report_interval_minutes * 60_000
+        
+        # Recorrer las detecciones del período en una sola pasada (sin lista completa)
+        total_detections = 0
+        stress_sum = 0.0
+        stress_count = 0
+        emotion_distribution = Counter()
+        employee_stats = {}
+        
+        for detection in self.db.iter_detections(start_time=start_ms, end_time=end_ms):
+            # Cada campo se lee una sola vez por detección
+            employee_id = detection.employee_id
+            emotion = detection.emotion
+            stress_level = detection.stress_level
+            total_detections += 1
+            
+            # Nivel de estrés promedio
+            if stress_level is not None:
+                stress_sum += stress_level
+                stress_count += 1
+            
+            # Distribución de emociones
+            emotion_distribution[emotion or 'unknown'] += 1
+            
+            # Acumulados por empleado
+            if employee_id:
+                stats = employee_stats.get(employee_id)
+                if stats is None:
+                    stats = employee_stats[employee_id] = {
+                        'count': 0, 'stress_sum': 0.0, 'stress_count': 0, 'emotions': Counter()
+                    }
+                stats['count'] += 1
+                if stress_level:
+                    stats['stress_sum'] += stress_level
+                    stats['stress_count'] += 1
+                if emotion:
+                    stats['emotions'][emotion] += 1
+        
+        if total_detections == 0:
             return None
         
-        # Calcular estadísticas
-        total_detections = len(detections)
-        
         # Empleados únicos detectados
-        employees_detected = set(
-            d.employee_id for d in detections
-            if d.employee_id
-        )
-        num_employees_detected = len(employees_detected)
-        
-        # Nivel de estrés promedio
-        stress_levels = [
-            d.stress_level for d in detections
-            if d.stress_level is not None
-        ]
-        avg_stress_level = sum(stress_levels) / len(stress_levels) if stress_levels else 0.0
-        
-        # Distribución de emociones
-        emotion_distribution = {}
-        for detection in detections:
-            emotion = detection.emotion or 'unknown'
-            emotion_distribution[emotion] = emotion_distribution.get(emotion, 0) + 1
-        
-        # Alertas generadas en el período
-        alerts = self.db.get_alerts(
-            limit=1000
-        )
-        alerts_in_period = [
-            a for a in alerts
-            if start_time <= datetime.fromisoformat(a.timestamp) <= end_time
-        ]
-        alerts_generated = len(alerts_in_period)
+        num_employees_detected = len(employee_stats)
+        avg_stress_level = stress_sum / stress_count if stress_count else 0.0
+        
+        # Alertas generadas en el período (conteo por índice en SQL)
+        alerts_generated = self.db.count_alerts_between(start_time, end_time)
         
         # Crear reporte
         report_data = {
@@ -94,9 +113,9 @@ class ReportGenerator:
             'total_detections': total_detections,
             'employees_detected': num_employees_detected,
             'avg_stress_level': round(avg_stress_level, 2),
-            'emotion_distribution': emotion_distribution,
+            'emotion_distribution': dict(emotion_distribution),
             'alerts_generated': alerts_generated,
-            'employee_details': self._get_employee_details(employees_detected, detections)
+            'employee_details': self._get_employee_details(employee_stats)
         }
         
         # Guardar en base de datos
@@ -104,41 +123,40 @@ class ReportGenerator:
         
         return report_data
     
-    def _get_employee_details(
-        self,
-        employee_ids: set,
-        detections: List
-    ) -> Dict:
-        """Obtiene detalles por empleado"""
+    def _get_employee_details(self, employee_stats: Dict) -> Dict:
+        """Obtiene detalles por empleado a partir de los acumulados del período"""
         details = {}
         
-        for employee_id in employee_ids:
-            employee_detections = [
-                d for d in detections
-                if d.employee_id == employee_id
-            ]
+        for employee_id, stats in employee_stats.items():
+            emotions = stats['emotions']
+            predominant_emotion = emotions.most_common(1)[0][0] if emotions else 'unknown'
             
-            if employee_detections:
-                stress_levels = [
-                    d.stress_level for d in employee_detections
-                    if d.stress_level
-                ]
-                
-                emotions = [d.emotion for d in employee_detections if d.emotion]
-                predominant_emotion = max(
-                    set(emotions),
-                    key=emotions.count
-                ) if emotions else 'unknown'
-                
-                details[employee_id] = {
-                    'detection_count': len(employee_detections),
-                    'avg_stress_level': sum(stress_levels) / len(stress_levels) if stress_levels else 0.0,
-                    'predominant_emotion': predominant_emotion
-                }
+            details[employee_id] = {
+                'detection_count': stats['count'],
+                'avg_stress_level': (
+                    stats['stress_sum'] / stats['stress_count'] if stats['stress_count'] else 0.0
+                ),
+                'predominant_emotion': predominant_emotion
+            }
         
         return details
     
     def _save_report(self, report_data: Dict):
+        """Encola el reporte para guardarlo en la base de datos (no bloquea)"""
+        self._write_queue.put(report_data)
+    
+    def _write_loop(self):
+        """Thread que guarda los reportes encolados"""
+        while True:
+            report_data = self._write_queue.get()
+            try:
+                if report_data is None:
+                    return
+                self._insert_report(report_data)
+            finally:
+                self._write_queue.task_done()
+    
+    def _insert_report(self, report_data: Dict):
         """Guarda el reporte en la base de datos"""
         try:
             with self.db.get_connection() as conn:
@@ -166,13 +184,23 @@ class ReportGenerator:
         if self.last_report_time is None:
             return True
         
-        elapsed = (datetime.now() - self.last_report_time).total_seconds() / 60.0
-        return elapsed >= self.report_interval_minutes
+        elapsed = time.monotonic() - self.last_report_time
+        return elapsed >= self.report_interval_minutes * 60
+    
+    def close(self):
+        """Guarda los reportes pendientes y detiene el thread de escritura"""
+        if self._writer.is_alive():
+            self._write_queue.put(None)
+            self._writer.join()
     
     def get_latest_report(self) -> Optional[Dict]:
         """Obtiene el último reporte generado"""
+        # Incluir los reportes que aún esperan en la cola de escritura
+        if self._writer.is_alive():
+            self._write_queue.join()
+        
         try:
-            with self.db.get_connection() as conn:
+            with self.db.get_read_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute("""
                     SELECT report_data FROM reports_15min
@@ -2,15 +2,132 @@
 📊 Calculadora de Índice de Estrés
 Mantiene historial y calcula métricas de estrés por colaborador
 """
-from collections import deque
-from typing import Dict, List, Optional
-from datetime import datetime, timedelta
+import numpy as np
+from typing import Dict, Optional, Tuple
 from core.utils.types import (
-    EmotionResult, StressEvent, NEGATIVE_EMOTIONS,
-    EmotionType
+    EmotionResult, NEGATIVE_MASK,
+    EmotionType, EMOTION_IDS, EMOTION_NAMES
 )
+from core.utils import fastmath
 import time
 
+# Tabla 0/1 de emociones negativas indexada por el byte del ID de emoción: cubre
+# los 256 valores posibles, así el gather no necesita comprobar límites
+_NEGATIVE_LUT = np.zeros(256, dtype=np.uint8)
+_NEGATIVE_LUT[:len(EMOTION_NAMES)] = (NEGATIVE_MASK >> np.arange(len(EMOTION_NAMES))) & 1
+
+class EmotionHistory:
+    """
+    Historial circular de emociones en formato Structure-of-Arrays
+    """
+    
+    def __init__(self, capacity: int):
+        """
+        Inicializa el historial
+        
+        Args:
+            capacity: Máximo número de emociones conservadas
+        """
+        self.capacity = capacity
+        self.codes = np.zeros(capacity, dtype=np.int8)  # ID en EMOTION_NAMES
+        self.timestamps = np.zeros(capacity, dtype=np.float64)  # Epoch (s)
+        self.confidences = np.zeros(capacity, dtype=np.float32)
+        # Total de emociones agregadas; la siguiente se escribe en head % capacity
+        self.head = 0
+    
+    def __len__(self) -> int:
+        return min(self.head, self.capacity)
+    
+    def append(self, code: int, timestamp: float, confidence: float):
+        """Agrega una emoción, sobrescribiendo la más antigua si está lleno"""
+        position = self.head % self.capacity
+        self.codes[position] = code
+        self.timestamps[position] = timestamp
+        self.confidences[position] = confidence
+        self.head += 1
+    
+    def recent_codes(self, count: int) -> np.ndarray:
+        """IDs de las últimas `count` emociones (sin orden garantizado)"""
+        size = len(self)
+        count = min(count, size)
+        if self.head <= self.capacity:
+            return self.codes[size - count:size]
+        return self.codes[np.arange(self.head - count, self.head) % self.capacity]
+    
+    def last_code(self) -> Optional[int]:
+        """ID de la última emoción o None si está vacío"""
+        if self.head == 0:
+            return None
+        return int(self.codes[(self.head - 1) % self.capacity])
+    
+    def clear(self):
+        """Vacía el historial"""
+        self.head = 0
+
+class StressEventLog:
+    """
+    Eventos de estrés en formato Structure-of-Arrays (crece por duplicación)
+    """
+    
+    def __init__(self, capacity: int = 256):
+        """
+        Inicializa el registro
+        
+        Args:
+            capacity: Capacidad inicial de los arreglos
+        """
+        self.timestamps = np.zeros(capacity, dtype=np.float64)  # Epoch (s), crecientes
+        self.stress_index = np.zeros(capacity, dtype=np.float32)  # 0-100
+        self.emotion_ids = np.zeros(capacity, dtype=np.int8)  # -1 = desconocida
+        self.employee_codes = np.zeros(capacity, dtype=np.int32)  # -1 = global
+        self._employee_codes: Dict[str, int] = {}
+        self.size = 0
+    
+    def __len__(self) -> int:
+        return self.size
+    
+    def append(
+        self,
+        timestamp: float,
+        stress_index: float,
+        emotion_id: int,
+        employee_id: Optional[str]
+    ):
+        """Registra un evento en la posición `size`"""
+        if self.size == len(self.timestamps):
+            for name in ("timestamps", "stress_index", "emotion_ids", "employee_codes"):
+                array = getattr(self, name)
+                grown = np.zeros(2 * len(array), dtype=array.dtype)
+                grown[:self.size] = array
+                setattr(self, name, grown)
+        
+        i = self.size
+        self.timestamps[i] = timestamp
+        self.stress_index[i] = stress_index
+        self.emotion_ids[i] = emotion_id
+        self.employee_codes[i] = (
+            self._employee_codes.setdefault(employee_id, len(self._employee_codes))
+            if employee_id else -1
+        )
+        self.size += 1
+    
+    def _mask(self, employee_id: Optional[str]) -> Optional[np.ndarray]:
+        """Máscara de los eventos del empleado (None = todos)"""
+        if employee_id is None:
+            return None
+        code = self._employee_codes.get(employee_id, -2)
+        return self.employee_codes[:self.size] == code
+    
+    def count(self, employee_id: Optional[str] = None) -> int:
+        """Número de eventos del empleado (None = todos)"""
+        mask = self._mask(employee_id)
+        return self.size if mask is None else int(np.count_nonzero(mask))
+    
+    def clear(self):
+        """Vacía el registro"""
+        self.size = 0
+        self._employee_codes.clear()
+
 class StressCalculator:
     """
     Calculadora de índice de estrés con historial temporal
@@ -27,17 +144,22 @@ class StressCalculator:
         self.max_history = max_history
         self.window_size = window_size
         
-        # Historial por empleado: {employee_id: deque}
-        self.employee_histories: Dict[str, deque] = {}
+        # Historial por empleado: {employee_id: EmotionHistory}
+        self.employee_histories: Dict[str, EmotionHistory] = {}
         
         # Historial global
-        self.global_history: deque = deque(maxlen=max_history)
+        self.global_history = EmotionHistory(max_history)
         
-        # Eventos de estrés
-        self.stress_events: List[StressEvent] = []
+        # Eventos de estrés (StressEventLog, ya no una lista de StressEvent: len() y
+        # count(employee_id) dan los totales; los campos son arreglos hasta `size`)
+        self.stress_events = StressEventLog()
         
         # Métricas agregadas
         self.metrics: Dict[str, Dict] = {}
+        
+        # Último índice de estrés por historial (None = global): (head, ventana, valor).
+        # Solo se recalcula cuando llega una emoción nueva (cambia head)
+        self._stress_cache: Dict[Optional[str], Tuple[int, int, float]] = {}
     
     def add_emotion(
         self,
@@ -54,24 +176,23 @@ class StressCalculator:
             confidence: Confianza de la detección
         """
         timestamp = time.time()
+        code = EMOTION_IDS[emotion]
         
         # Agregar a historial global
-        self.global_history.append({
-            'emotion': emotion,
-            'timestamp': timestamp,
-            'confidence': confidence
-        })
+        self.global_history.append(code, timestamp, confidence)
         
         # Agregar a historial del empleado
         if employee_id:
             if employee_id not in self.employee_histories:
-                self.employee_histories[employee_id] = deque(maxlen=self.max_history)
+                self.employee_histories[employee_id] = EmotionHistory(self.max_history)
             
-            self.employee_histories[employee_id].append({
-                'emotion': emotion,
-                'timestamp': timestamp,
-                'confidence': confidence
-            })
+            self.employee_histories[employee_id].append(code, timestamp, confidence)
+    
+    def _get_history(self, employee_id: Optional[str]) -> EmotionHistory:
+        """Historial del empleado o el global si no hay uno para él"""
+        if employee_id and employee_id in self.employee_histories:
+            return self.employee_histories[employee_id]
+        return self.global_history
     
     def calculate_stress_index(
         self,
@@ -91,25 +212,37 @@ class StressCalculator:
         window = window or self.window_size
         
         # Seleccionar historial
-        if employee_id and employee_id in self.employee_histories:
-            history = list(self.employee_histories[employee_id])
-        else:
-            history = list(self.global_history)
+        history = self._get_history(employee_id)
+        cache_key = employee_id if history is not self.global_history else None
         
+        cached = self._stress_cache.get(cache_key)
+        if cached is not None and cached[0] == history.head and cached[1] == window:
+            return cached[2]
+        
+        stress_index = self._compute_stress_index(history, window)
+        self._stress_cache[cache_key] = (history.head, window, stress_index)
+        return stress_index
+    
+    def _compute_stress_index(self, history: EmotionHistory, window: int) -> float:
+        """Porcentaje de emociones negativas en las últimas `window` del historial"""
         if len(history) < 5:
             return 0.0
         
+        if fastmath.NUMBA_AVAILABLE:
+            # Bucle compilado directamente sobre el buffer circular (sin copiar la ventana)
+            ratio = fastmath.ring_window_mean(
+                history.codes, history.head, window, fastmath.NEGATIVE_WEIGHTS
+            )
+            return round(ratio * 100.0, 2)
+        
         # Obtener últimas N emociones
-        recent_emotions = history[-window:]
+        recent_codes = history.recent_codes(window)
         
         # Contar emociones negativas
-        negative_count = sum(
-            1 for e in recent_emotions
-            if e['emotion'] in NEGATIVE_EMOTIONS
-        )
+        negative_count = int(_NEGATIVE_LUT[recent_codes.view(np.uint8)].sum())
         
         # Calcular porcentaje
-        total = len(recent_emotions)
+        total = len(recent_codes)
         if total == 0:
             return 0.0
         
@@ -134,24 +267,14 @@ class StressCalculator:
         stress_index = self.calculate_stress_index(employee_id)
         
         if stress_index > threshold:
-            # Obtener última emoción
-            if employee_id and employee_id in self.employee_histories:
-                history = list(self.employee_histories[employee_id])
-            else:
-                history = list(self.global_history)
-            
-            last_emotion = history[-1]['emotion'] if history else 'unknown'
-            
-            # Crear evento de estrés
-            event = StressEvent(
-                timestamp=datetime.now().isoformat(),
-                stress_index=stress_index,
-                emotion=last_emotion,
-                person_count=1,
-                employee_id=employee_id
+            # Registrar evento de estrés con la última emoción
+            last_code = self._get_history(employee_id).last_code()
+            self.stress_events.append(
+                time.time(),
+                stress_index,
+                last_code if last_code is not None else -1,
+                employee_id
             )
-            
-            self.stress_events.append(event)
             return True
         
         return False
@@ -171,24 +294,26 @@ class StressCalculator:
         Returns:
             Diccionario con conteo de cada emoción
         """
+        counts = self._emotion_counts(employee_id, hours)
+        
+        return {
+            EMOTION_NAMES[code]: int(counts[code])
+            for code in np.flatnonzero(counts)
+        }
+    
+    def _emotion_counts(self, employee_id: Optional[str], hours: int) -> np.ndarray:
+        """Conteo por ID de emoción de las últimas `hours` horas del historial"""
         cutoff_time = time.time() - (hours * 3600)
         
         # Seleccionar historial
-        if employee_id and employee_id in self.employee_histories:
-            history = list(self.employee_histories[employee_id])
-        else:
-            history = list(self.global_history)
+        history = self._get_history(employee_id)
+        size = len(history)
         
         # Filtrar por tiempo
-        recent = [e for e in history if e['timestamp'] >= cutoff_time]
+        recent = history.codes[:size][history.timestamps[:size] >= cutoff_time]
         
         # Contar emociones
-        distribution = {}
-        for entry in recent:
-            emotion = entry['emotion']
-            distribution[emotion] = distribution.get(emotion, 0) + 1
-        
-        return distribution
+        return np.bincount(recent, minlength=len(EMOTION_NAMES))
     
     def get_metrics(self, employee_id: Optional[str] = None) -> Dict:
         """
@@ -201,18 +326,20 @@ class StressCalculator:
             Diccionario con métricas
         """
         stress_index = self.calculate_stress_index(employee_id)
-        distribution = self.get_emotion_distribution(employee_id)
+        counts = self._emotion_counts(employee_id, hours=24)
+        distribution = {
+            EMOTION_NAMES[code]: int(counts[code])
+            for code in np.flatnonzero(counts)
+        }
         
-        total_detections = sum(distribution.values())
-        negative_count = sum(
-            distribution.get(e, 0) for e in NEGATIVE_EMOTIONS
-        )
+        total_detections = int(counts.sum())
+        negative_count = int(counts @ _NEGATIVE_LUT[:len(counts)])
         
-        # Emoción predominante
-        predominant_emotion = max(
-            distribution.items(),
-            key=lambda x: x[1]
-        )[0] if distribution else EmotionType.NEUTRAL.value
+        # Emoción predominante: un argmax lineal sobre los conteos
+        predominant_emotion = (
+            EMOTION_NAMES[int(counts.argmax())] if total_detections
+            else EmotionType.NEUTRAL.value
+        )
         
         return {
             'stress_index': stress_index,
@@ -221,10 +348,7 @@ class StressCalculator:
             'negative_percentage': (negative_count / total_detections * 100) if total_detections > 0 else 0,
             'predominant_emotion': predominant_emotion,
             'emotion_distribution': distribution,
-            'stress_events_count': len([
-                e for e in self.stress_events
-                if e.employee_id == employee_id or employee_id is None
-            ])
+            'stress_events_count': self.stress_events.count(employee_id)
         }
     
     def clear_history(self, employee_id: Optional[str] = None):
@@ -232,7 +356,9 @@ class StressCalculator:
         if employee_id:
             if employee_id in self.employee_histories:
                 self.employee_histories[employee_id].clear()
+            self._stress_cache.pop(employee_id, None)
         else:
             self.global_history.clear()
             self.employee_histories.clear()
+            self._stress_cache.clear()
 
@@ -0,0 +1,143 @@
+"""
+🗄️ Caché de Embeddings
+Embeddings de ROIs indexados por el hash SHA-256 de sus píxeles
+"""
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, List, Optional
+import numpy as np
+
+class EmbeddingCache:
+    """
+    Caché LRU en memoria respaldada por una tabla SQLite persistente
+    """
+    
+    def __init__(
+        self,
+        db_path: str = "data/embedding_cache.db",
+        namespace: str = "Facenet",
+        max_entries: int = 1024
+    ):
+        """
+        Inicializa la caché
+        
+        Args:
+            db_path: Archivo SQLite donde se persisten los embeddings
+            namespace: Identifica el modelo; entra en el hash para no mezclar modelos
+                (ver `set_namespace`)
+            max_entries: Máximo de embeddings conservados en memoria
+        """
+        self.namespace = namespace.encode()
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                hash BLOB PRIMARY KEY,
+                embedding BLOB NOT NULL  -- float32 little-endian
+            ) WITHOUT ROWID
+        """)
+        self._conn.commit()
+    
+    def set_namespace(self, namespace: str):
+        """
+        Cambia el modelo al que pertenecen los embeddings
+        
+        Las entradas de otros namespaces quedan en disco pero ya no coinciden con
+        ninguna clave, así que nunca se devuelven embeddings de otro modelo.
+        
+        Args:
+            namespace: Firma del modelo resuelto y su preprocesado
+        """
+        with self._lock:
+            if namespace.encode() != self.namespace:
+                self.namespace = namespace.encode()
+                self._memory.clear()
+    
+    def key(self, face_roi: np.ndarray) -> bytes:
+        """Hash SHA-256 de la forma, el tipo y los píxeles del ROI"""
+        digest = hashlib.sha256(self.namespace)
+        digest.update(f"{face_roi.shape}{face_roi.dtype}".encode())
+        digest.update(np.ascontiguousarray(face_roi).data)
+        return digest.digest()
+    
+    def get(self, key: bytes) -> Optional[np.ndarray]:
+        """Embedding guardado para `key` (memoria y luego disco) o None"""
+        with self._lock:
+            embedding = self._memory.get(key)
+            if embedding is not None:
+                self._memory.move_to_end(key)
+                return embedding
+            
+            row = self._conn.execute(
+                "SELECT embedding FROM embeddings WHERE hash = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            
+            embedding = np.frombuffer(row[0], dtype="<f4")
+            self._remember(key, embedding)
+            return embedding
+    
+    def put_many(self, keys: List[bytes], embeddings: np.ndarray):
+        """Guarda varios embeddings en una sola transacción"""
+        embeddings = np.asarray(embeddings, dtype="<f4")
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO embeddings (hash, embedding) VALUES (?, ?)",
+                    [(key, embedding.tobytes()) for key, embedding in zip(keys, embeddings)]
+                )
+            for key, embedding in zip(keys, embeddings):
+                self._remember(key, embedding)
+    
+    def get_or_compute(
+        self,
+        face_rois: List[np.ndarray],
+        compute: Callable[[List[np.ndarray]], Optional[np.ndarray]]
+    ) -> Optional[np.ndarray]:
+        """
+        Embeddings de los ROIs, calculando solo los que no están en caché
+        
+        Args:
+            face_rois: Lista de ROIs de rostros (BGR)
+            compute: Genera los embeddings (N, D) de una lista de ROIs en un lote
+        
+        Returns:
+            Matriz (N, D) float32 alineada con la entrada o None si `compute` falla
+        """
+        keys = [self.key(face_roi) for face_roi in face_rois]
+        cached = [self.get(key) for key in keys]
+        missing = [i for i, embedding in enumerate(cached) if embedding is None]
+        
+        if missing:
+            # Un solo lote del modelo para todos los ROIs nuevos
+            computed = compute([face_rois[i] for i in missing])
+            if computed is None:
+                return None
+            
+            self.put_many([keys[i] for i in missing], computed)
+            for i, embedding in zip(missing, computed):
+                cached[i] = embedding
+        
+        return np.stack(cached).astype(np.float32, copy=False)
+    
+    def _remember(self, key: bytes, embedding: np.ndarray):
+        """Agrega a la LRU en memoria descartando la entrada más antigua"""
+        self._memory[key] = embedding
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+    
+    def close(self):
+        """Cierra la base de datos de la caché"""
+        with self._lock:
+            self._conn.close()
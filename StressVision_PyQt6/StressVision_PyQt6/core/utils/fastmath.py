@@ -0,0 +1,211 @@
+"""
+🚀 Helpers numéricos compilados
+Funciones JIT con Numba (opcional) para cálculos por detección
+"""
+import numpy as np
+from core.utils.types import EmotionType, NEGATIVE_MASK
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    # Numba es opcional: sin él las funciones se ejecutan como Python normal
+    NUMBA_AVAILABLE = False
+    prange = range
+    
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+# Peso de estrés por ID de emoción (1.0 para emociones negativas)
+NEGATIVE_WEIGHTS = np.array(
+    [(NEGATIVE_MASK >> i) & 1 for i in range(len(EmotionType))],
+    dtype=np.float32
+)
+
+@njit(cache=True, fastmath=True)
+def aggregate_stress(emotion_ids: np.ndarray, confidences: np.ndarray, weights: np.ndarray) -> float:
+    """
+    Calcula el estrés de un conjunto de detecciones ponderado por confianza
+    
+    Args:
+        emotion_ids: IDs de emoción (N,)
+        confidences: Confianza de cada detección (N,)
+        weights: Peso de estrés por ID de emoción
+    
+    Returns:
+        Estrés agregado (0-1)
+    """
+    total = 0.0
+    weighted = 0.0
+    
+    for i in range(emotion_ids.shape[0]):
+        confidence = confidences[i]
+        total += confidence
+        weighted += weights[emotion_ids[i]] * confidence
+    
+    if total == 0.0:
+        return 0.0
+    
+    return weighted / total
+
+@njit(cache=True, fastmath=True)
+def ring_window_mean(codes: np.ndarray, head: int, window: int, weights: np.ndarray) -> float:
+    """
+    Peso medio de las últimas `window` emociones de un historial circular
+    
+    Args:
+        codes: Buffer circular de IDs de emoción (capacidad,)
+        head: Total de emociones escritas (la siguiente va en head % capacidad)
+        window: Número de emociones recientes a considerar
+        weights: Peso por ID de emoción
+    
+    Returns:
+        Promedio de los pesos de la ventana (0 si está vacía)
+    """
+    capacity = codes.shape[0]
+    count = min(window, head, capacity)
+    if count == 0:
+        return 0.0
+    
+    total = 0.0
+    for i in range(head - count, head):
+        total += weights[codes[i % capacity]]
+    
+    return total / count
+
+@njit(cache=True)
+def clip_boxes(boxes: np.ndarray, width: int, height: int, padding: int) -> np.ndarray:
+    """
+    Convierte bounding boxes (x, y, w, h) en esquinas recortadas al frame
+    
+    Args:
+        boxes: Bounding boxes (N, 4) como (x, y, w, h)
+        width: Ancho del frame
+        height: Alto del frame
+        padding: Margen a agregar alrededor de cada box
+    
+    Returns:
+        Esquinas (N, 4) como (x1, y1, x2, y2)
+    """
+    corners = np.empty((boxes.shape[0], 4), dtype=np.int32)
+    
+    for i in range(boxes.shape[0]):
+        x, y, w, h = boxes[i, 0], boxes[i, 1], boxes[i, 2], boxes[i, 3]
+        corners[i, 0] = max(0, x - padding)
+        corners[i, 1] = max(0, y - padding)
+        corners[i, 2] = min(width, x + w + padding)
+        corners[i, 3] = min(height, y + h + padding)
+    
+    return corners
+
+def iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """
+    Calcula la IoU de cada par de bounding boxes (vectorizado)
+    
+    Args:
+        boxes_a: Bounding boxes (N, 4) como (x, y, w, h)
+        boxes_b: Bounding boxes (M, 4) como (x, y, w, h)
+    
+    Returns:
+        Matriz (N, M) de IoU
+    """
+    a = boxes_a.astype(np.float32)[:, None, :]
+    b = boxes_b.astype(np.float32)[None, :, :]
+    
+    inter_w = np.clip(np.minimum(a[..., 0] + a[..., 2], b[..., 0] + b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    inter_h = np.clip(np.minimum(a[..., 1] + a[..., 3], b[..., 1] + b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = inter_w * inter_h
+    union = a[..., 2] * a[..., 3] + b[..., 2] * b[..., 3] - inter
+    
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+@njit(cache=True)
+def fill_rect(frame: np.ndarray, x1: int, y1: int, x2: int, y2: int, color: np.ndarray):
+    """
+    Rellena un rectángulo del frame escribiendo los píxeles directamente (recortado al frame)
+    
+    Args:
+        frame: Frame BGR (H, W, 3) uint8, se modifica in-place
+        x1, y1: Esquina superior izquierda
+        x2, y2: Esquina inferior derecha (exclusiva)
+        color: Color BGR (3,) uint8
+    """
+    height, width = frame.shape[0], frame.shape[1]
+    x1, y1 = max(0, x1), max(0, y1)
+    x2, y2 = min(width, x2), min(height, y2)
+    
+    if x2 <= x1 or y2 <= y1:
+        return
+    
+    for c in range(3):
+        frame[y1:y2, x1:x2, c] = color[c]
+
+@njit(cache=True)
+def draw_box(frame: np.ndarray, x1: int, y1: int, x2: int, y2: int, color: np.ndarray, thickness: int):
+    """
+    Dibuja el contorno de un bounding box con escrituras directas de píxeles
+    
+    Args:
+        frame: Frame BGR (H, W, 3) uint8, se modifica in-place
+        x1, y1: Esquina superior izquierda
+        x2, y2: Esquina inferior derecha
+        color: Color BGR (3,) uint8
+        thickness: Grosor de línea en píxeles (centrado en el borde, como cv2.rectangle)
+    """
+    half = thickness // 2
+    extra = thickness - half
+    fill_rect(frame, x1 - half, y1 - half, x2 + extra, y1 + extra, color)  # Superior
+    fill_rect(frame, x1 - half, y2 - half, x2 + extra, y2 + extra, color)  # Inferior
+    fill_rect(frame, x1 - half, y1 - half, x1 + extra, y2 + extra, color)  # Izquierdo
+    fill_rect(frame, x2 - half, y1 - half, x2 + extra, y2 + extra, color)  # Derecho
+
+@njit("f4(f4[::1], f4[::1])", cache=True, fastmath=True)
+def cosine_similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """
+    Similitud coseno de dos vectores float32 en una sola pasada fusionada
+    
+    Args:
+        a: Vector (D,) float32 contiguo
+        b: Vector (D,) float32 contiguo
+    
+    Returns:
+        Similitud coseno (0 si alguno es nulo)
+    """
+    dot = np.float32(0.0)
+    norm_a = np.float32(0.0)
+    norm_b = np.float32(0.0)
+    
+    for i in range(a.shape[0]):
+        dot += a[i] * b[i]
+        norm_a += a[i] * a[i]
+        norm_b += b[i] * b[i]
+    
+    denominator = norm_a * norm_b
+    if denominator == 0.0:
+        return np.float32(0.0)
+    
+    return dot / np.sqrt(denominator)
+
+@njit(cache=True, fastmath=True, parallel=True)
+def batch_cosine(queries: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+    """
+    Similitud coseno de cada consulta contra cada fila de una galería
+    
+    Args:
+        queries: Matriz (N, D) float32 contigua
+        matrix: Galería (K, D) float32 contigua
+    
+    Returns:
+        Similitudes (N, K) float32
+    """
+    n = queries.shape[0]
+    k = matrix.shape[0]
+    similarities = np.empty((n, k), dtype=np.float32)
+    
+    for i in prange(n):
+        for j in range(k):
+            similarities[i, j] = cosine_similarity(queries[i], matrix[j])
+    
+    return similarities
@@ -1,10 +1,12 @@
 """
 🔖 Tipos y estructuras de datos compartidas
 """
+import struct
+import numpy as np
 from dataclasses import dataclass, field
 from typing import Tuple, Dict, List, Optional
 from datetime import datetime
-from enum import Enum
+from enum import Enum, IntEnum
 
 # ============================================================================
 # ENUMS
@@ -65,6 +67,22 @@ POSITIVE_EMOTIONS = [
     EmotionType.SURPRISE.value
 ]
 
+# IDs enteros de emociones (orden de EmotionType) para cálculos vectorizados
+EMOTION_NAMES = tuple(emotion.value for emotion in EmotionType)
+EMOTION_IDS = {name: i for i, name in enumerate(EMOTION_NAMES)}
+
+# Mismos miembros que EmotionType con su ID entero (EmotionType queda para serializar en BD)
+EmotionId = IntEnum("EmotionId", {emotion.name: i for i, emotion in enumerate(EmotionType)})
+
+# Máscara de bits de emociones negativas (bit i = EmotionId i): `(NEGATIVE_MASK >> emotion_id) & 1`
+NEGATIVE_MASK = sum(1 << EMOTION_IDS[name] for name in NEGATIVE_EMOTIONS)
+
+# Orden de salida del modelo Emotion de DeepFace (columnas de probabilidades)
+MODEL_EMOTION_LABELS = ('angry', 'disgust', 'fear', 'happy', 'sad', 'surprise', 'neutral')
+
+# Probabilidades de una detección en BD: 7 float32 little-endian (BLOB de 28 bytes)
+EMOTION_PROBS_STRUCT = struct.Struct(f"<{len(MODEL_EMOTION_LABELS)}f")
+
 # Mapeo de emociones a español
 EMOTION_LABELS_ES = {
     EmotionType.NEUTRAL.value: "Neutral",
@@ -93,6 +111,11 @@ EMOTION_COLORS = {
     EmotionType.FATIGUE.value: (128, 128, 128)    # Gris oscuro
 }
 
+# Paleta y etiquetas indexadas por ID de emoción (sin búsquedas en dict por frame)
+EMOTION_PALETTE = np.array([EMOTION_COLORS[name] for name in EMOTION_NAMES], dtype=np.uint8)
+EMOTION_COLOR_TUPLES = tuple(tuple(int(c) for c in color) for color in EMOTION_PALETTE)
+EMOTION_LABELS_ES_BY_ID = tuple(EMOTION_LABELS_ES[name] for name in EMOTION_NAMES)
+
 # ============================================================================
 # DATACLASSES
 # ============================================================================
@@ -141,13 +164,35 @@ class DetectionResult:
     gender: Optional[str] = None
 
 @dataclass
-class StressEvent:
-    """Evento de estrés detectado"""
-    timestamp: str
-    stress_index: float
-    emotion: str
-    person_count: int
-    employee_id: Optional[str] = None
+class DetectionBatch:
+    """Detecciones de un frame en formato Structure-of-Arrays"""
+    bbox: np.ndarray  # (N, 4) int32 como (x, y, w, h)
+    emotion_id: np.ndarray  # (N,) int8, índice en EMOTION_NAMES
+    confidence: np.ndarray  # (N,) float32
+    employee_id: np.ndarray  # (N,) object, str o None
+    recognition_confidence: np.ndarray  # (N,) float32
+    probs: np.ndarray  # (N, 7) float32 en orden MODEL_EMOTION_LABELS
+    track_id: np.ndarray  # (N,) int32, ID del tracker entre frames
+    
+    def __len__(self) -> int:
+        return len(self.emotion_id)
+    
+    @classmethod
+    def empty(cls) -> "DetectionBatch":
+        """Retorna un lote sin detecciones"""
+        return cls(
+            bbox=np.empty((0, 4), dtype=np.int32),
+            emotion_id=np.empty(0, dtype=np.int8),
+            confidence=np.empty(0, dtype=np.float32),
+            employee_id=np.empty(0, dtype=object),
+            recognition_confidence=np.empty(0, dtype=np.float32),
+            probs=np.empty((0, len(MODEL_EMOTION_LABELS)), dtype=np.float32),
+            track_id=np.empty(0, dtype=np.int32)
+        )
+    
+    def emotion(self, index: int) -> str:
+        """Nombre de la emoción de la detección `index`"""
+        return EMOTION_NAMES[self.emotion_id[index]]
 
 @dataclass
 class Alert:
@@ -181,11 +226,28 @@ class DetectionEvent:
     session_id: Optional[str] = None
     employee_id: Optional[str] = None
     track_id: Optional[int] = None
-    timestamp: Optional[str] = None
+    timestamp: Optional[int] = None  # Epoch en milisegundos
     emotion: Optional[str] = None
     confidence: float = 0.0
     stress_level: Optional[float] = None
-    bounding_box: Optional[str] = None  # JSON string
-    emotion_probabilities: Optional[str] = None  # JSON string
+    bbox_x: Optional[int] = None
+    bbox_y: Optional[int] = None
+    bbox_w: Optional[int] = None
+    bbox_h: Optional[int] = None
+    emotion_probabilities: Optional[bytes] = None  # EMOTION_PROBS_STRUCT empaquetado
     processing_time_ms: Optional[int] = None
+    
+    @property
+    def bounding_box(self) -> Optional[Tuple[int, int, int, int]]:
+        """Bounding box como tupla (x, y, w, h)"""
+        if self.bbox_x is None:
+            return None
+        return (self.bbox_x, self.bbox_y, self.bbox_w, self.bbox_h)
+    
+    @property
+    def probabilities(self) -> Dict[str, float]:
+        """Probabilidades por emoción (orden MODEL_EMOTION_LABELS)"""
+        if not self.emotion_probabilities:
+            return {}
+        return dict(zip(MODEL_EMOTION_LABELS, EMOTION_PROBS_STRUCT.unpack(self.emotion_probabilities)))
 
@@ -4,6 +4,7 @@ Aplicación PyQt6 para detección en tiempo real
 """
 import sys
 import os
+import multiprocessing
 from pathlib import Path
 
 # Agregar directorio raíz al path
@@ -36,5 +37,7 @@ def main():
     sys.exit(app.exec())
 
 if __name__ == "__main__":
+    # Necesario para el pool de procesos de embeddings en ejecutables congelados
+    multiprocessing.freeze_support()
     main()
 
@@ -4,14 +4,110 @@ Permite registrar nuevos empleados en el sistema
 """
 import cv2
 import sys
+import queue
+import threading
+import numpy as np
 from pathlib import Path
 
 # Agregar directorio raíz al path
 ROOT_DIR = Path(__file__).parent.parent
 sys.path.insert(0, str(ROOT_DIR))
 
-from core.detectors.face_detector import FaceDetector
-from core.detectors.face_recognizer import FaceRecognizer
+import config
+from core.detectors import get_face_detector, get_face_recognizer
+from core.utils.fastmath import clip_boxes
+
+# Margen (px) alrededor del rostro detectado al guardar una muestra
+ROI_PADDING = 20
+# Bits distintos (de 64) bajo los cuales una muestra repite a otra ya capturada
+DUPLICATE_HASH_DISTANCE = 5
+
+def perceptual_hash(face_roi: np.ndarray) -> int:
+    """
+    Hash perceptual de 64 bits (dHash): signo del gradiente horizontal de una miniatura 9x8
+    
+    Args:
+        face_roi: ROI del rostro (BGR)
+        
+    Returns:
+        Hash como entero; muestras casi idénticas difieren en pocos bits
+    """
+    gray = cv2.cvtColor(face_roi, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = small[:, 1:] > small[:, :-1]
+    return int(np.packbits(bits).view(">u8")[0])
+
+def open_camera(index: int = 0, width: int = 1280, height: int = 720):
+    """
+    Abre la cámara pidiendo MJPG (YUY2 sin comprimir satura el USB a 720p)
+    
+    Args:
+        index: Índice de la cámara
+        width: Ancho solicitado
+        height: Alto solicitado
+        
+    Returns:
+        cv2.VideoCapture abierto o None si no hay cámara
+    """
+    # Media Foundation en Windows (DirectShow como respaldo); backend por defecto en el resto
+    if sys.platform == "win32":
+        backends = (cv2.CAP_MSMF, cv2.CAP_DSHOW)
+    else:
+        backends = (cv2.CAP_ANY,)
+    
+    for backend in backends:
+        cap = cv2.VideoCapture(index, backend)
+        if cap.isOpened():
+            break
+        cap.release()
+    else:
+        return None
+    
+    # El FOURCC debe fijarse antes que la resolución para que el driver negocie MJPG
+    cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+    return cap
+
+class FrameReader:
+    """Thread productor: lee la cámara y conserva solo el frame más reciente"""
+    
+    def __init__(self, cap: cv2.VideoCapture):
+        self.cap = cap
+        self.running = False
+        
+        # Cola de un solo elemento: la vista previa nunca espera frames viejos
+        self.frames: queue.Queue = queue.Queue(maxsize=1)
+        self._thread = threading.Thread(target=self._read_loop, daemon=True)
+    
+    def start(self):
+        """Inicia la lectura continua de la cámara"""
+        self.running = True
+        self._thread.start()
+    
+    def stop(self):
+        """Detiene la lectura y espera a que el thread termine"""
+        self.running = False
+        self._thread.join(timeout=1.0)
+    
+    def _read_loop(self):
+        """Loop de lectura: sobrescribe el frame pendiente si el consumidor va lento"""
+        while self.running:
+            ret, frame = self.cap.read()
+            if not ret:
+                break
+            
+            try:
+                self.frames.put_nowait(frame)
+            except queue.Full:
+                # Descartar el frame viejo para quedarse siempre en vivo
+                try:
+                    self.frames.get_nowait()
+                except queue.Empty:
+                    pass
+                self.frames.put_nowait(frame)
+        
+        self.running = False
 
 def enroll_employee_from_camera(employee_id: str, name: str, num_samples: int = 10):
     """
@@ -26,43 +122,67 @@ def enroll_employee_from_camera(employee_id: str, name: str, num_samples: int =
     print(f"📸 Se capturarán {num_samples} muestras")
     print("Presiona ESPACIO para capturar, ESC para salir\n")
     
-    # Inicializar detectores
-    face_detector = FaceDetector(backend="mediapipe")
-    face_recognizer = FaceRecognizer()
+    # Detectores compartidos: solo el primer enrollment del proceso carga los modelos
+    face_detector = get_face_detector(backend="mediapipe")
+    # Re-enrollments con las mismas muestras no vuelven a ejecutar el modelo
+    face_recognizer = get_face_recognizer(
+        inference_device=config.INFERENCE_DEVICE, embedding_cache_path="data/embedding_cache.db"
+    )
     
     # Abrir cámara
-    cap = cv2.VideoCapture(0, cv2.CAP_DSHOW)
-    if not cap.isOpened():
+    cap = open_camera(0)
+    if cap is None:
         print("❌ Error: No se pudo abrir la cámara")
         return False
     
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
-    
     samples = []
     sample_count = 0
+    # Hash perceptual de cada muestra aceptada (descarta poses repetidas sin calcular embeddings)
+    sample_hashes = []
+    # Buffer del ROI reutilizado entre frames (se asigna con el primer frame)
+    roi_buf = None
+    
+    # La lectura de la cámara corre en su propio thread: la detección no la frena
+    reader = FrameReader(cap)
+    reader.start()
     
     print("✅ Cámara lista. Posiciona el rostro frente a la cámara...")
     
     while sample_count < num_samples:
-        ret, frame = cap.read()
-        if not ret:
-            break
+        # Bloquea hasta que llegue un frame nuevo (sin sondear la cámara ni repetir detecciones)
+        try:
+            frame = reader.frames.get(timeout=0.1)
+        except queue.Empty:
+            # La cámara dejó de entregar frames
+            if not reader.running:
+                break
+            # Cámara lenta: mantener la ventana atendida sin volver a detectar
+            if cv2.waitKey(30) & 0xFF == 27:  # ESC
+                print("❌ Enrollment cancelado")
+                break
+            continue
         
         # Detectar rostros
         faces = face_detector.detect_faces(frame)
         
-        # Dibujar en frame
-        display_frame = frame.copy()
-        
+        # Copia limpia solo del ROI candidato (con padding, mismo recorte que VideoThread);
+        # los overlays se dibujan directo sobre el frame, que ya no se vuelve a leer
+        face_roi = None
         if faces:
-            face = faces[0]  # Tomar el primer rostro
-            x, y, w, h = face.bbox
+            boxes = np.array([faces[0].bbox], dtype=np.int32)
+            x1, y1, x2, y2 = clip_boxes(boxes, frame.shape[1], frame.shape[0], ROI_PADDING)[0]
+            if roi_buf is None or roi_buf.shape != frame.shape:
+                roi_buf = np.empty_like(frame)
+            # Vista del buffer con el tamaño del ROI: sin asignaciones por frame
+            face_roi = roi_buf[:y2 - y1, :x2 - x1]
+            np.copyto(face_roi, frame[y1:y2, x1:x2])
+            
+            x, y, w, h = faces[0].bbox  # Tomar el primer rostro
             
             # Dibujar bounding box
-            cv2.rectangle(display_frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
+            cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
             cv2.putText(
-                display_frame,
+                frame,
                 f"Muestra {sample_count + 1}/{num_samples}",
                 (x, y - 10),
                 cv2.FONT_HERSHEY_SIMPLEX,
@@ -72,7 +192,7 @@ def enroll_employee_from_camera(employee_id: str, name: str, num_samples: int =
             )
         else:
             cv2.putText(
-                display_frame,
+                frame,
                 "No se detecta rostro",
                 (50, 50),
                 cv2.FONT_HERSHEY_SIMPLEX,
@@ -82,7 +202,7 @@ def enroll_employee_from_camera(employee_id: str, name: str, num_samples: int =
             )
         
         cv2.putText(
-            display_frame,
+            frame,
             f"Presiona ESPACIO para capturar ({sample_count}/{num_samples})",
             (10, 30),
             cv2.FONT_HERSHEY_SIMPLEX,
@@ -91,32 +211,32 @@ def enroll_employee_from_camera(employee_id: str, name: str, num_samples: int =
             2
         )
         
-        cv2.imshow("Enrollment - Presiona ESPACIO para capturar", display_frame)
+        cv2.imshow("Enrollment - Presiona ESPACIO para capturar", frame)
         
+        # Solo atiende la ventana: el ritmo del loop lo marca la cola del FrameReader
         key = cv2.waitKey(1) & 0xFF
         
         if key == 27:  # ESC
             print("❌ Enrollment cancelado")
             break
-        elif key == 32 and faces:  # ESPACIO
-            # Capturar muestra
-            face = faces[0]
-            x, y, w, h = face.bbox
-            
-            # Extraer ROI con padding
-            padding = 20
-            x1 = max(0, x - padding)
-            y1 = max(0, y - padding)
-            x2 = min(frame.shape[1], x + w + padding)
-            y2 = min(frame.shape[0], y + h + padding)
-            
-            face_roi = frame[y1:y2, x1:x2]
-            
+        elif key == 32 and face_roi is not None:  # ESPACIO
+            # Capturar muestra (ROI copiado antes de dibujar los overlays)
             if face_roi.size > 0:
-                samples.append(face_roi)
+                sample_hash = perceptual_hash(face_roi)
+                if any(
+                    bin(sample_hash ^ other).count("1") < DUPLICATE_HASH_DISTANCE
+                    for other in sample_hashes
+                ):
+                    print("⚠️ Muestra muy parecida a una anterior, mueve ligeramente el rostro")
+                    continue
+                
+                # La muestra necesita sus propios píxeles: el buffer se reescribe en el próximo frame
+                samples.append(face_roi.copy())
+                sample_hashes.append(sample_hash)
                 sample_count += 1
                 print(f"✅ Muestra {sample_count}/{num_samples} capturada")
     
+    reader.stop()
     cap.release()
     cv2.destroyAllWindows()
     
@@ -144,6 +264,8 @@ def enroll_employee_from_camera(employee_id: str, name: str, num_samples: int =
             active=True
         )
         db.add_employee(employee)
+        # Detiene el flusher y cierra las conexiones (no quedan abiertas entre enrollments)
+        db.close()
         
         return True
     else:
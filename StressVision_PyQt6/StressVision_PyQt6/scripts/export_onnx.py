@@ -0,0 +1,265 @@
+"""
+⚡ Script de Exportación a ONNX
+Convierte los modelos Keras de DeepFace (emociones y Facenet) a ONNX
+"""
+import sys
+import argparse
+from pathlib import Path
+from typing import Optional
+
+# Agregar directorio raíz al path
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from core.detectors.emotion_analyzer import EmotionAnalyzer
+from core.detectors.face_recognizer import FaceRecognizer
+from core.utils.types import MODEL_EMOTION_LABELS
+
+MODELS_DIR = ROOT_DIR / "models"
+ENROLLMENTS_DIR = ROOT_DIR / "data" / "enrollments"
+
+# Caída máxima de precisión aceptada para conservar el modelo INT8
+MAX_ACCURACY_DROP = 0.02
+# Similitud coseno media mínima entre embeddings FP32 e INT8 para conservar el modelo INT8
+MIN_EMBEDDING_AGREEMENT = 0.98
+# Rostros usados para calibrar los rangos de activación del modelo de reconocimiento
+CALIBRATION_SAMPLES = 100
+
+def export_keras_model(keras_model, output_path: Path, opset: int = 13):
+    """
+    Exporta un modelo Keras a ONNX con tamaño de lote dinámico
+    
+    Args:
+        keras_model: Modelo Keras construido
+        output_path: Ruta del archivo .onnx de salida
+        opset: Versión de opset ONNX
+    """
+    import tensorflow as tf
+    import tf2onnx
+    
+    input_signature = (
+        tf.TensorSpec((None,) + tuple(keras_model.input_shape[1:]), tf.float32, name="input"),
+    )
+    tf2onnx.convert.from_keras(
+        keras_model,
+        input_signature=input_signature,
+        opset=opset,
+        output_path=str(output_path)
+    )
+    print(f"✅ Modelo exportado: {output_path}")
+
+def quantize_model(fp32_path: Path, int8_path: Path):
+    """
+    Cuantiza dinámicamente los pesos de un modelo ONNX a INT8
+    
+    Args:
+        fp32_path: Modelo ONNX float32
+        int8_path: Ruta del modelo cuantizado de salida
+    """
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    
+    quantize_dynamic(str(fp32_path), str(int8_path), weight_type=QuantType.QInt8)
+    print(f"✅ Modelo cuantizado: {int8_path}")
+
+def load_calibration_faces(enrollments_dir: Path, limit: int = CALIBRATION_SAMPLES) -> list:
+    """
+    Lee las muestras guardadas por el enrollment para calibrar la cuantización
+    
+    Args:
+        enrollments_dir: Directorio de enrollments (subcarpetas `<id>_samples/`)
+        limit: Máximo de rostros a leer
+    
+    Returns:
+        Lista de ROIs BGR
+    """
+    import cv2
+    
+    faces = []
+    for image_path in sorted(enrollments_dir.glob("*_samples/*.jpg"))[:limit]:
+        image = cv2.imread(str(image_path))
+        if image is not None:
+            faces.append(image)
+    return faces
+
+def quantize_static_model(fp32_path: Path, int8_path: Path, input_name: str, batches: list):
+    """
+    Cuantiza pesos y activaciones a INT8 con rangos calibrados (formato QDQ)
+    
+    Args:
+        fp32_path: Modelo ONNX float32
+        int8_path: Ruta del modelo cuantizado de salida
+        input_name: Nombre de la entrada del modelo
+        batches: Tensores de entrada representativos (float32)
+    """
+    from onnxruntime.quantization import (
+        CalibrationDataReader, QuantFormat, QuantType, quantize_static
+    )
+    
+    class BatchReader(CalibrationDataReader):
+        """Entrega los lotes de calibración uno por uno"""
+        
+        def __init__(self):
+            self._batches = iter(batches)
+        
+        def get_next(self):
+            batch = next(self._batches, None)
+            return None if batch is None else {input_name: batch}
+    
+    # Activaciones uint8 y pesos int8 (U8S8): los kernels VNNI de ONNX Runtime usan esta combinación
+    quantize_static(
+        str(fp32_path),
+        str(int8_path),
+        BatchReader(),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True
+    )
+    print(f"✅ Modelo cuantizado (calibrado): {int8_path}")
+
+def evaluate_emotion_model(model_path: Path, validation_dir: Path) -> Optional[float]:
+    """
+    Mide la precisión top-1 de un modelo de emociones ONNX
+    
+    Args:
+        model_path: Modelo ONNX de emociones
+        validation_dir: Directorio con subcarpetas por emoción (angry/, happy/, ...)
+    
+    Returns:
+        Precisión (0-1) o None si no hay imágenes
+    """
+    import cv2
+    import numpy as np
+    
+    analyzer = EmotionAnalyzer(onnx_model_path=str(model_path), quantized_model_path=None)
+    model = analyzer.emotion_model
+    if model is None:
+        return None
+    
+    correct = 0
+    total = 0
+    for label_index, label in enumerate(MODEL_EMOTION_LABELS):
+        images = [
+            cv2.imread(str(image_path))
+            for image_path in sorted((validation_dir / label).glob("*"))
+        ]
+        images = [image for image in images if image is not None]
+        if not images:
+            continue
+        
+        batch = analyzer._preprocess_batch(images, model.input_shape)
+        predictions = np.asarray(model.predict(batch), dtype=np.float32)
+        correct += int((predictions.argmax(axis=1) == label_index).sum())
+        total += len(images)
+    
+    return correct / total if total else None
+
+def quantize_emotion_model(validation_dir: Optional[Path] = None):
+    """
+    Genera `models/emotion_int8.onnx` y lo descarta si pierde demasiada precisión
+    
+    Args:
+        validation_dir: Conjunto de validación etiquetado (opcional)
+    """
+    fp32_path = MODELS_DIR / "emotion.onnx"
+    int8_path = MODELS_DIR / "emotion_int8.onnx"
+    quantize_model(fp32_path, int8_path)
+    
+    if validation_dir is None:
+        print("⚠️ Sin conjunto de validación: verifica la precisión del modelo INT8 manualmente")
+        return
+    
+    fp32_accuracy = evaluate_emotion_model(fp32_path, validation_dir)
+    int8_accuracy = evaluate_emotion_model(int8_path, validation_dir)
+    if fp32_accuracy is None or int8_accuracy is None:
+        print(f"⚠️ No se encontraron imágenes de validación en {validation_dir}")
+        return
+    
+    print(f"📊 Precisión FP32: {fp32_accuracy:.1%} | INT8: {int8_accuracy:.1%}")
+    if fp32_accuracy - int8_accuracy > MAX_ACCURACY_DROP:
+        # El analizador vuelve a usar el modelo FP32
+        int8_path.unlink()
+        print(f"⚠️ Pérdida de precisión mayor a {MAX_ACCURACY_DROP:.0%}, modelo INT8 descartado")
+
+def quantize_recognition_model(enrollments_dir: Path = ENROLLMENTS_DIR):
+    """
+    Genera `models/facenet_int8.onnx` calibrado con las muestras de enrollment
+    
+    El modelo INT8 se descarta si sus embeddings se alejan de los FP32: la galería
+    ya guardada se generó con el modelo FP32 y debe seguir siendo comparable.
+    
+    Args:
+        enrollments_dir: Directorio de enrollments con las muestras JPG
+    """
+    import numpy as np
+    
+    fp32_path = MODELS_DIR / "facenet.onnx"
+    int8_path = MODELS_DIR / "facenet_int8.onnx"
+    
+    faces = load_calibration_faces(enrollments_dir)
+    if not faces:
+        print(f"⚠️ Sin muestras en {enrollments_dir}: no se cuantiza el modelo de reconocimiento")
+        return
+    
+    recognizer = FaceRecognizer(
+        onnx_model_path=str(fp32_path), quantized_model_path=None, inference_device="cpu"
+    )
+    model = recognizer.embedding_model
+    if model is None:
+        print(f"⚠️ No se pudo cargar {fp32_path} con ONNX Runtime")
+        return
+    
+    batches = [
+        recognizer._preprocess_batch([face], model.input_shape)
+        for face in faces
+    ]
+    quantize_static_model(fp32_path, int8_path, model.input_name, batches)
+    
+    # Comparar embeddings FP32 vs INT8 sobre las mismas muestras
+    from core.detectors import onnx_runtime
+    int8_model = onnx_runtime.OnnxModel(int8_path, "cpu")
+    batch = np.concatenate(batches)
+    fp32_embeddings = np.asarray(model.predict(batch), dtype=np.float32)
+    int8_embeddings = np.asarray(int8_model.predict(batch), dtype=np.float32)
+    fp32_embeddings /= np.linalg.norm(fp32_embeddings, axis=1, keepdims=True)
+    int8_embeddings /= np.linalg.norm(int8_embeddings, axis=1, keepdims=True)
+    agreement = float((fp32_embeddings * int8_embeddings).sum(axis=1).mean())
+    
+    print(f"📊 Similitud media FP32 vs INT8: {agreement:.3f}")
+    if agreement < MIN_EMBEDDING_AGREEMENT:
+        # El reconocedor vuelve a usar el modelo FP32
+        int8_path.unlink()
+        print(f"⚠️ Similitud menor a {MIN_EMBEDDING_AGREEMENT}, modelo INT8 descartado")
+
+def export_models(quantize: bool = True, validation_dir: Optional[Path] = None):
+    """
+    Exporta los modelos de emociones y reconocimiento a `models/`
+    
+    Args:
+        quantize: Si True, genera también las variantes INT8 de ambos modelos
+        validation_dir: Conjunto de validación para aceptar el modelo INT8
+    """
+    MODELS_DIR.mkdir(exist_ok=True)
+    
+    # Forzar la carga de los modelos Keras (sin ONNX)
+    emotion_analyzer = EmotionAnalyzer(onnx_model_path=None, quantized_model_path=None)
+    export_keras_model(emotion_analyzer._get_emotion_model(), MODELS_DIR / "emotion.onnx")
+    
+    face_recognizer = FaceRecognizer(onnx_model_path=None, quantized_model_path=None)
+    export_keras_model(face_recognizer._get_embedding_model(), MODELS_DIR / "facenet.onnx")
+    
+    if quantize:
+        quantize_emotion_model(validation_dir)
+        quantize_recognition_model()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta los modelos a ONNX")
+    parser.add_argument("--no-quantize", action="store_true", help="No generar los modelos INT8")
+    parser.add_argument(
+        "--validation-dir", type=Path, default=None,
+        help="Imágenes de rostros en subcarpetas por emoción para validar el modelo INT8"
+    )
+    args = parser.parse_args()
+    
+    print("🔄 Exportando modelos a ONNX (requiere tensorflow y tf2onnx)...")
+    export_models(quantize=not args.no_quantize, validation_dir=args.validation_dir)
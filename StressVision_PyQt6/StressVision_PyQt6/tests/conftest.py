@@ -0,0 +1,8 @@
+"""
+🧪 Configuración de pytest
+Los módulos se importan como `core.*`, igual que al ejecutar main.py desde esta carpeta
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,199 @@
+"""
+🧪 Tests de core.database.database
+"""
+import sqlite3
+import time
+from datetime import datetime
+
+import pytest
+
+from core.database import database as database_module
+from core.database.database import Database
+from core.utils.types import (
+    Alert, AlertSeverity, AlertType, DetectionEvent, EMOTION_PROBS_STRUCT, MODEL_EMOTION_LABELS
+)
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = Database(str(tmp_path / "stressvision.db"), flush_interval_s=60)
+    yield database
+    database.close()
+
+
+def _alert(index: int, alert_type: str = AlertType.HIGH_STRESS_PROLONGED.value) -> Alert:
+    return Alert(
+        alert_id=0,
+        employee_id=f"EMP{index % 3}",
+        alert_type=alert_type,
+        severity=AlertSeverity.HIGH.value,
+        stress_level=0.8,
+        timestamp=datetime.now().isoformat(),
+        message=f"alerta {index}"
+    )
+
+
+def test_migrates_legacy_detection_events(tmp_path):
+    db_path = tmp_path / "legacy.db"
+    legacy = sqlite3.connect(db_path)
+    legacy.execute("""
+        CREATE TABLE detection_events (
+            detection_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT,
+            employee_id TEXT,
+            track_id INTEGER,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            emotion TEXT,
+            confidence REAL,
+            stress_level REAL,
+            bounding_box TEXT,
+            emotion_probabilities TEXT,
+            processing_time_ms INTEGER
+        )
+    """)
+    legacy.executemany(
+        "INSERT INTO detection_events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            (1, "S1", "EMP1", 4, "2024-03-01T10:15:30.250000", "sad", 0.9, 0.6,
+             "(10, 20, 30, 40)", "{'sad': 0.75, 'neutral': 0.25}", 12),
+            (2, "S1", None, None, "2024-03-01T10:16:00", "happy", 0.8, 0.1,
+             "no es un bbox", None, 8),
+            (3, "S1", None, None, None, "neutral", 0.5, 0.0, None, None, 5),
+        ]
+    )
+    legacy.commit()
+    legacy.close()
+
+    database = Database(str(db_path), flush_interval_s=60)
+    try:
+        detections = database.get_detections(limit=None)
+    finally:
+        database.close()
+
+    # Las filas sin timestamp se descartan; el orden es el más reciente primero
+    assert [d.detection_id for d in detections] == [2, 1]
+    first = detections[1]
+    assert first.timestamp == Database.to_epoch_ms("2024-03-01T10:15:30.250000")
+    assert first.bounding_box == (10, 20, 30, 40)
+    assert first.probabilities["sad"] == pytest.approx(0.75)
+    assert first.probabilities["neutral"] == pytest.approx(0.25)
+    assert set(first.probabilities) == set(MODEL_EMOTION_LABELS)
+    assert detections[0].bounding_box is None
+    assert detections[0].emotion_probabilities is None
+
+
+def test_queued_detections_are_flushed_in_one_batch(db):
+    now_ms = int(time.time() * 1000)
+    probabilities = EMOTION_PROBS_STRUCT.pack(*([1 / len(MODEL_EMOTION_LABELS)] * len(MODEL_EMOTION_LABELS)))
+    db.queue_detections([
+        DetectionEvent(employee_id="EMP1", timestamp=now_ms + i, emotion="sad",
+                       stress_level=0.5, bbox_x=i, bbox_y=0, bbox_w=10, bbox_h=10,
+                       emotion_probabilities=probabilities)
+        for i in range(1200)
+    ])
+
+    assert db.flush_detections() == 1200
+    assert db.flush_detections() == 0
+
+    # Más filas que una página de iter_detections: orden y límite se mantienen entre páginas
+    detections = db.get_detections(limit=None)
+    assert len(detections) == 1200
+    assert [d.timestamp for d in detections] == sorted((now_ms + i for i in range(1200)), reverse=True)
+    assert len(db.get_detections(limit=700)) == 700
+    assert detections[0].bounding_box == (1199, 0, 10, 10)
+
+
+@pytest.mark.parametrize("returning", [True, False])
+def test_add_alerts_returns_ids_aligned_with_input(db, monkeypatch, returning):
+    if not returning:
+        # Fuerza la ruta sin RETURNING (SQLite < 3.35)
+        monkeypatch.setattr(database_module.sqlite3, "sqlite_version_info", (3, 34, 0))
+
+    # Más alertas que un INSERT multi-fila: varios lotes en la misma transacción
+    alerts = [_alert(i) for i in range(database_module._ALERTS_PER_INSERT * 2 + 50)]
+    alert_ids = db.add_alerts(alerts)
+
+    assert len(alert_ids) == len(alerts)
+    assert alert_ids == sorted(set(alert_ids))
+    stored = {alert.alert_id: alert.message for alert in db.get_alerts(limit=1000)}
+    assert [stored[alert_id] for alert_id in alert_ids] == [alert.message for alert in alerts]
+
+
+def test_add_alerts_rolls_back_whole_batch_on_error(db):
+    # alert_type es NOT NULL: la última alerta falla y no se guarda ninguna
+    alerts = [_alert(i) for i in range(150)] + [_alert(150, alert_type=None)]
+
+    assert db.add_alerts(alerts) == []
+    assert db.get_alerts(limit=1000) == []
+
+
+def test_rollup_stress_summary(db):
+    now_ms = int(time.time() * 1000)
+    rows = [
+        ("EMP1", "sad", 0.9),
+        ("EMP1", "sad", 0.8),
+        ("EMP1", "happy", 0.1),
+        ("EMP2", "neutral", 0.2),
+        (None, "angry", 0.95),  # Sin identidad: no se resume
+    ]
+    db.queue_detections([
+        DetectionEvent(employee_id=employee_id, timestamp=now_ms - 1000 - i,
+                       emotion=emotion, stress_level=stress_level)
+        for i, (employee_id, emotion, stress_level) in enumerate(rows)
+    ])
+    # Fuera de la ventana
+    db.add_detections([
+        DetectionEvent(employee_id="EMP1", timestamp=now_ms - 30 * 60_000,
+                       emotion="angry", stress_level=1.0)
+    ])
+
+    # Las detecciones encoladas se escriben antes de resumir
+    assert db.rollup_stress_summary(window_minutes=15) == 2
+
+    with db.get_read_connection() as conn:
+        summary = {
+            row[0]: row[1:]
+            for row in conn.execute("""
+                SELECT employee_id, avg_stress_level, high_stress_count,
+                       predominant_emotion, total_detections
+                FROM employee_stress_summary
+            """)
+        }
+
+    avg_stress, high_count, predominant, total = summary["EMP1"]
+    assert avg_stress == pytest.approx(0.6)
+    assert (high_count, predominant, total) == (2, "sad", 3)
+    assert summary["EMP2"][1:] == (0, "neutral", 1)
+
+
+def test_high_stress_stats_counts_all_matching_rows(db):
+    now_ms = int(time.time() * 1000)
+    db.add_detections(
+        [DetectionEvent(employee_id="EMP1", timestamp=now_ms - i, stress_level=0.8) for i in range(1500)]
+        + [DetectionEvent(employee_id="EMP1", timestamp=now_ms, stress_level=0.5)]
+        + [DetectionEvent(employee_id="EMP2", timestamp=now_ms, stress_level=0.9)]
+        + [DetectionEvent(employee_id="EMP1", timestamp=now_ms - 3_600_000, stress_level=0.9)]
+    )
+
+    # Más filas que el límite por defecto de get_high_stress_detections
+    count, total = db.high_stress_stats("EMP1", now_ms - 60_000, threshold=0.7)
+    assert count == 1500
+    assert total == pytest.approx(1500 * 0.8)
+
+    assert db.high_stress_stats(None, now_ms - 60_000, threshold=0.7)[0] == 1501
+    assert db.high_stress_stats("EMP1", None, threshold=0.7)[0] == 1501
+    assert db.high_stress_stats("EMP3", now_ms - 60_000) == (0, 0.0)
+
+
+def test_failed_flush_requeues_detections(db, monkeypatch):
+    detections = [DetectionEvent(employee_id="EMP1", timestamp=1000 + i, emotion="sad") for i in range(5)]
+    db.queue_detections(detections)
+
+    # Un fallo transitorio no descarta el lote encolado
+    monkeypatch.setattr(db, "add_detections", lambda batch: 0)
+    assert db.flush_detections() == 0
+    db.queue_detections([DetectionEvent(employee_id="EMP1", timestamp=2000, emotion="happy")])
+    monkeypatch.undo()
+
+    assert db.flush_detections() == 6
+    assert [d.timestamp for d in db.get_detections(limit=None)] == [2000, 1004, 1003, 1002, 1001, 1000]
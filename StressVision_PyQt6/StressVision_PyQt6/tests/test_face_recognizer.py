@@ -0,0 +1,49 @@
+"""
+🧪 Tests de core.detectors.face_recognizer
+"""
+import numpy as np
+import pytest
+
+pytest.importorskip("deepface")
+
+from core.detectors.face_recognizer import FaceRecognizer
+
+
+@pytest.fixture
+def recognizer(tmp_path, monkeypatch):
+    # Sin modelo de embeddings: solo se ejercita la comparación contra la galería
+    monkeypatch.setattr(FaceRecognizer, "_warm_up", lambda self: None)
+    recognizer = FaceRecognizer(
+        enrollments_dir=str(tmp_path),
+        threshold=0.9,
+        onnx_model_path=None,
+        quantized_model_path=None,
+        load_gallery=False
+    )
+    recognizer.embeddings_cache = {
+        "EMP1": np.array([3.0, 0.0, 0.0, 0.0], dtype=np.float32),
+        "EMP2": np.array([0.0, 2.0, 0.0, 0.0], dtype=np.float32),
+    }
+    recognizer._rebuild_matrix()
+    return recognizer
+
+
+def test_match_embeddings_does_not_modify_input(recognizer):
+    queries = np.array([[0.0, 5.0, 0.0, 0.0], [0.0, 0.0, 0.0, 0.0]], dtype=np.float32)
+    original = queries.copy()
+
+    matches = recognizer.match_embeddings(queries, 2)
+
+    assert matches[0][0] == "EMP2"
+    assert matches[0][1] == pytest.approx(1.0, abs=1e-2)
+    assert matches[1][0] is None
+    np.testing.assert_array_equal(queries, original)
+
+
+def test_match_embedding_does_not_modify_input(recognizer):
+    query = np.array([4.0, 0.0, 0.0, 0.0], dtype=np.float32)
+
+    employee_id, _ = recognizer._match_embedding(query)
+
+    assert employee_id == "EMP1"
+    np.testing.assert_array_equal(query, [4.0, 0.0, 0.0, 0.0])
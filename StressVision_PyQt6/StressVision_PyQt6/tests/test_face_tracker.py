@@ -0,0 +1,88 @@
+"""
+🧪 Tests de core.detectors.face_tracker
+"""
+import numpy as np
+
+from core.detectors.face_tracker import FaceTracker
+from core.utils.types import EmotionId, MODEL_EMOTION_LABELS
+
+
+def _update(tracker, boxes, track_index, employee_ids, emotion_ids, emotion_ages):
+    """Actualiza el tracker con confianzas y probabilidades de relleno"""
+    n = len(boxes)
+    return tracker.update(
+        boxes,
+        track_index,
+        np.array(employee_ids, dtype=object),
+        np.full(n, 0.9, dtype=np.float32),
+        np.array(emotion_ids, dtype=np.int8),
+        np.full(n, 0.8, dtype=np.float32),
+        np.zeros((n, len(MODEL_EMOTION_LABELS)), dtype=np.float32),
+        np.array(emotion_ages, dtype=np.int32)
+    )
+
+
+def test_match_without_tracks_marks_all_new():
+    tracker = FaceTracker()
+    boxes = np.array([[0, 0, 10, 10]], dtype=np.int32)
+    np.testing.assert_array_equal(tracker.match(boxes), [-1])
+
+
+def test_match_is_greedy_and_one_to_one():
+    tracker = FaceTracker(iou_threshold=0.3)
+    first = np.array([[0, 0, 100, 100], [300, 0, 100, 100]], dtype=np.int32)
+    _update(tracker, first, tracker.match(first), [None, None], [0, 0], [0, 0])
+
+    # La detección 1 se solapa más con el track 0 que la 0; la 2 no se solapa con nada
+    boxes = np.array([[20, 0, 100, 100], [5, 0, 100, 100], [600, 0, 100, 100]], dtype=np.int32)
+    track_index = tracker.match(boxes)
+
+    assert track_index[1] == 0
+    assert track_index[0] == -1  # El track 0 ya fue asignado y el 1 no alcanza el umbral
+    assert track_index[2] == -1
+
+
+def test_update_keeps_track_ids_and_expires_missed_tracks():
+    tracker = FaceTracker(max_missed=2)
+    boxes = np.array([[0, 0, 50, 50], [200, 0, 50, 50]], dtype=np.int32)
+    track_ids = _update(tracker, boxes, tracker.match(boxes), ["EMP1", None], [0, 0], [0, 0])
+
+    # Solo sigue el primer rostro: conserva su ID y hereda la identidad
+    moved = np.array([[2, 0, 50, 50]], dtype=np.int32)
+    track_index = tracker.match(moved)
+    employee_ids, confidences = tracker.identities(track_index)
+    assert employee_ids[0] == "EMP1"
+    assert confidences[0] == np.float32(0.9)
+    assert _update(tracker, moved, track_index, employee_ids, [0], [0])[0] == track_ids[0]
+    assert len(tracker.bboxes) == 2
+
+    # El segundo track se descarta al agotar max_missed
+    _update(tracker, moved, tracker.match(moved), employee_ids, [0], [0])
+    assert list(tracker.track_ids) == [track_ids[0]]
+
+
+def test_emotions_reused_only_for_recognized_faces_within_refresh():
+    tracker = FaceTracker(emotion_refresh=3)
+    boxes = np.array([[0, 0, 50, 50], [200, 0, 50, 50]], dtype=np.int32)
+    _update(
+        tracker, boxes, tracker.match(boxes),
+        ["EMP1", None], [EmotionId.SAD, EmotionId.HAPPY], [0, 0]
+    )
+
+    reused = []
+    for _ in range(4):
+        track_index = tracker.match(boxes)
+        employee_ids, _ = tracker.identities(track_index)
+        emotion_ids, _, _, ages, stale = tracker.emotions(track_index, employee_ids)
+
+        # El rostro sin identidad siempre pasa por el modelo
+        assert stale[1]
+        reused.append(not stale[0])
+        if not stale[0]:
+            assert emotion_ids[0] == EmotionId.SAD
+
+        # Lo que se vuelve a analizar conserva la emoción anterior con edad 0
+        _update(tracker, boxes, track_index, employee_ids, [EmotionId.SAD, EmotionId.HAPPY], ages)
+
+    # Se reutiliza durante emotion_refresh - 1 frames y luego se refresca
+    assert reused == [True, True, False, True]
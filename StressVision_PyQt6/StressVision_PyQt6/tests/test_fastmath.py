@@ -0,0 +1,64 @@
+"""
+🧪 Tests de core.utils.fastmath
+"""
+import numpy as np
+
+from core.utils import fastmath
+
+
+def test_clip_boxes_applies_padding_and_clips_to_frame():
+    boxes = np.array([
+        [10, 20, 30, 40],   # Dentro del frame
+        [0, 0, 50, 50],     # Pegado a la esquina superior izquierda
+        [90, 70, 20, 20],   # Se sale por la derecha y por abajo
+    ], dtype=np.int32)
+
+    corners = fastmath.clip_boxes(boxes, 100, 80, 5)
+
+    assert corners.dtype == np.int32
+    np.testing.assert_array_equal(corners, [
+        [5, 15, 45, 65],
+        [0, 0, 55, 55],
+        [85, 65, 100, 80],
+    ])
+
+
+def test_clip_boxes_empty():
+    corners = fastmath.clip_boxes(np.empty((0, 4), dtype=np.int32), 100, 80, 5)
+    assert corners.shape == (0, 4)
+
+
+def test_iou_matrix_known_values():
+    a = np.array([[0, 0, 10, 10], [100, 100, 10, 10]], dtype=np.int32)
+    b = np.array([[0, 0, 10, 10], [5, 0, 10, 10], [50, 50, 5, 5]], dtype=np.int32)
+
+    iou = fastmath.iou_matrix(a, b)
+
+    assert iou.shape == (2, 3)
+    np.testing.assert_allclose(iou[0], [1.0, 50 / 150, 0.0], rtol=1e-6)
+    np.testing.assert_array_equal(iou[1], [0.0, 0.0, 0.0])
+
+
+def test_iou_matrix_zero_area_boxes():
+    a = np.array([[10, 10, 0, 0]], dtype=np.int32)
+    iou = fastmath.iou_matrix(a, a)
+    assert iou[0, 0] == 0.0
+
+
+def test_ring_window_mean_matches_reference_after_wrap():
+    weights = fastmath.NEGATIVE_WEIGHTS
+    capacity = 7
+    rng = np.random.default_rng(0)
+    written = rng.integers(0, len(weights), size=23).astype(np.int8)
+
+    codes = np.zeros(capacity, dtype=np.int8)
+    for head, code in enumerate(written, start=1):
+        codes[(head - 1) % capacity] = code
+        for window in (1, 3, capacity, capacity + 5):
+            expected = weights[written[max(0, head - min(window, capacity)):head]].mean()
+            assert np.isclose(fastmath.ring_window_mean(codes, head, window, weights), expected)
+
+
+def test_ring_window_mean_empty():
+    codes = np.zeros(4, dtype=np.int8)
+    assert fastmath.ring_window_mean(codes, 0, 3, fastmath.NEGATIVE_WEIGHTS) == 0.0
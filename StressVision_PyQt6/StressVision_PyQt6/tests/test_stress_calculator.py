@@ -0,0 +1,106 @@
+"""
+🧪 Tests de core.services.stress_calculator
+"""
+import numpy as np
+import pytest
+
+from core.services import stress_calculator
+from core.services.stress_calculator import EmotionHistory, StressCalculator, _NEGATIVE_LUT
+from core.utils import fastmath
+from core.utils.types import EmotionType, EMOTION_IDS, EMOTION_NAMES, NEGATIVE_EMOTIONS
+
+
+def test_negative_lut_marks_only_negative_emotions():
+    assert _NEGATIVE_LUT.shape == (256,)
+    for name in EMOTION_NAMES:
+        assert _NEGATIVE_LUT[EMOTION_IDS[name]] == (name in NEGATIVE_EMOTIONS)
+    # Los bytes fuera del rango de IDs no cuentan como negativos
+    assert not _NEGATIVE_LUT[len(EMOTION_NAMES):].any()
+    np.testing.assert_array_equal(_NEGATIVE_LUT[:len(EMOTION_NAMES)], fastmath.NEGATIVE_WEIGHTS)
+
+
+def test_emotion_history_ring_overwrites_oldest():
+    history = EmotionHistory(capacity=4)
+    assert len(history) == 0
+    assert history.last_code() is None
+
+    for code in range(6):
+        history.append(code, float(code), 0.5)
+
+    assert len(history) == 4
+    assert history.last_code() == 5
+    assert sorted(history.codes) == [2, 3, 4, 5]
+    assert sorted(history.recent_codes(3)) == [3, 4, 5]
+    assert sorted(history.recent_codes(10)) == [2, 3, 4, 5]
+
+    history.clear()
+    assert len(history) == 0
+    assert history.last_code() is None
+
+
+@pytest.mark.parametrize("numba_path", [True, False])
+def test_stress_index_over_window(monkeypatch, numba_path):
+    monkeypatch.setattr(fastmath, "NUMBA_AVAILABLE", numba_path)
+    calculator = StressCalculator(max_history=8, window_size=4)
+
+    # Menos de 5 emociones: sin índice
+    for _ in range(4):
+        calculator.add_emotion(EmotionType.ANGRY.value, "EMP1")
+    assert calculator.calculate_stress_index("EMP1") == 0.0
+
+    # Historial de 10 en un buffer de 8: la ventana son las últimas 4
+    for emotion in ("happy", "sad", "neutral", "fear", "happy", "angry"):
+        calculator.add_emotion(emotion, "EMP1")
+
+    assert calculator.calculate_stress_index("EMP1") == 50.0  # neutral, fear, happy, angry
+    assert calculator.calculate_stress_index("EMP1", window=8) == 62.5
+
+
+def test_stress_index_cached_until_new_emotion(monkeypatch):
+    calculator = StressCalculator(window_size=10)
+    for _ in range(6):
+        calculator.add_emotion(EmotionType.SAD.value, "EMP1")
+
+    calls = []
+    compute = calculator._compute_stress_index
+
+    def counting_compute(history, window):
+        calls.append(window)
+        return compute(history, window)
+
+    monkeypatch.setattr(calculator, "_compute_stress_index", counting_compute)
+
+    assert calculator.calculate_stress_index("EMP1") == 100.0
+    assert calculator.calculate_stress_index("EMP1") == 100.0
+    assert len(calls) == 1
+
+    # Otra ventana o una emoción nueva invalidan la entrada
+    calculator.calculate_stress_index("EMP1", window=5)
+    assert len(calls) == 2
+    calculator.add_emotion(EmotionType.HAPPY.value, "EMP1")
+    assert calculator.calculate_stress_index("EMP1", window=5) == 80.0
+    assert len(calls) == 3
+
+    # El historial global se cachea aparte
+    calculator.calculate_stress_index()
+    assert len(calls) == 4
+
+    calculator.clear_history("EMP1")
+    assert "EMP1" not in calculator._stress_cache
+
+
+def test_stress_events_logged_per_employee():
+    calculator = StressCalculator(window_size=5)
+    for _ in range(5):
+        calculator.add_emotion(EmotionType.FEAR.value, "EMP1")
+        calculator.add_emotion(EmotionType.HAPPY.value, "EMP2")
+
+    assert calculator.check_stress_threshold(50.0, "EMP1")
+    assert not calculator.check_stress_threshold(50.0, "EMP2")
+
+    events = calculator.stress_events
+    assert len(events) == 1
+    assert events.count("EMP1") == 1
+    assert events.count("EMP2") == 0
+    assert events.emotion_ids[0] == EMOTION_IDS[EmotionType.FEAR.value]
+    assert calculator.get_metrics("EMP1")["stress_events_count"] == 1